@@ -0,0 +1,313 @@
+# backend/core/acoustics.py
+"""
+Análisis acústico de grabaciones de voz (WAV), vectorizado con NumPy.
+
+Igual que core/derivatives.py, no importa la app: se ejecuta en el pool de
+procesos de core/media_pipeline.py y en backend.jobs.analyze_recordings.
+
+El audio no se carga entero: cada bloque de `BLOCK_SECONDS` de la sección
+`data` se mapea con `np.memmap` y se libera al terminarlo, así que ni las
+páginas del archivo ni los temporales de la FFT crecen con la duración
+(grabaciones de una hora incluidas). Cada bloque se parte en tramas de
+40 ms cada 10 ms (vista con `sliding_window_view`, sin copias) y todas las
+tramas del bloque se procesan a la vez:
+
+- Intensidad: RMS por trama en dBFS (sin calibrar: no son dB SPL).
+- F0: autocorrelación por FFT con ventana de Hann, normalizada por la
+  autocorrelación de la ventana (Boersma, 1993), pico en
+  [F0_MIN, F0_MAX] con interpolación parabólica y un pequeño sesgo contra
+  errores de octava. Trama sonora si la correlación supera
+  `VOICING_THRESHOLD` y no es silencio.
+- Jitter / shimmer "local": variación media entre tramas sonoras
+  consecutivas del periodo (1/F0) y de la amplitud, relativa a la media.
+  Es una aproximación por tramas, no por ciclo glótico como Praat: sirve
+  para seguir la evolución de un paciente con el mismo protocolo, no para
+  comparar con normas publicadas.
+- Velocidad de habla: núcleos silábicos como picos sonoros de la
+  intensidad suavizada, separados por un valle de al menos `DIP_DB`
+  (simplificación de de Jong & Wempe, 2009). `speaking_rate` = sílabas/s
+  sobre la duración total; `articulation_rate` = sobre el tiempo sin silencio.
+
+Solo al final, con las series por trama (4 bytes × 100 tramas/s por serie),
+se aplican los umbrales relativos al máximo del archivo.
+"""
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+ANALYZABLE_EXTS = {".wav"}
+ANALYSIS_VERSION = 1          # subir al cambiar el algoritmo (el job recalcula lo anterior)
+
+FRAME_SECONDS = 0.04
+HOP_SECONDS = 0.01
+BLOCK_SECONDS = 5.0
+CONTOUR_HOP_SECONDS = 0.1     # resolución del contorno que se guarda
+VOICING_THRESHOLD = 0.45
+OCTAVE_COST = 0.01            # por octava, favorece periodos cortos (como Praat)
+SILENCE_DB = -60.0            # dBFS absolutos
+SILENCE_RANGE_DB = 35.0       # por debajo de max - 35 dB también es silencio
+SMOOTH_FRAMES = 5             # envolvente de intensidad para sílabas (50 ms)
+DIP_DB = 2.0
+
+_FMT_PCM, _FMT_FLOAT, _FMT_EXTENSIBLE = 1, 3, 0xFFFE
+
+
+class WavFormatError(ValueError):
+    pass
+
+
+@dataclass
+class WavInfo:
+    path: Path
+    sample_rate: int
+    channels: int
+    bits: int
+    is_float: bool
+    data_offset: int
+    frames: int
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate
+
+
+def read_wav_info(path) -> WavInfo:
+    """Recorre los chunks RIFF hasta `data` sin leer el audio."""
+    path = Path(path)
+    file_size = path.stat().st_size
+    with open(path, "rb") as fh:
+        riff, _, wave_id = struct.unpack("<4sI4s", fh.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise WavFormatError("Not a RIFF/WAVE file")
+        fmt = None
+        while True:
+            head = fh.read(8)
+            if len(head) < 8:
+                raise WavFormatError("Missing data chunk")
+            chunk_id, size = struct.unpack("<4sI", head)
+            if chunk_id == b"fmt ":
+                body = fh.read(size)
+                tag, channels, rate, _, block_align, bits = struct.unpack_from("<HHIIHH", body)
+                if tag == _FMT_EXTENSIBLE and len(body) >= 26:
+                    tag = struct.unpack_from("<H", body, 24)[0]  # primeros bytes del SubFormat GUID
+                fmt = (tag, channels, rate, block_align, bits)
+                fh.seek(size % 2, 1)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise WavFormatError("data chunk before fmt chunk")
+                offset = fh.tell()
+                # 0xFFFFFFFF / 0: grabadores que no reescriben la cabecera al terminar
+                if size in (0, 0xFFFFFFFF) or offset + size > file_size:
+                    size = file_size - offset
+                break
+            else:
+                fh.seek(size + size % 2, 1)  # LIST, fact, bext...
+    tag, channels, rate, block_align, bits = fmt
+    if tag not in (_FMT_PCM, _FMT_FLOAT) or channels < 1 or rate <= 0:
+        raise WavFormatError(f"Unsupported WAV format tag {tag}")
+    if (tag == _FMT_PCM and bits not in (8, 16, 24, 32)) or (tag == _FMT_FLOAT and bits not in (32, 64)):
+        raise WavFormatError(f"Unsupported sample size {bits}")
+    return WavInfo(path, rate, channels, bits, tag == _FMT_FLOAT, offset, size // block_align)
+
+
+def open_samples(info: WavInfo, start: int = 0, count: Optional[int] = None) -> np.memmap:
+    """Memmap (frames, canales[, 3]) de `count` frames desde `start`; se lee al indexar."""
+    count = info.frames - start if count is None else min(count, info.frames - start)
+    if info.bits == 24:
+        dtype, shape = np.uint8, (count, info.channels, 3)
+    elif info.is_float:
+        dtype, shape = (np.float32 if info.bits == 32 else np.float64), (count, info.channels)
+    else:
+        dtype, shape = {8: np.uint8, 16: np.int16, 32: np.int32}[info.bits], (count, info.channels)
+    offset = info.data_offset + start * info.channels * info.bits // 8
+    return np.memmap(info.path, dtype=dtype, mode="r", offset=offset, shape=shape)
+
+
+def _to_mono(block: np.ndarray, info: WavInfo) -> np.ndarray:
+    if info.bits == 24:
+        b = block.astype(np.int32)
+        x = (b[..., 0] | (b[..., 1] << 8) | (b[..., 2] << 16)) << 8 >> 8  # extiende el signo
+        scale = 1 / 8388608.0
+    elif info.is_float:
+        x, scale = block, 1.0
+    elif info.bits == 8:
+        x, scale = block.astype(np.int16) - 128, 1 / 128.0
+    else:
+        x, scale = block, 1 / float(np.iinfo(block.dtype).max)
+    return (x.mean(axis=1, dtype=np.float64) * scale).astype(np.float32)
+
+
+@dataclass
+class _Frames:
+    intensity: np.ndarray   # dBFS
+    amplitude: np.ndarray   # RMS lineal
+    f0: np.ndarray          # Hz; NaN si no hay pico
+    strength: np.ndarray    # correlación normalizada del pico
+
+
+class _PitchTracker:
+    def __init__(self, rate: int, frame_len: int, f0_min: float, f0_max: float):
+        self.min_lag = max(2, int(rate / f0_max))
+        self.max_lag = min(frame_len - 2, int(np.ceil(rate / f0_min)))
+        if self.max_lag <= self.min_lag:
+            raise ValueError("F0 range too narrow for the frame length")
+        self.rate = rate
+        self.nfft = 1 << int(np.ceil(np.log2(2 * frame_len)))
+        self.window = np.hanning(frame_len).astype(np.float32)
+        w_ac = np.fft.irfft(np.abs(np.fft.rfft(self.window, self.nfft)) ** 2, self.nfft)
+        self.window_ac = (w_ac[: self.max_lag + 2] / w_ac[0]).astype(np.float32)
+        lags = np.arange(self.min_lag, self.max_lag + 1)
+        self.octave_bonus = (OCTAVE_COST * np.log2(self.max_lag / lags)).astype(np.float32)
+
+    def __call__(self, frames: np.ndarray) -> tuple:
+        spec = np.fft.rfft(frames * self.window, self.nfft, axis=1)
+        ac = np.fft.irfft(spec.real ** 2 + spec.imag ** 2, self.nfft, axis=1)[:, : self.max_lag + 2]
+        energy = ac[:, :1]
+        ac = ac / np.where(energy > 0, energy, 1) / self.window_ac
+        seg = ac[:, self.min_lag: self.max_lag + 1]
+        best = np.argmax(seg + self.octave_bonus, axis=1)
+        rows = np.arange(len(frames))
+        lag = best + self.min_lag
+        y0, y1, y2 = ac[rows, lag - 1], ac[rows, lag], ac[rows, lag + 1]
+        denom = y0 - 2 * y1 + y2
+        shift = np.where(np.abs(denom) > 1e-12, 0.5 * (y0 - y2) / np.where(denom == 0, 1, denom), 0.0)
+        shift = np.clip(shift, -0.5, 0.5)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            f0 = self.rate / (lag + shift)
+        strength = np.minimum(y1 - 0.25 * (y0 - y2) * shift, 1.0)
+        return f0.astype(np.float32), strength.astype(np.float32)
+
+
+def _iter_frames(info: WavInfo, f0_min: float, f0_max: float) -> Iterator[_Frames]:
+    rate = info.sample_rate
+    frame_len = int(round(FRAME_SECONDS * rate))
+    hop = int(round(HOP_SECONDS * rate))
+    if info.frames < frame_len:
+        return
+    n_frames = 1 + (info.frames - frame_len) // hop
+    per_block = max(1, int(BLOCK_SECONDS / HOP_SECONDS))
+    tracker = _PitchTracker(rate, frame_len, f0_min, f0_max)
+    for first in range(0, n_frames, per_block):
+        count = min(per_block, n_frames - first)
+        block = open_samples(info, first * hop, (count - 1) * hop + frame_len)
+        x = _to_mono(block, info)
+        del block  # desmapea: las páginas leídas no se acumulan en el RSS
+        frames = sliding_window_view(x, frame_len)[::hop]
+        frames = frames - frames.mean(axis=1, keepdims=True)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        f0, strength = tracker(frames)
+        yield _Frames(
+            intensity=(20 * np.log10(np.maximum(rms, 1e-10))).astype(np.float32),
+            amplitude=rms.astype(np.float32),
+            f0=f0,
+            strength=strength,
+        )
+
+
+def _rel_perturbation(values: np.ndarray, pairs: np.ndarray) -> Optional[float]:
+    """mean(|v[i] - v[i+1]|) / mean(v) sobre pares de tramas sonoras consecutivas."""
+    if not pairs.any():
+        return None
+    diffs = np.abs(np.diff(values))[pairs]
+    return float(diffs.mean() / values[np.r_[pairs, False] | np.r_[False, pairs]].mean())
+
+
+def _syllable_nuclei(intensity: np.ndarray, voiced: np.ndarray, floor_db: float) -> np.ndarray:
+    env = np.convolve(intensity, np.ones(SMOOTH_FRAMES) / SMOOTH_FRAMES, mode="same")
+    if len(env) < 3:
+        return np.zeros(0, dtype=np.int64)
+    inner = env[1:-1]
+    peaks = np.flatnonzero((inner > env[:-2]) & (inner >= env[2:])) + 1
+    peaks = peaks[voiced[peaks] & (env[peaks] > floor_db)]
+    if len(peaks) < 2:
+        return peaks
+    # valle entre cada pico y el anterior: mínimo del tramo [p_{i-1}, p_i]
+    dips = np.minimum.reduceat(env, peaks)[:-1]
+    prev_peak = env[peaks[:-1]]
+    keep = np.r_[True, (np.minimum(prev_peak, env[peaks[1:]]) - dips) >= DIP_DB]
+    return peaks[keep]
+
+
+def _stat(x: np.ndarray, fn) -> Optional[float]:
+    return round(float(fn(x)), 4) if len(x) else None
+
+
+def _contour(values: np.ndarray, mask: np.ndarray, step: int) -> list:
+    """Mediana por ventana de `step` tramas (solo las de `mask`); None si no hay ninguna."""
+    n = len(values) // step * step
+    if n == 0:
+        return []
+    v = np.where(mask[:n], values[:n], np.nan).reshape(-1, step)
+    has = ~np.all(np.isnan(v), axis=1)
+    med = np.full(len(v), np.nan)
+    if has.any():
+        med[has] = np.nanmedian(v[has], axis=1)
+    return [None if np.isnan(m) else round(float(m), 1) for m in med]
+
+
+def analyze_wav(path, f0_min: float = 75.0, f0_max: float = 600.0) -> dict:
+    """
+    Punto de entrada del worker. Devuelve `{"features": {...}, "contour": {...}}`
+    listo para guardarse como JSON. Lanza WavFormatError si el WAV no es válido.
+    """
+    info = read_wav_info(path)
+    blocks = list(_iter_frames(info, f0_min, f0_max))
+    if blocks:
+        intensity = np.concatenate([b.intensity for b in blocks])
+        amplitude = np.concatenate([b.amplitude for b in blocks])
+        f0 = np.concatenate([b.f0 for b in blocks])
+        strength = np.concatenate([b.strength for b in blocks])
+    else:
+        intensity = amplitude = f0 = strength = np.zeros(0, dtype=np.float32)
+
+    floor_db = max(SILENCE_DB, float(intensity.max()) - SILENCE_RANGE_DB) if len(intensity) else SILENCE_DB
+    sounding = intensity > floor_db
+    voiced = sounding & (strength >= VOICING_THRESHOLD) & np.isfinite(f0) & (f0 >= f0_min) & (f0 <= f0_max)
+    pairs = voiced[:-1] & voiced[1:]
+
+    f0_v = f0[voiced].astype(np.float64)
+    semitones = 12 * np.log2(f0_v / 100.0) if len(f0_v) else f0_v
+    nuclei = _syllable_nuclei(intensity, voiced, floor_db)
+    sounding_time = float(sounding.sum()) * HOP_SECONDS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        periods = np.where(voiced, 1.0 / f0, np.nan)
+        amp_db = 20 * np.log10(amplitude[1:] / amplitude[:-1])
+
+    features = {
+        "version": ANALYSIS_VERSION,
+        "sample_rate": info.sample_rate,
+        "channels": info.channels,
+        "duration": round(info.duration, 3),
+        "frames": int(len(intensity)),
+        "voiced_fraction": round(float(voiced.mean()), 4) if len(voiced) else 0.0,
+        "f0_mean": _stat(f0_v, np.mean),
+        "f0_median": _stat(f0_v, np.median),
+        "f0_sd": _stat(f0_v, np.std),
+        "f0_min": _stat(f0_v, np.min),
+        "f0_max": _stat(f0_v, np.max),
+        "f0_sd_semitones": _stat(semitones, np.std),
+        "intensity_mean_db": _stat(intensity[sounding], np.mean),
+        "intensity_max_db": _stat(intensity, np.max),
+        "intensity_sd_db": _stat(intensity[sounding], np.std),
+        "jitter_local": _rel_perturbation(np.nan_to_num(periods), pairs),
+        "shimmer_local": _rel_perturbation(amplitude, pairs),
+        "shimmer_db": _stat(np.abs(amp_db[pairs]), np.mean),
+        "syllables": int(len(nuclei)),
+        "phonation_time": round(sounding_time, 3),
+        "speaking_rate": round(len(nuclei) / info.duration, 3) if info.duration else None,
+        "articulation_rate": round(len(nuclei) / sounding_time, 3) if sounding_time else None,
+    }
+    for key in ("jitter_local", "shimmer_local"):
+        if features[key] is not None:
+            features[key] = round(features[key], 5)
+    step = max(1, int(round(CONTOUR_HOP_SECONDS / HOP_SECONDS)))
+    contour = {
+        "hop": CONTOUR_HOP_SECONDS,
+        "f0": _contour(f0, voiced, step),
+        "intensity": _contour(intensity, np.ones_like(voiced), step),
+    }
+    return {"features": features, "contour": contour}
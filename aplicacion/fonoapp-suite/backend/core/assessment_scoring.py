@@ -0,0 +1,355 @@
+# backend/core/assessment_scoring.py
+"""
+Validación y puntaje de evaluaciones en el servidor.
+
+`AssessmentTemplate.schema_` sigue siendo JSON libre; si trae `items`, se
+compila a un `CompiledTemplate` que valida `responses` y calcula el puntaje:
+
+    {
+      "items": [
+        {"id": "q1", "type": "scale", "min": 0, "max": 4, "step": 1, "subscale": "fluidez"},
+        {"id": "q2", "type": "scale", "min": 0, "max": 4, "reverse": true, "weight": 2},
+        {"id": "q3", "type": "choice", "options": [{"value": "nunca", "score": 0},
+                                                   {"value": "a veces", "score": 1}]},
+        {"id": "q4", "type": "boolean", "subscale": ["fluidez", "habla"]},
+        {"id": "obs", "type": "text", "required": false}
+      ],
+      "subscales": {"habla": {"method": "mean"}},
+      "scoring": {"method": "sum"}
+    }
+
+- `type`: scale|number (numérico, `min`/`max` opcionales), boolean (1/0),
+  choice (`options` con `score`, o valores numéricos), text (no puntúa).
+- `step`: paso de los valores válidos desde `min` (p. ej. 1 = enteros); con
+  él, los filtros por rango de core/assessment_search.py usan el índice GIN.
+- `reverse`: puntaje invertido, (min + max) - valor; exige min y max.
+- `weight`: multiplica el valor (por defecto 1; 0 = no puntúa).
+- `subscale`: nombre o lista; `subscales` permite fijar `method` por escala.
+- `method`: sum (por defecto) o mean (ponderada, sobre los ítems respondidos).
+
+La compilación arma una matriz de pesos ítems × (total + subescalas): un
+resultado o un lote de miles se puntúan igual, con un producto matricial.
+Las plantillas compiladas se cachean por (id, schema_updated_at): cambiar
+el `schema` de la plantilla lo actualiza y la siguiente petición recompila;
+renombrarla no.
+
+Plantillas sin `items` (formato anterior) no se validan y conservan el
+`score` que envía el cliente.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from .config import settings
+from ..models.assessment import AssessmentResult, AssessmentTemplate
+
+logger = logging.getLogger(__name__)
+
+ITEM_TYPES = {"scale", "number", "boolean", "choice", "text"}
+METHODS = ("sum", "mean")
+RESCORE_BATCH = 1000
+
+
+class TemplateError(ValueError):
+    """El schema de la plantilla no se puede compilar."""
+
+
+class ResponseError(ValueError):
+    def __init__(self, errors: List[dict]):
+        super().__init__("; ".join(f"{e['item']}: {e['msg']}" for e in errors))
+        self.errors = errors
+
+
+@dataclass(frozen=True)
+class TemplateItem:
+    id: str
+    kind: str
+    required: bool
+    lo: Optional[float]
+    hi: Optional[float]
+    options: Optional[Dict[Any, Optional[float]]]  # choice: valor -> puntaje
+    reverse: bool
+    weight: float
+    scored: bool
+    step: Optional[float] = None
+
+
+def _num(value: Any, what: str) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TemplateError(f"{what} must be a number")
+    return float(value)
+
+
+def _option_key(value: Any) -> Any:
+    # 1 y 1.0 son la misma opción; los textos se comparan tal cual
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+
+
+def _compile_item(raw: Any, pos: int) -> Tuple[TemplateItem, List[str]]:
+    if not isinstance(raw, dict) or not isinstance(raw.get("id"), (str, int)):
+        raise TemplateError(f"items[{pos}]: each item needs an 'id'")
+    item_id = str(raw["id"])
+    kind = raw.get("type", "scale")
+    if kind not in ITEM_TYPES:
+        raise TemplateError(f"{item_id}: unknown type '{kind}'")
+    lo = _num(raw.get("min"), f"{item_id}.min")
+    hi = _num(raw.get("max"), f"{item_id}.max")
+    options = None
+    if kind == "boolean":
+        lo, hi = 0.0, 1.0
+    elif kind == "choice":
+        opts = raw.get("options")
+        if not isinstance(opts, list) or not opts:
+            raise TemplateError(f"{item_id}: choice items need 'options'")
+        options = {}
+        for opt in opts:
+            if isinstance(opt, dict):
+                value, score = opt.get("value"), _num(opt.get("score"), f"{item_id}.options.score")
+            else:
+                value = opt
+                score = float(opt) if isinstance(opt, (int, float)) and not isinstance(opt, bool) else None
+            options[_option_key(value)] = score
+        scores = [s for s in options.values() if s is not None]
+        if scores:
+            lo, hi = min(scores), max(scores)
+    if lo is not None and hi is not None and lo > hi:
+        raise TemplateError(f"{item_id}: min > max")
+    step = _num(raw.get("step"), f"{item_id}.step") if kind in ("scale", "number") else None
+    if step is not None and (step <= 0 or lo is None):
+        raise TemplateError(f"{item_id}: step must be > 0 and needs min")
+    weight = _num(raw.get("weight", 1), f"{item_id}.weight")
+    scored = kind != "text" and weight != 0 and (options is None or any(s is not None for s in options.values()))
+    reverse = bool(raw.get("reverse", False))
+    if reverse and (lo is None or hi is None):
+        raise TemplateError(f"{item_id}: reverse-scored items need min and max")
+    subscales = raw.get("subscale") or []
+    if isinstance(subscales, str):
+        subscales = [subscales]
+    item = TemplateItem(item_id, kind, bool(raw.get("required", True)), lo, hi, options, reverse, weight, scored, step)
+    return item, [str(s) for s in subscales]
+
+
+class CompiledTemplate:
+    def __init__(self, template_id: Optional[int], version: Optional[datetime], schema: Optional[dict]):
+        self.template_id = template_id
+        self.version = version
+        schema = schema or {}
+        raw_items = schema.get("items")
+        self.scorable = raw_items is not None
+        self.items: List[TemplateItem] = []
+        if not self.scorable:
+            return
+        if not isinstance(raw_items, list):
+            raise TemplateError("'items' must be a list")
+
+        membership: Dict[str, List[str]] = {}
+        for pos, raw in enumerate(raw_items):
+            item, subscales = _compile_item(raw, pos)
+            if item.id in membership:
+                raise TemplateError(f"{item.id}: duplicated item id")
+            self.items.append(item)
+            membership[item.id] = subscales
+        self.by_id = {it.id: it for it in self.items}
+
+        declared = schema.get("subscales") or {}
+        if not isinstance(declared, dict):
+            raise TemplateError("'subscales' must be an object")
+        for name, spec in declared.items():  # también se pueden listar los ítems en la subescala
+            if not isinstance(spec, dict):
+                raise TemplateError(f"subscale {name}: must be an object")
+            for item_id in spec.get("items", []):
+                if str(item_id) not in membership:
+                    raise TemplateError(f"subscale {name}: unknown item '{item_id}'")
+                membership[str(item_id)].append(name)
+
+        default = (schema.get("scoring") or {}).get("method", "sum")
+        self.scales = ["total"] + sorted({s for subs in membership.values() for s in subs})
+        methods = [default] + [declared.get(s, {}).get("method", default) for s in self.scales[1:]]
+        if any(m not in METHODS for m in methods):
+            raise TemplateError(f"scoring method must be one of {METHODS}")
+        self._mean = np.array([m == "mean" for m in methods])
+
+        # Matriz ítems puntuables × escalas; inversión como x' = offset - x
+        self.scored = [it for it in self.items if it.scored]
+        self.W = np.zeros((len(self.scored), len(self.scales)))
+        for i, it in enumerate(self.scored):
+            self.W[i, 0] = it.weight
+            for s in set(membership[it.id]):
+                self.W[i, self.scales.index(s)] = it.weight
+        self._reverse = np.array([it.reverse for it in self.scored], dtype=bool)
+        self._offset = np.array([(it.lo or 0) + (it.hi or 0) for it in self.scored])
+
+    # ---------- Validación ----------
+    def _value(self, item: TemplateItem, raw: Any) -> Optional[float]:
+        """Valor numérico del ítem (None si no puntúa); ValueError si no es válido."""
+        if item.kind == "text":
+            if not isinstance(raw, str):
+                raise ValueError("must be text")
+            return None
+        if item.kind == "boolean":
+            if not isinstance(raw, bool):
+                raise ValueError("must be true or false")
+            return float(raw)
+        if item.kind == "choice":
+            if isinstance(raw, (list, dict)):  # no hashable: ni siquiera se puede buscar
+                raise ValueError("not one of the options")
+            key = _option_key(raw)
+            if key not in item.options:
+                raise ValueError("not one of the options")
+            return item.options[key]
+        if isinstance(raw, bool) or not isinstance(raw, (int, float)):
+            raise ValueError("must be a number")
+        x = float(raw)
+        if (item.lo is not None and x < item.lo) or (item.hi is not None and x > item.hi):
+            raise ValueError(f"must be between {item.lo:g} and {item.hi:g}" if item.lo is not None and item.hi is not None
+                             else "out of range")
+        if item.step is not None and abs((x - item.lo) / item.step - round((x - item.lo) / item.step)) > 1e-9:
+            raise ValueError(f"must be a multiple of {item.step:g} from {item.lo:g}")
+        return x
+
+    def values(self, responses: Dict[str, Any]) -> Dict[str, Optional[float]]:
+        """Valida `responses` y devuelve el valor de cada ítem respondido. Lanza ResponseError."""
+        errors = []
+        out = {}
+        for key in responses:
+            if key not in self.by_id:
+                errors.append({"item": key, "msg": "unknown item"})
+        for item in self.items:
+            raw = responses.get(item.id)
+            if raw is None:
+                if item.required:
+                    errors.append({"item": item.id, "msg": "required"})
+                continue
+            try:
+                out[item.id] = self._value(item, raw)
+            except ValueError as exc:
+                errors.append({"item": item.id, "msg": str(exc)})
+        if errors:
+            raise ResponseError(errors)
+        return out
+
+    # ---------- Puntaje ----------
+    def score_matrix(self, X: np.ndarray) -> np.ndarray:
+        """X: resultados × ítems puntuables (NaN = sin respuesta) -> resultados × escalas."""
+        mask = ~np.isnan(X)
+        X = np.where(self._reverse, self._offset - X, X)
+        sums = np.where(mask, X, 0.0) @ self.W
+        answered = mask.astype(np.float64) @ np.abs(self.W)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / answered
+        out = np.where(self._mean, means, sums)
+        return np.where(answered > 0, out, np.nan)  # escala sin ítems respondidos
+
+    def score_many(self, values: Sequence[Dict[str, Optional[float]]]) -> List[Tuple[Optional[int], dict]]:
+        X = np.full((len(values), len(self.scored)), np.nan)
+        for r, vals in enumerate(values):
+            for c, item in enumerate(self.scored):
+                v = vals.get(item.id)
+                if v is not None:
+                    X[r, c] = v
+        S = self.score_matrix(X)
+        out = []
+        for row in S:
+            total = None if np.isnan(row[0]) else round(float(row[0]), 4)
+            subscales = {s: (None if np.isnan(v) else round(float(v), 4)) for s, v in zip(self.scales[1:], row[1:])}
+            out.append((None if total is None else int(round(total)), {"total": total, "subscales": subscales}))
+        return out
+
+    def score(self, responses: Dict[str, Any]) -> Tuple[Optional[int], dict]:
+        return self.score_many([self.values(responses)])[0]
+
+
+def compile_schema(schema: Optional[dict]) -> CompiledTemplate:
+    """Compila sin cachear (validar una plantilla antes de guardarla)."""
+    return CompiledTemplate(None, None, schema)
+
+
+class TemplateCache:
+    """LRU de plantillas compiladas; una entrada vale mientras coincida `schema_updated_at`."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, CompiledTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, template: AssessmentTemplate) -> CompiledTemplate:
+        with self._lock:
+            compiled = self._entries.get(template.id)
+            if compiled is not None and compiled.version == template.schema_updated_at:
+                self._entries.move_to_end(template.id)
+                return compiled
+        # Compilar fuera del lock; dos hilos pueden compilar la misma versión, da igual
+        compiled = CompiledTemplate(template.id, template.schema_updated_at, template.schema_)
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[template.id] = compiled
+                self._entries.move_to_end(template.id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+template_cache = TemplateCache(max_entries=settings.ASSESSMENT_TEMPLATE_CACHE_SIZE)
+
+
+# ---------- Re-puntaje por lotes ----------
+def rescore_template(db: Session, template_id: int, *, only_stale: bool = True,
+                     batch: int = RESCORE_BATCH) -> dict:
+    """
+    Recalcula `score`/`subscores` de los resultados de una plantilla, por
+    lotes de `batch` (keyset por id, commit por lote). Con `only_stale` solo
+    los puntuados con otra versión (`scored_with` != `schema_updated_at`).
+    """
+    counts = {"rescored": 0, "invalid": 0}
+    template = db.get(AssessmentTemplate, template_id)
+    if template is None:
+        return counts
+    compiled = template_cache.get(template)
+    if not compiled.scorable:
+        return counts
+    version = template.schema_updated_at
+    last = 0
+    while True:
+        stmt = (
+            select(AssessmentResult.id, AssessmentResult.responses)
+            .where(AssessmentResult.template_id == template_id, AssessmentResult.id > last)
+            .order_by(AssessmentResult.id)
+            .limit(batch)
+        )
+        if only_stale:
+            stmt = stmt.where(AssessmentResult.scored_with.is_distinct_from(version))
+        rows = db.execute(stmt).all()
+        if not rows:
+            break
+        valid, values = [], []
+        for row in rows:
+            try:
+                values.append(compiled.values(row.responses or {}))
+                valid.append(row.id)
+            except ResponseError as exc:
+                # Respuestas que ya no encajan con la plantilla: se dejan como estaban
+                counts["invalid"] += 1
+                logger.warning("Result %s does not match template %s: %s", row.id, template_id, exc)
+        if valid:
+            scored = compiled.score_many(values)
+            db.execute(update(AssessmentResult), [
+                {"id": rid, "score": score, "subscores": sub, "scored_with": version}
+                for rid, (score, sub) in zip(valid, scored)
+            ])
+            db.commit()
+            counts["rescored"] += len(valid)
+        last = rows[-1].id
+    return counts
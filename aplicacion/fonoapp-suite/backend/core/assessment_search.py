@@ -0,0 +1,214 @@
+# backend/core/assessment_search.py
+"""
+Búsqueda de resultados de evaluación por respuestas y puntaje
+(GET /assessments/results/search), para consultas de investigación y
+auditoría del tipo "pacientes con el ítem 7 >= 3 en la plantilla X".
+
+Filtros `where=<ítem>:<op>:<valor>` (op: eq, ne, gt, gte, lt, lte, exists),
+todos combinados con AND, más `score_min`/`score_max` y `patient_id`.
+
+Índices (backend/migrations/012_assessment_search.sql):
+
+- GIN `jsonb_path_ops` sobre `responses`: resuelve `responses @> {"q7": 3}`
+  con una entrada por (ruta, valor), muy selectiva.
+- `(template_id, id) INCLUDE (patient_id, score)` y `(patient_id, id)
+  INCLUDE (template_id, score)` (014): orden por id para el cursor y, sin
+  filtros por ítem, Index Only Scan (no toca la tabla).
+
+Un rango no es indexable en GIN, así que si la plantilla compilada conoce
+el dominio del ítem (boolean, choice, o scale con `min`/`max`/`step`) el
+rango se reescribe como OR de contenciones: `q7 >= 3` en una escala 0..4
+es `responses @> {"q7": 3} OR responses @> {"q7": 4}` (BitmapOr sobre el
+GIN). Sin dominio conocido se compara el valor numérico sin índice, dentro
+de la plantilla.
+
+`exists` y `ne` sobre ítems sin dominio conocido (number sin `step`, text)
+usan `responses ? 'q7'`, que `jsonb_path_ops` no indexa: también se
+resuelven recorriendo la plantilla. Si hicieran falta, un índice GIN con
+`jsonb_ops` los cubre a costa de un índice bastante más grande.
+
+Con filtros poco selectivos (p. ej. `q7 = 4`, 20% de los resultados) el
+planificador prefiere recorrer por id hacia atrás y filtrar hasta llenar la
+página: el GIN entra en juego (Bitmap Index Scan) cuando la combinación de
+filtros es selectiva. Planes medidos en benchmarks/bench_assessment_search.py.
+
+`/search/explain` devuelve el EXPLAIN (FORMAT JSON) de la misma consulta y
+un resumen: índices usados, si hay Seq Scan y si el acceso es index-only.
+"""
+import json
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import Float, and_, case, false, func, not_, or_, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from .assessment_scoring import CompiledTemplate, TemplateItem
+from ..models.assessment import AssessmentResult
+
+OPS = ("eq", "ne", "gt", "gte", "lt", "lte", "exists")
+MAX_ENUMERATED = 32            # valores como máximo en el OR de contenciones
+
+ERR_BAD_FILTER = "Invalid filter '{raw}': expected <item>:<op>[:<value>] with op in " + ", ".join(OPS)
+ERR_NEEDS_TEMPLATE = "Item filters require template_id"
+ERR_UNKNOWN_ITEM = "Unknown item '{item}' for this template"
+ERR_NOT_NUMERIC = "Operator '{op}' needs a numeric value"
+
+_COMPARE = {
+    "gt": lambda a, b: a > b, "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b, "lte": lambda a, b: a <= b,
+}
+
+
+@dataclass(frozen=True)
+class ItemFilter:
+    item: str
+    op: str
+    value: Any = None
+
+
+def parse_filter(raw: str) -> ItemFilter:
+    """`q7:gte:3` -> ItemFilter. El valor se lee como JSON (3, true, "a veces") o texto."""
+    item, _, rest = raw.partition(":")
+    op, _, value = rest.partition(":")
+    if not item or op not in OPS or (op != "exists" and value == ""):
+        raise ValueError(ERR_BAD_FILTER.format(raw=raw))
+    if op == "exists":
+        return ItemFilter(item, op)
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        parsed = value
+    if isinstance(parsed, (dict, list)) or parsed is None:
+        parsed = value
+    if op in _COMPARE and (isinstance(parsed, bool) or not isinstance(parsed, (int, float))):
+        raise ValueError(ERR_NOT_NUMERIC.format(op=op))
+    return ItemFilter(item, op, parsed)
+
+
+def _json_value(x: Any) -> Any:
+    return int(x) if isinstance(x, float) and x.is_integer() else x
+
+
+def item_domain(item: Optional[TemplateItem]) -> Optional[List[Any]]:
+    """Valores posibles de un ítem (como se guardan en `responses`), o None si no se conocen."""
+    if item is None:
+        return None
+    if item.kind == "boolean":
+        return [False, True]
+    if item.kind == "choice":
+        return [_json_value(v) for v in item.options]
+    if item.step is not None and item.hi is not None:
+        n = int(round((item.hi - item.lo) / item.step)) + 1
+        if n <= MAX_ENUMERATED:
+            return [_json_value(round(item.lo + k * item.step, 10)) for k in range(n)]
+    return None
+
+
+def _contains(item: str, value: Any):
+    return AssessmentResult.responses.contains({item: value})
+
+
+def item_condition(f: ItemFilter, item: Optional[TemplateItem]):
+    domain = item_domain(item)
+    if f.op == "eq":
+        return _contains(f.item, _json_value(f.value))
+    if f.op == "exists":
+        if domain is not None:
+            return or_(*(_contains(f.item, v) for v in domain))
+        return AssessmentResult.responses.has_key(f.item)
+    if f.op == "ne":
+        present = (or_(*(_contains(f.item, v) for v in domain)) if domain is not None
+                   else AssessmentResult.responses.has_key(f.item))
+        return and_(present, not_(_contains(f.item, _json_value(f.value))))
+
+    compare = _COMPARE[f.op]
+    if domain is not None:
+        # Rango -> contenciones sobre los valores del dominio que lo cumplen
+        matches = [v for v in domain if not isinstance(v, (bool, str)) and compare(v, f.value)]
+        return or_(*(_contains(f.item, v) for v in matches)) if matches else false()
+    node = AssessmentResult.responses[f.item]
+    number = case((func.jsonb_typeof(node) == "number", node.astext.cast(Float)))  # textos -> NULL, sin error
+    return compare(number, f.value)
+
+
+class ResultSearchParams:
+    """Dependencia con los filtros comunes de /results/search y /results/search/explain."""
+
+    def __init__(
+        self,
+        template_id: Optional[int] = Query(None),
+        where: List[str] = Query([], description="Filtros <ítem>:<op>[:<valor>], p. ej. q7:gte:3"),
+        score_min: Optional[int] = Query(None),
+        score_max: Optional[int] = Query(None),
+        patient_id: Optional[int] = Query(None),
+    ):
+        self.template_id = template_id
+        self.score_min = score_min
+        self.score_max = score_max
+        self.patient_id = patient_id
+        try:
+            self.filters = [parse_filter(w) for w in where]
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+        if self.filters and template_id is None:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=ERR_NEEDS_TEMPLATE)
+
+
+def search_statement(params: ResultSearchParams, compiled: Optional[CompiledTemplate], columns: list):
+    """SELECT `columns` con todos los filtros; el llamador aplica keyset/orden."""
+    stmt = select(*columns)
+    if params.template_id is not None:
+        stmt = stmt.where(AssessmentResult.template_id == params.template_id)
+    if params.patient_id is not None:
+        stmt = stmt.where(AssessmentResult.patient_id == params.patient_id)
+    if params.score_min is not None:
+        stmt = stmt.where(AssessmentResult.score >= params.score_min)
+    if params.score_max is not None:
+        stmt = stmt.where(AssessmentResult.score <= params.score_max)
+    items = compiled.by_id if compiled is not None and compiled.scorable else None
+    for f in params.filters:
+        if items is not None and f.item not in items:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail=ERR_UNKNOWN_ITEM.format(item=f.item))
+        stmt = stmt.where(item_condition(f, items.get(f.item) if items is not None else None))
+    return stmt
+
+
+# ---------- EXPLAIN ----------
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) de una sentencia, con sus parámetros ya enlazados."""
+    inherit_cache = False
+
+    def __init__(self, statement, analyze: bool = False):
+        self.statement = statement
+        self.analyze = analyze
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    opts = "ANALYZE, BUFFERS, FORMAT JSON" if element.analyze else "FORMAT JSON"
+    return f"EXPLAIN ({opts}) " + compiler.process(element.statement, **kw)
+
+
+def _nodes(node: dict) -> Iterator[dict]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from _nodes(child)
+
+
+def summarize_plan(raw: Any) -> dict:
+    """Resumen del plan: tipos de nodo, índices, Seq Scan e index-only sobre assessment_results."""
+    if isinstance(raw, str):  # asyncpg devuelve el JSON como texto
+        raw = json.loads(raw)
+    plan = raw[0]["Plan"]
+    nodes = list(_nodes(plan))
+    scans = [n for n in nodes if n.get("Relation Name") == "assessment_results" or "Index Name" in n]
+    return {
+        "node_types": [n["Node Type"] for n in nodes],
+        "indexes": sorted({n["Index Name"] for n in nodes if "Index Name" in n}),
+        "seq_scan": any(n["Node Type"] == "Seq Scan" for n in scans),
+        "index_only": bool(scans) and all(n["Node Type"] == "Index Only Scan" for n in scans),
+        "plan": raw,
+    }
@@ -10,6 +10,18 @@ class Settings(BaseSettings):
     DB_POOL_TIMEOUT: int = Field(default=30)    # 30 s
     SQLALCHEMY_ECHO: bool = Field(default=False)
 
+    # --- DB asíncrona (opt-in, asyncpg) ---
+    DB_ASYNC: bool = Field(default=False)
+    ASYNC_DATABASE_URL: Optional[str] = None   # por defecto: DATABASE_URL con +asyncpg
+    WEB_CONCURRENCY: int = Field(default=1)    # nº de workers de uvicorn/gunicorn
+    DB_MAX_CONNECTIONS: int = Field(default=90)  # presupuesto total de conexiones de la API (todos los pools)
+
+    # --- Réplica de lectura (opcional) ---
+    DATABASE_REPLICA_URL: Optional[str] = None
+    REPLICA_MAX_LAG_SECONDS: float = Field(default=5.0)     # más atraso -> se lee del primario
+    REPLICA_CHECK_INTERVAL_SECONDS: float = Field(default=5.0)
+    REPLICA_STICKY_SECONDS: int = Field(default=10)         # "read your writes" tras una mutación
+
     # --- JWT ---
     JWT_SECRET: str = Field(default="CHANGE_ME_SUPER_SECRET")
     JWT_ALG: str = Field(default="HS256")  # HS256 | HS384 | HS512 (según uses)
@@ -18,17 +30,116 @@ class Settings(BaseSettings):
     JWT_AUDIENCE: Optional[str] = None
     JWT_LEEWAY_SECONDS: int = Field(default=10)  # tolerancia de reloj
 
+    # --- Caché del usuario autenticado (get_current_user) ---
+    # Se invalida sola ante cambios vía ORM en este worker (instancias y update()/delete()
+    # sobre User). SQL crudo, otros workers u otros servicios no la invalidan: el TTL es el
+    # tiempo máximo que un cambio de rol o una baja tarda en verse. Mantenerlo corto.
+    AUTH_CACHE_TTL_SECONDS: int = Field(default=30)  # 0 = desactivada
+    AUTH_CACHE_MAX_ENTRIES: int = Field(default=10_000)
+
+    # --- Hashing de contraseñas ---
+    # Hilos dedicados a bcrypt (libera el GIL); 0 = auto (nº de CPUs, máx. 8)
+    PASSWORD_HASH_WORKERS: int = Field(default=0)
+
     # --- CORS ---
     # Acepta lista en .env tipo JSON: ["http://localhost:5173","https://app.tu-dominio.com"]
     # o una lista separada por comas: http://localhost:5173,https://app.tu-dominio.com
     CORS_ORIGINS: List[str] = Field(default_factory=lambda: ["*"])
 
+    # --- Tiempo real ---
+    # redis://host:6379/0 para compartir salas entre workers/contenedores; vacío = en proceso
+    REALTIME_BROKER_URL: Optional[str] = None
+    REALTIME_SEND_QUEUE_SIZE: int = Field(default=256)       # mensajes pendientes por conexión
+    REALTIME_SLOW_CONSUMER_POLICY: str = Field(default="drop_oldest")  # drop_oldest|drop_new|disconnect
+    REALTIME_SEND_TIMEOUT_SECONDS: float = Field(default=10.0)  # send que tarda más -> se cierra
+    # Agrupación en un frame (solo subprotocolos fonoapp.json / fonoapp.msgpack)
+    REALTIME_BATCH_WINDOW_MS: int = Field(default=10)
+    REALTIME_BATCH_MAX_MESSAGES: int = Field(default=64)
+    # Historial en memoria (chat) que recibe quien se conecta, y salas inactivas
+    REALTIME_HISTORY_MESSAGES: int = Field(default=50)           # por sala; 0 = sin historial
+    REALTIME_HISTORY_ROOM_BYTES: int = Field(default=64 * 1024)
+    REALTIME_HISTORY_TOTAL_BYTES: int = Field(default=32 * 1024 * 1024)  # por worker
+    REALTIME_ROOM_IDLE_SECONDS: int = Field(default=15 * 60)     # sin peers ni actividad -> se evicta
+    REALTIME_ROOM_SWEEP_SECONDS: int = Field(default=60)
+
+    # --- Subidas reanudables (/files/uploads) ---
+    UPLOAD_MAX_BYTES: int = Field(default=4 * 1024 ** 3)        # 4 GiB por archivo
+    UPLOAD_CHUNK_MAX_BYTES: int = Field(default=16 * 1024 ** 2)  # por PUT; < client_max_body_size de nginx
+    UPLOAD_SESSION_TTL_HOURS: int = Field(default=24)          # sin actividad -> se borra
+    UPLOAD_GC_INTERVAL_SECONDS: int = Field(default=3600)
+
+    # --- Servir media (/files/{id}/content) ---
+    MEDIA_URL_TTL_SECONDS: int = Field(default=3600)          # vida de las URLs firmadas
+    # Prefijo `internal` de nginx (p. ej. /_media/): la API valida y nginx envía con sendfile
+    MEDIA_ACCEL_REDIRECT_PREFIX: Optional[str] = None
+
+    # --- Derivados de media (miniaturas, picos de onda, audio comprimido) ---
+    DERIVATIVE_WORKERS: int = Field(default=2)           # procesos del pool (derivados + análisis) por worker web; 0 = desactivado
+    DERIVATIVE_QUEUE_SIZE: int = Field(default=256)      # pendientes; llena -> se descarta (job de recuperación)
+    DERIVATIVE_THUMB_SIZE: int = Field(default=320)      # px del lado mayor
+    DERIVATIVE_PEAKS_PER_SECOND: int = Field(default=20)
+    DERIVATIVE_AUDIO_BITRATE: str = Field(default="32k")  # Opus mono, voz
+    FFMPEG_BIN: str = Field(default="ffmpeg")
+    # Análisis acústico de WAV (core/acoustics.py); rango de búsqueda de F0, incluye voces infantiles
+    ACOUSTIC_F0_MIN_HZ: float = Field(default=75.0)
+    ACOUSTIC_F0_MAX_HZ: float = Field(default=600.0)
+
+    # --- Progreso de planes (GET /plans/{id}/progress) ---
+    PROGRESS_ROLLING_WINDOW: int = Field(default=4)          # sesiones en la media móvil por defecto
+    PROGRESS_CACHE_MAX_ENTRIES: int = Field(default=2048)    # por worker; 0 = sin caché
+
+    # --- Evaluaciones: plantillas compiladas (core/assessment_scoring.py) ---
+    ASSESSMENT_TEMPLATE_CACHE_SIZE: int = Field(default=256)  # por worker; 0 = sin caché
+
+    # --- Tablero de la clínica (GET /dashboard) ---
+    DASHBOARD_REFRESH_SECONDS: int = Field(default=300)      # refresco de las vistas materializadas; 0 = solo el job
+
+    # --- Paginación (keyset / cursor) ---
+    PAGE_DEFAULT_LIMIT: int = Field(default=100)
+    PAGE_MAX_LIMIT: int = Field(default=500)
+
     # --- Bootstrap Admin ---
     ADMIN_EMAIL: EmailStr = Field(default="admin@miapp.local")
     ADMIN_PASSWORD: SecretStr = Field(default=SecretStr("Admin#12345"))
     ADMIN_NAME: str = Field(default="Administrador")
     BOOTSTRAP_TOKEN: Optional[SecretStr] = None  # para endpoint /auth/bootstrap-admin (opcional)
 
+    @property
+    def async_database_url(self) -> str:
+        if self.ASYNC_DATABASE_URL:
+            return self.ASYNC_DATABASE_URL
+        scheme, _, rest = self.DATABASE_URL.partition("://")
+        return f"{scheme.split('+')[0]}+asyncpg://{rest}"
+
+    @property
+    def async_replica_url(self) -> Optional[str]:
+        if not self.DATABASE_REPLICA_URL:
+            return None
+        scheme, _, rest = self.DATABASE_REPLICA_URL.partition("://")
+        return f"{scheme.split('+')[0]}+asyncpg://{rest}"
+
+    def pool_limits(self, sync: bool) -> tuple[int, int]:
+        """
+        (pool_size, max_overflow) de un pool de este worker. DB_MAX_CONNECTIONS
+        es el presupuesto de toda la API: se reparte entre WEB_CONCURRENCY
+        workers y, dentro de cada uno, en partes iguales entre los pools que
+        existen (primario síncrono, primario async si DB_ASYNC, réplica si
+        DATABASE_REPLICA_URL). Los pools síncronos además respetan
+        DB_POOL_SIZE + DB_MAX_OVERFLOW como tope, y lo que no usan queda
+        para los async.
+        """
+        per_worker = max(2, self.DB_MAX_CONNECTIONS // max(1, self.WEB_CONCURRENCY))
+        replica = bool(self.DATABASE_REPLICA_URL)
+        pools = 1 + int(self.DB_ASYNC) + int(replica)
+        n_sync = 1 + int(replica and not self.DB_ASYNC)  # la réplica es async si DB_ASYNC
+        sync_total = min(max(2, per_worker // pools), self.DB_POOL_SIZE + self.DB_MAX_OVERFLOW)
+        if sync:
+            pool_size = min(self.DB_POOL_SIZE, sync_total)
+            return pool_size, sync_total - pool_size
+        total = max(2, (per_worker - n_sync * sync_total) // max(1, pools - n_sync))
+        pool_size = max(1, total // 2)
+        return pool_size, total - pool_size
+
     @validator("ACCESS_TOKEN_EXPIRE_MINUTES")
     def _positive_exp(cls, v: int) -> int:
         if v <= 0:
@@ -42,6 +153,13 @@ class Settings(BaseSettings):
             raise ValueError(f"JWT_ALG must be one of {allowed}")
         return v
 
+    @validator("REALTIME_SLOW_CONSUMER_POLICY")
+    def _allowed_slow_policy(cls, v: str) -> str:
+        allowed = {"drop_oldest", "drop_new", "disconnect"}
+        if v not in allowed:
+            raise ValueError(f"REALTIME_SLOW_CONSUMER_POLICY must be one of {allowed}")
+        return v
+
     @validator("CORS_ORIGINS", pre=True)
     def _parse_cors_origins(cls, v):
         # Permite JSON o lista separada por comas
@@ -0,0 +1,300 @@
+# backend/core/dashboard.py
+"""
+Tablero de la clínica (GET /dashboard) sobre vistas materializadas de Postgres.
+
+Las métricas salen de agregados precalculados, no de recorrer las tablas en
+cada petición: la lectura son cuatro SELECT sobre vistas pequeñas (una fila
+por terapeuta, semana o plantilla), independientes del volumen de pacientes.
+
+    mv_dashboard_totals      una fila: pacientes, planes activos, citas y tareas
+    mv_dashboard_therapists  por terapeuta: pacientes atendidos, planes activos
+                             de esos pacientes y resultado de sus citas
+    mv_dashboard_weekly      últimas DASHBOARD_WEEKS semanas: sesiones, citas,
+                             tareas vencidas y completadas
+    mv_dashboard_scores      por plantilla: n, media, cuartiles e histograma
+
+La cartera de un terapeuta son los pacientes con citas suyas en los últimos
+DASHBOARD_WINDOW_DAYS días o con una serie activa. Las tasas se calculan
+sobre citas ya pasadas de la ventana; `unresolved` son las que siguen
+`scheduled` después de su hora (inasistencias sin registrar, en la práctica).
+
+`refresh_views` las recalcula con REFRESH ... CONCURRENTLY (las lecturas no
+se bloquean) bajo un advisory lock: con varios workers, solo uno refresca
+por intervalo. La hora del último refresco queda en `dashboard_refreshes`
+y la respuesta la incluye para mostrar qué tan viejos son los datos.
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DDL, BigInteger, Column, DateTime, Float, Integer, MetaData, String, Table, event, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import Session
+
+from .database import Base
+from ..models.dashboard import DashboardRefresh
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_WINDOW_DAYS = 90
+DASHBOARD_WEEKS = 26
+SCORE_BUCKETS = 10
+REFRESH_LOCK_KEY = 4_611_023  # pg_try_advisory_xact_lock: un refresco a la vez en todo el clúster
+
+_WINDOW = f"interval '{DASHBOARD_WINDOW_DAYS} days'"
+# localtimestamp: las columnas son timestamp sin zona, igual que date_trunc() sobre ellas
+_FIRST_WEEK = f"date_trunc('week', localtimestamp) - interval '{DASHBOARD_WEEKS - 1} weeks'"
+
+VIEWS = {
+    "mv_dashboard_totals": f"""
+        SELECT 1 AS id,
+               (SELECT count(*) FROM patients WHERE deleted_at IS NULL) AS patients,
+               (SELECT count(*) FROM treatment_plans WHERE status = 'active') AS active_plans,
+               a.appointments, a.completed, a.canceled, a.no_show, a.unresolved,
+               t.assignments_due, t.assignments_done, t.assignments_overdue
+        FROM (
+            SELECT count(*) AS appointments,
+                   count(*) FILTER (WHERE status = 'completed') AS completed,
+                   count(*) FILTER (WHERE status = 'canceled') AS canceled,
+                   count(*) FILTER (WHERE status = 'no_show') AS no_show,
+                   count(*) FILTER (WHERE status = 'scheduled') AS unresolved
+            FROM appointments
+            WHERE starts_at >= now() - {_WINDOW} AND starts_at < now()
+        ) a,
+        (
+            SELECT count(*) FILTER (WHERE due_at >= now() - {_WINDOW}) AS assignments_due,
+                   count(*) FILTER (WHERE due_at >= now() - {_WINDOW} AND status = 'done') AS assignments_done,
+                   count(*) FILTER (WHERE status <> 'done') AS assignments_overdue
+            FROM assignments
+            WHERE due_at < now()
+        ) t
+    """,
+    "mv_dashboard_therapists": f"""
+        WITH caseload AS (
+            SELECT therapist_id, patient_id FROM appointments
+            WHERE therapist_id IS NOT NULL AND starts_at >= now() - {_WINDOW}
+            UNION
+            SELECT therapist_id, patient_id FROM appointment_series
+            WHERE therapist_id IS NOT NULL AND status = 'active'
+        ),
+        load AS (
+            SELECT c.therapist_id,
+                   count(DISTINCT c.patient_id) AS caseload,
+                   count(p.id) AS active_plans
+            FROM caseload c
+            LEFT JOIN treatment_plans p ON p.patient_id = c.patient_id AND p.status = 'active'
+            GROUP BY c.therapist_id
+        ),
+        visits AS (
+            SELECT therapist_id,
+                   count(*) AS appointments,
+                   count(*) FILTER (WHERE status = 'completed') AS completed,
+                   count(*) FILTER (WHERE status = 'canceled') AS canceled,
+                   count(*) FILTER (WHERE status = 'no_show') AS no_show,
+                   count(*) FILTER (WHERE status = 'scheduled') AS unresolved
+            FROM appointments
+            WHERE therapist_id IS NOT NULL AND starts_at >= now() - {_WINDOW} AND starts_at < now()
+            GROUP BY therapist_id
+        )
+        SELECT u.id AS therapist_id, u.full_name,
+               coalesce(l.caseload, 0) AS caseload, coalesce(l.active_plans, 0) AS active_plans,
+               coalesce(v.appointments, 0) AS appointments, coalesce(v.completed, 0) AS completed,
+               coalesce(v.canceled, 0) AS canceled, coalesce(v.no_show, 0) AS no_show,
+               coalesce(v.unresolved, 0) AS unresolved
+        FROM users u
+        LEFT JOIN load l ON l.therapist_id = u.id
+        LEFT JOIN visits v ON v.therapist_id = u.id
+        WHERE u.role = 'therapist' OR l.therapist_id IS NOT NULL OR v.therapist_id IS NOT NULL
+    """,
+    "mv_dashboard_weekly": f"""
+        WITH weeks AS (
+            SELECT generate_series({_FIRST_WEEK}, date_trunc('week', localtimestamp), interval '1 week') AS week
+        ),
+        logs AS (
+            SELECT date_trunc('week', l.date) AS week, count(*) AS sessions,
+                   count(DISTINCT p.patient_id) AS patients
+            FROM session_logs l JOIN treatment_plans p ON p.id = l.plan_id
+            WHERE l.date >= {_FIRST_WEEK}
+            GROUP BY 1
+        ),
+        appts AS (
+            SELECT date_trunc('week', starts_at) AS week, count(*) AS appointments,
+                   count(*) FILTER (WHERE status = 'completed') AS completed,
+                   count(*) FILTER (WHERE status = 'canceled') AS canceled,
+                   count(*) FILTER (WHERE status = 'no_show') AS no_show
+            FROM appointments
+            WHERE starts_at >= {_FIRST_WEEK} AND starts_at < now()
+            GROUP BY 1
+        ),
+        tasks AS (
+            SELECT date_trunc('week', due_at) AS week, count(*) AS assignments_due,
+                   count(*) FILTER (WHERE status = 'done') AS assignments_done
+            FROM assignments
+            WHERE due_at >= {_FIRST_WEEK} AND due_at < now()
+            GROUP BY 1
+        )
+        SELECT w.week,
+               coalesce(l.sessions, 0) AS sessions, coalesce(l.patients, 0) AS patients,
+               coalesce(a.appointments, 0) AS appointments, coalesce(a.completed, 0) AS completed,
+               coalesce(a.canceled, 0) AS canceled, coalesce(a.no_show, 0) AS no_show,
+               coalesce(t.assignments_due, 0) AS assignments_due,
+               coalesce(t.assignments_done, 0) AS assignments_done
+        FROM weeks w
+        LEFT JOIN logs l USING (week)
+        LEFT JOIN appts a USING (week)
+        LEFT JOIN tasks t USING (week)
+    """,
+    "mv_dashboard_scores": f"""
+        WITH stats AS (
+            SELECT template_id, count(*) AS n,
+                   avg(score)::float8 AS mean, stddev_samp(score)::float8 AS sd,
+                   min(score) AS min_score, max(score) AS max_score,
+                   percentile_cont(ARRAY[0.25, 0.5, 0.75]) WITHIN GROUP (ORDER BY score) AS quartiles
+            FROM assessment_results
+            WHERE score IS NOT NULL
+            GROUP BY template_id
+        ),
+        buckets AS (
+            -- {SCORE_BUCKETS} intervalos iguales en [min, max + 1)
+            SELECT r.template_id,
+                   width_bucket(r.score::float8, s.min_score::float8, (s.max_score + 1)::float8, {SCORE_BUCKETS}) AS bucket,
+                   count(*) AS c
+            FROM assessment_results r JOIN stats s USING (template_id)
+            WHERE r.score IS NOT NULL
+            GROUP BY 1, 2
+        )
+        SELECT s.template_id, t.name, s.n, s.mean, s.sd, s.min_score, s.max_score,
+               s.quartiles[1] AS p25, s.quartiles[2] AS median, s.quartiles[3] AS p75,
+               ARRAY(
+                   SELECT coalesce(b.c, 0)
+                   FROM generate_series(1, {SCORE_BUCKETS}) g
+                   LEFT JOIN buckets b ON b.template_id = s.template_id AND b.bucket = g
+                   ORDER BY g
+               ) AS histogram
+        FROM stats s JOIN assessment_templates t ON t.id = s.template_id
+    """,
+}
+# REFRESH ... CONCURRENTLY exige un índice único por vista
+VIEW_KEYS = {
+    "mv_dashboard_totals": "id",
+    "mv_dashboard_therapists": "therapist_id",
+    "mv_dashboard_weekly": "week",
+    "mv_dashboard_scores": "template_id",
+}
+
+
+def create_view_statements() -> list:
+    out = []
+    for name, body in VIEWS.items():
+        out.append(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {body.strip()}")
+        out.append(f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{name} ON {name} ({VIEW_KEYS[name]})")
+    return out
+
+
+# init_db (create_all) en Postgres; en BDs existentes: backend/migrations/010_dashboard_views.sql
+for _stmt in create_view_statements():
+    event.listen(Base.metadata, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
+
+
+# Vistas como tablas de solo lectura (MetaData propia: create_all no las toca)
+_views = MetaData()
+totals_view = Table(
+    "mv_dashboard_totals", _views,
+    Column("id", Integer, primary_key=True),
+    *(Column(c, BigInteger) for c in (
+        "patients", "active_plans", "appointments", "completed", "canceled", "no_show", "unresolved",
+        "assignments_due", "assignments_done", "assignments_overdue",
+    )),
+)
+therapists_view = Table(
+    "mv_dashboard_therapists", _views,
+    Column("therapist_id", Integer, primary_key=True),
+    Column("full_name", String),
+    *(Column(c, BigInteger) for c in (
+        "caseload", "active_plans", "appointments", "completed", "canceled", "no_show", "unresolved",
+    )),
+)
+weekly_view = Table(
+    "mv_dashboard_weekly", _views,
+    Column("week", DateTime, primary_key=True),
+    *(Column(c, BigInteger) for c in (
+        "sessions", "patients", "appointments", "completed", "canceled", "no_show",
+        "assignments_due", "assignments_done",
+    )),
+)
+scores_view = Table(
+    "mv_dashboard_scores", _views,
+    Column("template_id", Integer, primary_key=True),
+    Column("name", String),
+    Column("n", BigInteger),
+    Column("mean", Float), Column("sd", Float),
+    Column("min_score", Integer), Column("max_score", Integer),
+    Column("p25", Float), Column("median", Float), Column("p75", Float),
+    Column("histogram", ARRAY(BigInteger)),
+)
+
+
+# ---------------- Refresco ----------------
+def refresh_views(db: Session, max_age_seconds: Optional[float] = None) -> bool:
+    """
+    Refresca todas las vistas en una transacción. Devuelve False si otro
+    proceso está refrescando o si el último refresco tiene menos de
+    `max_age_seconds` (varios workers con el mismo intervalo no se duplican).
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    if not db.execute(select(func.pg_try_advisory_xact_lock(REFRESH_LOCK_KEY))).scalar():
+        db.rollback()
+        return False
+    if max_age_seconds is not None:
+        age = db.execute(
+            select(func.extract("epoch", func.now() - func.min(DashboardRefresh.refreshed_at)))
+            .where(DashboardRefresh.view_name.in_(list(VIEWS)))
+        ).scalar()
+        if age is not None and age < max_age_seconds:
+            db.rollback()
+            return False
+    for name in VIEWS:
+        t0 = time.perf_counter()
+        db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+        elapsed = int((time.perf_counter() - t0) * 1000)
+        stmt = pg_insert(DashboardRefresh).values(view_name=name, refreshed_at=func.now(), duration_ms=elapsed)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[DashboardRefresh.view_name],
+            set_={"refreshed_at": stmt.excluded.refreshed_at, "duration_ms": stmt.excluded.duration_ms},
+        ))
+        logger.debug("Refreshed %s in %d ms", name, elapsed)
+    db.commit()
+    return True
+
+
+# ---------------- Lectura ----------------
+def rate(part: int, whole: int) -> Optional[float]:
+    return round(part / whole, 4) if whole else None
+
+
+def score_edges(min_score: Optional[int], max_score: Optional[int]) -> list:
+    """Bordes de los SCORE_BUCKETS intervalos del histograma (mismo cálculo que width_bucket)."""
+    if min_score is None or max_score is None:
+        return []
+    width = (max_score + 1 - min_score) / SCORE_BUCKETS
+    return [round(min_score + i * width, 4) for i in range(SCORE_BUCKETS + 1)]
+
+
+def appointment_rates(row) -> dict:
+    past = row.appointments
+    return {
+        "completion_rate": rate(row.completed, past),
+        "cancel_rate": rate(row.canceled, past),
+        "no_show_rate": rate(row.no_show, past),
+        "unresolved_rate": rate(row.unresolved, past),
+    }
+
+
+def staleness(refreshed_at: Optional[datetime], now: datetime) -> Optional[float]:
+    if refreshed_at is None:
+        return None
+    if refreshed_at.tzinfo is None:
+        now = now.replace(tzinfo=None)
+    return round(max((now - refreshed_at).total_seconds(), 0.0), 1)
@@ -1,12 +1,21 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Union
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.concurrency import run_in_threadpool
 from .config import settings
 
+# Todos los pools (síncrono, async y réplica) salen de DB_MAX_CONNECTIONS: ver Settings.pool_limits
+_sync_pool_size, _sync_max_overflow = settings.pool_limits(sync=True)
+
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,                  # detecta conexiones rotas
-    pool_size=settings.DB_POOL_SIZE,     # tamaño del pool
-    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_size=_sync_pool_size,           # tamaño del pool
+    max_overflow=_sync_max_overflow,
     pool_recycle=settings.DB_POOL_RECYCLE,  # recicla conexiones viejas (seg)
     pool_timeout=settings.DB_POOL_TIMEOUT,  # espera por conexión (seg)
     echo=settings.SQLALCHEMY_ECHO,       # útil en dev
@@ -29,3 +38,112 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# ---------------- Modo asíncrono (opt-in: DB_ASYNC=true) ----------------
+# Los endpoints "calientes" son `async def` y usan `get_async_db` + los helpers
+# `db_*` de abajo. Con DB_ASYNC=true reciben un AsyncSession (asyncpg) y no
+# ocupan hilos; con DB_ASYNC=false reciben la Session síncrona de siempre y
+# los helpers la ejecutan en el threadpool, así el código del endpoint es único.
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.DB_ASYNC:
+    # Pool derivado del nº de workers: DB_MAX_CONNECTIONS se reparte entre procesos y pools
+    _pool_size, _max_overflow = settings.pool_limits(sync=False)
+    async_engine = create_async_engine(
+        settings.async_database_url,
+        pool_pre_ping=True,
+        pool_size=_pool_size,
+        max_overflow=_max_overflow,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        echo=settings.SQLALCHEMY_ECHO,
+    )
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+AnySession = Union[Session, AsyncSession]
+
+@asynccontextmanager
+async def open_session(async_factory, sync_factory) -> AsyncIterator[AnySession]:
+    """Abre AsyncSession si hay fábrica async; si no, una Session síncrona."""
+    if async_factory is not None:
+        async with async_factory() as db:
+            yield db
+        return
+    db = sync_factory()
+    try:
+        yield db
+    finally:
+        await run_in_threadpool(db.close)
+
+async def get_async_db() -> AsyncIterator[AnySession]:
+    async with open_session(AsyncSessionLocal, SessionLocal) as db:
+        yield db
+
+def _is_async(db: AnySession) -> bool:
+    return isinstance(db, AsyncSession)
+
+# Sesiones de la réplica (core/replica.py) llevan en `info` un respaldo: si la
+# PRIMERA consulta falla por conexión, db_execute/db_get la repiten en el
+# primario y el resto de la petición sigue allí.
+READ_FAILOVER_KEY = "read_failover"
+_CONNECTION_ERRORS = (OperationalError, InterfaceError, OSError)
+
+async def _with_failover(db: AnySession, call):
+    failover = db.info.get(READ_FAILOVER_KEY)
+    if failover is None:
+        return await call(db)
+    if failover.session is not None:
+        return await call(failover.session)
+    try:
+        result = await call(db)
+    except _CONNECTION_ERRORS as exc:
+        if failover.used:
+            raise
+        return await call(await failover.switch(exc))
+    failover.used = True
+    return result
+
+async def _execute(db: AnySession, stmt, *args, **kwargs):
+    if _is_async(db):
+        return await db.execute(stmt, *args, **kwargs)
+    return await run_in_threadpool(db.execute, stmt, *args, **kwargs)
+
+async def _get(db: AnySession, model, ident):
+    if _is_async(db):
+        return await db.get(model, ident)
+    return await run_in_threadpool(db.get, model, ident)
+
+async def db_execute(db: AnySession, stmt, *args, **kwargs):
+    return await _with_failover(db, lambda s: _execute(s, stmt, *args, **kwargs))
+
+async def db_get(db: AnySession, model, ident):
+    return await _with_failover(db, lambda s: _get(s, model, ident))
+
+async def db_commit(db: AnySession) -> None:
+    if _is_async(db):
+        await db.commit()
+    else:
+        await run_in_threadpool(db.commit)
+
+async def db_rollback(db: AnySession) -> None:
+    if _is_async(db):
+        await db.rollback()
+    else:
+        await run_in_threadpool(db.rollback)
+
+async def db_refresh(db: AnySession, obj) -> None:
+    if _is_async(db):
+        await db.refresh(obj)
+    else:
+        await run_in_threadpool(db.refresh, obj)
+
+async def db_delete(db: AnySession, obj) -> None:
+    if _is_async(db):
+        await db.delete(obj)
+    else:
+        await run_in_threadpool(db.delete, obj)
@@ -1,26 +1,43 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from ..core.security import decode_token
-from ..core.database import get_db
+from ..core.database import AsyncSessionLocal, SessionLocal, db_execute, open_session
+from ..core.principal_cache import principal_cache
 from ..models.user import User
 
 # Si tu endpoint real es /auth/login, perfecto:
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", scheme_name="JWT")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def authenticate(token: str) -> User:
+    """
+    Usuario del token (instancia desacoplada, solo lectura). Corre en el event
+    loop: con DB_ASYNC=true la consulta va por asyncpg y no ocupa hilos, y la
+    sesión se abre solo si la caché no tiene el token.
+    """
+    # Token ya verificado y usuario resuelto recientemente: sin JWT decode ni SELECT
+    cached = principal_cache.get(token)
+    if cached is not None:
+        return cached
+
     payload = decode_token(token)
     if not payload or "sub" not in payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
-    user = db.query(User).filter(User.email == payload["sub"]).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    # Opcional: aplica más checks de seguridad si tu modelo los tiene
-    # if getattr(user, "is_active", True) is False: ...
+    async with open_session(AsyncSessionLocal, SessionLocal) as db:
+        user = (await db_execute(db, select(User).where(User.email == payload["sub"]))).scalars().first()
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        # Opcional: aplica más checks de seguridad si tu modelo los tiene
+        # if getattr(user, "is_active", True) is False: ...
+        db.expunge(user)
+    principal_cache.put(token, payload, user)
     return user
 
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    return await authenticate(token)
+
 def require_roles(*allowed: str):
-    def checker(user: User = Depends(get_current_user)):
+    async def checker(user: User = Depends(get_current_user)):
         # Soporta múltiples roles; fácil de extender a scopes
         if user.role not in allowed:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient role")
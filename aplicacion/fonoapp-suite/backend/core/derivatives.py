@@ -0,0 +1,167 @@
+# backend/core/derivatives.py
+"""
+Derivados de media generados fuera del proceso web (ProcessPool, ver
+core/media_pipeline.py). Este módulo no importa la app: el pool arranca con
+"spawn" y cada worker solo necesita estas funciones.
+
+Por blob `<sha256><ext>` se escriben, en el mismo directorio:
+
+- `<sha256>.thumb.webp`  miniatura (imágenes; requiere Pillow).
+- `<sha256>.peaks`       picos de forma de onda (audio/video), formato abajo.
+- `<sha256>.speech.ogg`  versión Opus mono de baja tasa (wav/webm/mp4; requiere ffmpeg).
+
+Formato `.peaks` (little-endian), pensado para dibujar sin decodificar audio:
+
+    b"PEAK" | u8 versión=1 | u8 bits=8 | u16 reservado | u32 sample_rate
+    | u32 samples_per_point | u32 n_puntos | n_puntos × (i8 min, i8 max)
+
+Sin Pillow/ffmpeg el derivado correspondiente simplemente no se genera.
+"""
+import shutil
+import struct
+import subprocess
+import wave
+from pathlib import Path
+from typing import Callable, List, Optional
+
+IMAGE_EXTS = {".png", ".jpg", ".jpeg"}
+AUDIO_EXTS = {".wav", ".mp3", ".webm", ".mp4"}
+RENDITION_EXTS = {".wav", ".webm", ".mp4"}  # mp3 ya viene comprimido
+
+PEAKS_MAGIC = b"PEAK"
+PEAKS_HEADER = struct.Struct("<4sBBHIII")
+DECODE_RATE = 8000            # Hz; de sobra para dibujar una forma de onda de voz
+READ_FRAMES = 1 << 16
+
+
+def _out(src: Path, sha256: str, suffix: str) -> Path:
+    return src.with_name(f"{sha256}{suffix}")
+
+
+def _entry(kind: str, path: Path, content_type: str, **meta) -> dict:
+    return {
+        "kind": kind,
+        "file": path.name,
+        "content_type": content_type,
+        "size_bytes": path.stat().st_size,
+        "meta": meta or None,
+    }
+
+
+# ---------- Miniaturas ----------
+def make_thumbnail(src: Path, dst: Path, size: int) -> Optional[dict]:
+    try:
+        from PIL import Image
+    except ImportError:  # dependencia opcional
+        return None
+    with Image.open(src) as img:
+        img.thumbnail((size, size))
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGB")
+        img.save(dst, "WEBP", quality=80, method=4)
+        width, height = img.size
+    return _entry("thumbnail", dst, "image/webp", width=width, height=height)
+
+
+# ---------- Picos de forma de onda ----------
+def _peaks_from_reader(read: Callable[[int], bytes], sampwidth: int, channels: int,
+                       rate: int, spp: int) -> bytes:
+    """Min/max por bloque de `spp` muestras (mono), leyendo por trozos: memoria acotada."""
+    import numpy as np
+
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}.get(sampwidth)
+    if dtype is None:
+        raise ValueError(f"Unsupported sample width: {sampwidth}")
+    frame_bytes = sampwidth * channels
+    block = spp * max(1, READ_FRAMES // spp)  # múltiplo de spp: los puntos no cruzan lecturas
+    points: List[np.ndarray] = []
+    while True:
+        raw = read(block * frame_bytes)
+        usable = len(raw) - len(raw) % frame_bytes
+        if usable <= 0:
+            break
+        x = np.frombuffer(raw[:usable], dtype=dtype).reshape(-1, channels)
+        if sampwidth == 1:
+            x = x.astype(np.int16) - 128
+            scale = 1 / 128
+        else:
+            scale = 1 / float(np.iinfo(dtype).max)
+        mono = x.mean(axis=1) * scale  # [-1, 1]
+        pad = (-len(mono)) % spp
+        if pad:
+            mono = np.concatenate([mono, np.zeros(pad)])
+        frames = mono.reshape(-1, spp)
+        pair = np.stack([frames.min(axis=1), frames.max(axis=1)], axis=1)
+        points.append(np.clip(np.round(pair * 127), -128, 127).astype(np.int8))
+    data = np.concatenate(points) if points else np.zeros((0, 2), dtype=np.int8)
+    header = PEAKS_HEADER.pack(PEAKS_MAGIC, 1, 8, 0, rate, spp, len(data))
+    return header + data.tobytes()
+
+
+def _ffmpeg_pcm(src: Path, ffmpeg: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [ffmpeg, "-v", "error", "-i", str(src), "-vn", "-ac", "1", "-ar", str(DECODE_RATE),
+         "-f", "s16le", "-"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def make_peaks(src: Path, dst: Path, points_per_second: int, ffmpeg: Optional[str]) -> Optional[dict]:
+    if ffmpeg:
+        proc = _ffmpeg_pcm(src, ffmpeg)
+        spp = max(1, DECODE_RATE // points_per_second)
+        try:
+            payload = _peaks_from_reader(proc.stdout.read, 2, 1, DECODE_RATE, spp)
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+        if returncode != 0:  # sin pista de audio, formato dañado...
+            return None
+        rate = DECODE_RATE
+    elif src.suffix.lower() == ".wav":
+        with wave.open(str(src), "rb") as wav:
+            rate, width, channels = wav.getframerate(), wav.getsampwidth(), wav.getnchannels()
+            spp = max(1, rate // points_per_second)
+            payload = _peaks_from_reader(
+                lambda n: wav.readframes(n // (width * channels)), width, channels, rate, spp,
+            )
+    else:
+        return None
+    dst.write_bytes(payload)
+    n_points = (len(payload) - PEAKS_HEADER.size) // 2
+    return _entry("peaks", dst, "application/octet-stream",
+                  points_per_second=rate / spp, duration=round(n_points * spp / rate, 3))
+
+
+# ---------- Versión comprimida ----------
+def make_speech_rendition(src: Path, dst: Path, bitrate: str, ffmpeg: Optional[str]) -> Optional[dict]:
+    if not ffmpeg:
+        return None
+    result = subprocess.run(
+        [ffmpeg, "-v", "error", "-y", "-i", str(src), "-vn", "-ac", "1", "-c:a", "libopus",
+         "-b:a", bitrate, "-application", "voip", str(dst)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    if result.returncode != 0:
+        dst.unlink(missing_ok=True)
+        return None
+    return _entry("audio", dst, "audio/ogg", bitrate=bitrate)
+
+
+def build_derivatives(src: str, sha256: str, ext: str, *, thumb_size: int = 320,
+                      points_per_second: int = 20, audio_bitrate: str = "32k",
+                      ffmpeg_bin: str = "ffmpeg") -> List[dict]:
+    """Punto de entrada del worker. Devuelve los derivados generados (puede ser vacío)."""
+    path = Path(src)
+    ext = ext.lower()
+    ffmpeg = shutil.which(ffmpeg_bin)
+    made: List[Optional[dict]] = []
+    if ext in IMAGE_EXTS:
+        made.append(make_thumbnail(path, _out(path, sha256, ".thumb.webp"), thumb_size))
+    if ext in AUDIO_EXTS:
+        made.append(make_peaks(path, _out(path, sha256, ".peaks"), points_per_second, ffmpeg))
+    if ext in RENDITION_EXTS:
+        made.append(make_speech_rendition(path, _out(path, sha256, ".speech.ogg"), audio_bitrate, ffmpeg))
+    return [m for m in made if m is not None]
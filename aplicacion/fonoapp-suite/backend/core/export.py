@@ -0,0 +1,197 @@
+# backend/core/export.py
+"""
+Exportación completa de la historia clínica de un paciente (alta, derivación).
+
+Pipeline de generadores, todos síncronos: StreamingResponse los itera en el
+threadpool y el cliente recibe los primeros bytes sin esperar al final.
+
+    patient_records(db, id)   -> (tipo, fila ORM)      cursores del servidor
+    ndjson_lines(records)     -> bytes, una línea por registro
+    coalesce(lines)           -> trozos de ~EXPORT_CHUNK_BYTES
+    zip_stream(lines, media)  -> ZIP con record.ndjson + media/ (opcional)
+
+Memoria constante: cada colección es UNA consulta leída con `yield_per`
+(cursor con nombre en psycopg2; la sesión no retiene las filas ya
+emitidas) y los archivos se copian al ZIP por bloques. Todo corre en una
+transacción REPEATABLE READ de solo lectura, así que las colecciones son
+coherentes entre sí aunque haya escrituras durante la descarga.
+
+Formato NDJSON: `{"type": "...", "data": {...}}` por línea, con los mismos
+esquemas que la API. Empieza con `export` y termina con `end` (conteos
+por tipo: si falta `end`, la descarga se cortó).
+"""
+import json
+import zipfile
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .storage import resolve_media_path
+from ..models.acoustics import AcousticAnalysis
+from ..models.appointment import Appointment
+from ..models.assessment import AssessmentResult, AssessmentTemplate
+from ..models.assignment import Assignment
+from ..models.file import MediaFile
+from ..models.patient import Patient
+from ..models.plan import SessionLog, TreatmentPlan
+from ..schemas.appointment import AppointmentOut
+from ..schemas.assessment import AssessmentResultOut, AssessmentTemplateOut
+from ..schemas.assignment import AssignmentOut
+from ..schemas.file import AcousticAnalysisSummaryOut, MediaFileOut
+from ..schemas.patient import PatientOut
+from ..schemas.plan import SessionLogOut, TreatmentPlanOut
+
+EXPORT_VERSION = 1
+YIELD_PER = 500                 # filas por viaje al cursor del servidor
+EXPORT_CHUNK_BYTES = 64 * 1024
+MEDIA_READ_BLOCK = 1024 * 1024
+
+# tipo de registro -> esquema de salida
+SCHEMAS = {
+    "patient": PatientOut,
+    "plan": TreatmentPlanOut,
+    "session_log": SessionLogOut,
+    "assessment_template": AssessmentTemplateOut,
+    "assessment_result": AssessmentResultOut,
+    "assignment": AssignmentOut,
+    "appointment": AppointmentOut,
+    "media_file": MediaFileOut,
+    "acoustic_analysis": AcousticAnalysisSummaryOut,
+}
+
+
+def begin_snapshot(db: Session) -> None:
+    """Transacción de solo lectura con una única instantánea para todas las consultas."""
+    if db.get_bind().dialect.name == "postgresql":
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ", "postgresql_readonly": True})
+
+
+def _stream(db: Session, stmt) -> Iterator:
+    return iter(db.scalars(stmt.execution_options(yield_per=YIELD_PER)))
+
+
+def patient_records(db: Session, patient_id: int) -> Iterator[Tuple[str, object]]:
+    """Registros del paciente; una consulta por colección, sin N+1."""
+    patient = db.get(Patient, patient_id)
+    if patient is None:
+        return
+    yield "patient", patient
+
+    plan_ids = select(TreatmentPlan.id).where(TreatmentPlan.patient_id == patient_id)
+    yield from (("plan", p) for p in _stream(
+        db, select(TreatmentPlan).where(TreatmentPlan.patient_id == patient_id).order_by(TreatmentPlan.id)))
+    # Todas las sesiones de todos los planes en una consulta (no una por plan)
+    yield from (("session_log", s) for s in _stream(
+        db, select(SessionLog).where(SessionLog.plan_id.in_(plan_ids)).order_by(SessionLog.plan_id, SessionLog.id)))
+
+    template_ids = select(AssessmentResult.template_id).where(AssessmentResult.patient_id == patient_id)
+    yield from (("assessment_template", t) for t in _stream(
+        db, select(AssessmentTemplate).where(AssessmentTemplate.id.in_(template_ids)).order_by(AssessmentTemplate.id)))
+    yield from (("assessment_result", r) for r in _stream(
+        db, select(AssessmentResult).where(AssessmentResult.patient_id == patient_id).order_by(AssessmentResult.id)))
+
+    yield from (("assignment", a) for a in _stream(
+        db, select(Assignment).where(Assignment.patient_id == patient_id).order_by(Assignment.id)))
+    yield from (("appointment", a) for a in _stream(
+        db, select(Appointment).where(Appointment.patient_id == patient_id).order_by(Appointment.starts_at, Appointment.id)))
+    # MediaFile.derivatives es selectin: una consulta extra por lote de YIELD_PER
+    yield from (("media_file", m) for m in _stream(
+        db, select(MediaFile).where(MediaFile.patient_id == patient_id).order_by(MediaFile.id)))
+    yield from (("acoustic_analysis", a) for a in _stream(
+        db, select(AcousticAnalysis).where(AcousticAnalysis.patient_id == patient_id).order_by(AcousticAnalysis.id)))
+
+
+def ndjson_lines(patient_id: int, records: Iterable[Tuple[str, object]]) -> Iterator[bytes]:
+    counts: dict = {}
+    header = {"version": EXPORT_VERSION, "patient_id": patient_id,
+              "generated_at": datetime.now(timezone.utc).isoformat()}
+    yield _line("export", json.dumps(header))
+    for kind, obj in records:
+        counts[kind] = counts.get(kind, 0) + 1
+        yield _line(kind, SCHEMAS[kind].from_orm(obj).json(by_alias=True, ensure_ascii=False))
+    yield _line("end", json.dumps({"counts": counts}))
+
+
+def _line(kind: str, data_json: str) -> bytes:
+    # El payload ya viene serializado: se envuelve sin volver a parsearlo
+    return f'{{"type":"{kind}","data":{data_json}}}\n'.encode()
+
+
+def coalesce(chunks: Iterable[bytes], size: int = EXPORT_CHUNK_BYTES) -> Iterator[bytes]:
+    """Agrupa líneas pequeñas en trozos de ~`size` (menos escrituras al socket)."""
+    buf = bytearray()
+    for chunk in chunks:
+        buf += chunk
+        if len(buf) >= size:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+
+def media_entries(db: Session, patient_id: int) -> Iterator[Tuple[str, object]]:
+    """(nombre en el ZIP, ruta en disco) de los archivos del paciente que existen."""
+    stmt = (
+        select(MediaFile.id, MediaFile.path, MediaFile.original_name)
+        .where(MediaFile.patient_id == patient_id)
+        .order_by(MediaFile.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    for row in db.execute(stmt):
+        path = resolve_media_path(row.path)
+        if path is None or not path.is_file():
+            continue
+        name = (row.original_name or path.name).replace("/", "_").replace("\\", "_")
+        yield f"media/{row.id}_{name}", path
+
+
+class _Sink:
+    """Destino no posicionable para ZipFile: acumula lo escrito hasta que se drena."""
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.offset = 0
+
+    def write(self, data) -> int:
+        self.buf += data
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> Optional[bytes]:
+        if not self.buf:
+            return None
+        out = bytes(self.buf)
+        self.buf.clear()
+        return out
+
+
+def zip_stream(lines: Iterable[bytes], media: Iterable[Tuple[str, object]]) -> Iterator[bytes]:
+    """
+    ZIP generado al vuelo (descriptores de datos, ZIP64): primero
+    `record.ndjson` comprimido y luego los archivos sin recomprimir.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        info = zipfile.ZipInfo("record.ndjson", date_time=datetime.now().timetuple()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with zf.open(info, "w", force_zip64=True) as entry:
+            for chunk in coalesce(lines):
+                entry.write(chunk)
+                if (out := sink.drain()) is not None:
+                    yield out
+        for arcname, path in media:
+            with open(path, "rb") as src, zf.open(arcname, "w", force_zip64=True) as entry:
+                while block := src.read(MEDIA_READ_BLOCK):
+                    entry.write(block)
+                    if (out := sink.drain()) is not None:
+                        yield out
+    if (out := sink.drain()) is not None:  # directorio central
+        yield out
@@ -0,0 +1,165 @@
+# backend/core/media.py
+"""
+Respuestas HTTP para servir archivos de MediaFile: validadores (ETag /
+Last-Modified), GET condicional y peticiones por rango (RFC 9110).
+
+- ETag fuerte = sha256 del contenido (los blobs son inmutables); archivos
+  sin hash (previos al backfill) usan un ETag débil de mtime+tamaño.
+- `If-None-Match` / `If-Modified-Since` -> 304.
+- `Range: bytes=a-b | a- | -n` (un solo rango) -> 206; `If-Range` que no
+  coincide -> 200 completo; rango imposible -> 416. Varios rangos se
+  responden con el archivo completo (permitido por la RFC).
+- Con `accel_prefix` (nginx) la API solo valida y delega el envío con
+  `X-Accel-Redirect`: nginx hace sendfile (zero-copy) y los rangos.
+"""
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+READ_BLOCK = 256 * 1024
+IMMUTABLE_CACHE = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE = "private, no-cache"
+
+
+@dataclass
+class MediaInfo:
+    path: Path
+    size: int
+    mtime: float
+    etag: str
+    content_type: str
+    filename: Optional[str] = None
+    immutable: bool = False
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.mtime, usegmt=True)
+
+
+def make_etag(sha256: Optional[str], size: int, mtime: float) -> str:
+    if sha256:
+        return f'"{sha256}"'
+    return f'W/"{int(mtime):x}-{size:x}"'
+
+
+def _etag_matches(header: str, etag: str, weak: bool) -> bool:
+    if header.strip() == "*":
+        return True
+    tags = [t.strip() for t in header.split(",")]
+    if weak:  # If-None-Match: comparación débil
+        bare = etag.removeprefix("W/")
+        return any(t.removeprefix("W/") == bare for t in tags)
+    return not etag.startswith("W/") and etag in tags
+
+
+def _not_modified_since(header: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(mtime) <= since
+
+
+def is_not_modified(request: Request, info: MediaInfo) -> bool:
+    inm = request.headers.get("if-none-match")
+    if inm is not None:  # tiene prioridad sobre If-Modified-Since
+        return _etag_matches(inm, info.etag, weak=True)
+    ims = request.headers.get("if-modified-since")
+    return ims is not None and _not_modified_since(ims, info.mtime)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    (inicio, fin) semiabierto del único rango pedido; None = responder completo.
+    Lanza ValueError si el rango es insatisfacible (-> 416).
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        return None
+    first, sep, last = spec.partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":  # sufijo: últimos n bytes
+            n = int(last)
+            if n <= 0:
+                raise ValueError("empty suffix range")
+            return max(0, size - n), size
+        start = int(first)
+        end = int(last) + 1 if last else size
+    except ValueError:
+        raise ValueError("invalid range")
+    if start >= size or end <= start:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size)
+
+
+def _if_range_allows(request: Request, info: MediaInfo) -> bool:
+    value = request.headers.get("if-range")
+    if value is None:
+        return True
+    if value.startswith('"') or value.startswith("W/"):
+        return _etag_matches(value, info.etag, weak=False)
+    return value.strip() == info.last_modified
+
+
+async def _iter_file(path: Path, start: int, end: int) -> AsyncIterator[bytes]:
+    async with aiofiles.open(path, "rb") as fh:
+        await fh.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = await fh.read(min(READ_BLOCK, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def media_response(request: Request, info: MediaInfo, accel_prefix: Optional[str] = None,
+                   accel_path: Optional[str] = None) -> Response:
+    headers = {
+        "ETag": info.etag,
+        "Last-Modified": info.last_modified,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": IMMUTABLE_CACHE if info.immutable else REVALIDATE_CACHE,
+    }
+    if is_not_modified(request, info):
+        return Response(status_code=304, headers=headers)
+
+    if info.filename:
+        headers["Content-Disposition"] = f"inline; filename*=UTF-8''{quote(info.filename)}"
+    if accel_prefix and accel_path:
+        # nginx sirve el archivo (sendfile) y resuelve Range/If-Range
+        headers["X-Accel-Redirect"] = f"{accel_prefix.rstrip('/')}/{accel_path}"
+        return Response(status_code=200, headers=headers, media_type=info.content_type)
+
+    byte_range = None
+    if request.method == "GET" and _if_range_allows(request, info):
+        try:
+            byte_range = parse_range(request.headers.get("range"), info.size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{info.size}"
+            return Response(status_code=416, headers=headers)
+
+    start, end = byte_range or (0, info.size)
+    headers["Content-Length"] = str(end - start)
+    status_code = 200
+    if byte_range is not None:
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{info.size}"
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=info.content_type)
+    return StreamingResponse(
+        _iter_file(info.path, start, end),
+        status_code=status_code,
+        headers=headers,
+        media_type=info.content_type,
+    )
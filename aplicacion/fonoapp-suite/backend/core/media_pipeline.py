@@ -0,0 +1,191 @@
+# backend/core/media_pipeline.py
+"""
+Generación de derivados y análisis acústico en segundo plano tras una subida.
+
+La petición de subida solo encola `(sha256, ext)` y responde; un pool de
+procesos (contexto "spawn": no hereda el event loop ni las conexiones de la
+app) ejecuta `core.derivatives.build_derivatives` y las filas se guardan en
+`media_derivatives`. Los derivados cuelgan del blob, así que contenidos
+deduplicados se procesan una sola vez. Los WAV además pasan por
+`core.acoustics.analyze_wav` y el resultado se guarda por MediaFile en
+`acoustic_analyses`.
+
+- Cola acotada (DERIVATIVE_QUEUE_SIZE): si se llena se descarta y se
+  registra; `python -m backend.jobs.build_derivatives` y
+  `python -m backend.jobs.analyze_recordings` recuperan lo pendiente.
+- Tantos consumidores como procesos: el pool nunca acumula trabajo propio y
+  la cola es el único backlog.
+- DERIVATIVE_WORKERS=0 desactiva el pipeline (tests, workers sin ffmpeg).
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from .acoustics import analyze_wav
+from .config import settings
+from .database import SessionLocal
+from .derivatives import build_derivatives
+from .storage import MEDIA_PREFIX, blob_path, blob_relpath
+from ..models.acoustics import AcousticAnalysis
+from ..models.file import MediaDerivative, MediaFile
+
+logger = logging.getLogger(__name__)
+
+
+def derivative_options() -> dict:
+    return {
+        "thumb_size": settings.DERIVATIVE_THUMB_SIZE,
+        "points_per_second": settings.DERIVATIVE_PEAKS_PER_SECOND,
+        "audio_bitrate": settings.DERIVATIVE_AUDIO_BITRATE,
+        "ffmpeg_bin": settings.FFMPEG_BIN,
+    }
+
+
+def save_derivatives(db, sha256: str, ext: str, made: List[dict]) -> None:
+    """Upsert de los derivados generados (regenerar un blob sobrescribe sus filas)."""
+    if not made:
+        return
+    folder = f"{MEDIA_PREFIX}{blob_relpath(sha256, ext).rsplit('/', 1)[0]}"
+    rows = [
+        {
+            "sha256": sha256,
+            "kind": m["kind"],
+            "path": f"{folder}/{m['file']}",
+            "content_type": m["content_type"],
+            "size_bytes": m["size_bytes"],
+            "meta": m["meta"],
+        }
+        for m in made
+    ]
+    stmt = pg_insert(MediaDerivative).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MediaDerivative.sha256, MediaDerivative.kind],
+        set_={c: stmt.excluded[c] for c in ("path", "content_type", "size_bytes", "meta")},
+    )
+    db.execute(stmt)
+
+
+def analysis_options() -> dict:
+    return {"f0_min": settings.ACOUSTIC_F0_MIN_HZ, "f0_max": settings.ACOUSTIC_F0_MAX_HZ}
+
+
+def save_analysis(db, media_file_id: int, result: dict) -> None:
+    """Upsert del análisis de un MediaFile (reanalizar sobrescribe)."""
+    f = result["features"]
+    values = {
+        "media_file_id": media_file_id,
+        "patient_id": select(MediaFile.patient_id).where(MediaFile.id == media_file_id).scalar_subquery(),
+        "analyzer_version": f["version"],
+        "duration_seconds": f["duration"],
+        "voiced_fraction": f["voiced_fraction"],
+        "f0_mean_hz": f["f0_mean"],
+        "f0_sd_semitones": f["f0_sd_semitones"],
+        "intensity_mean_db": f["intensity_mean_db"],
+        "jitter_local": f["jitter_local"],
+        "shimmer_local": f["shimmer_local"],
+        "speaking_rate": f["speaking_rate"],
+        "features": f,
+        "contour": result["contour"],
+    }
+    stmt = pg_insert(AcousticAnalysis).values(**values)
+    updates = {k: stmt.excluded[k] for k in values if k != "media_file_id"}
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AcousticAnalysis.media_file_id],
+        set_={**updates, "updated_at": func.now()},
+    )
+    db.execute(stmt)
+
+
+def _in_session(save: Callable, *args) -> None:
+    with SessionLocal() as db:
+        save(db, *args)
+        db.commit()
+
+
+@dataclass
+class _Job:
+    label: str
+    work: Callable   # se ejecuta en el pool: función de módulo + argumentos serializables
+    save: Callable   # recibe el resultado; síncrona, en el threadpool
+
+
+class MediaPipeline:
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._consumers: List[asyncio.Task] = []
+        self.dropped = 0
+
+    def start(self) -> None:
+        if self.workers <= 0 or self._pool is not None:
+            return
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+
+    def _submit(self, job: _Job) -> bool:
+        """No bloquea: False si el pipeline está apagado o la cola llena."""
+        if self._pool is None:
+            return False
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Media pipeline queue full, skipping %s", job.label)
+            return False
+        return True
+
+    def enqueue(self, sha256: str, ext: str) -> bool:
+        """Derivados de un blob nuevo."""
+        src = str(blob_path(sha256, ext).resolve())
+        return self._submit(_Job(
+            label=f"derivatives of blob {sha256}",
+            work=partial(build_derivatives, src, sha256, ext, **derivative_options()),
+            save=partial(_in_session, save_derivatives, sha256, ext),
+        ))
+
+    def enqueue_analysis(self, media_file_id: int, sha256: str, ext: str) -> bool:
+        """Análisis acústico de un MediaFile (también si su blob ya existía: otro paciente)."""
+        src = str(blob_path(sha256, ext).resolve())
+        return self._submit(_Job(
+            label=f"analysis of media file {media_file_id}",
+            work=partial(analyze_wav, src, **analysis_options()),
+            save=partial(_in_session, save_analysis, media_file_id),
+        ))
+
+    async def _consume(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                result = await loop.run_in_executor(self._pool, job.work)
+                # El archivo pudo borrarse mientras tanto: la FK falla y solo se registra
+                await run_in_threadpool(job.save, result)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Media pipeline failed: %s", job.label)
+            finally:
+                self.queue.task_done()
+
+    async def stop(self) -> None:
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+pipeline = MediaPipeline(settings.DERIVATIVE_WORKERS, settings.DERIVATIVE_QUEUE_SIZE)
@@ -0,0 +1,102 @@
+# backend/core/pagination.py
+"""
+Paginación por cursor (keyset) compartida por los endpoints de listado.
+
+El cursor es opaco para el cliente: codifica (base64 url-safe) los valores de
+las columnas de orden de la última fila devuelta. La página siguiente filtra
+``(k1, k2, ...) > cursor`` en lugar de usar OFFSET, por lo que el costo de una
+página profunda es el mismo que el de la primera.
+
+El cuerpo de la respuesta sigue siendo una lista; el cursor de la página
+siguiente viaja en la cabecera ``X-Next-Cursor`` (ausente en la última página).
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import tuple_
+
+from .config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+ERR_BAD_CURSOR = "Invalid cursor"
+
+
+class PageParams:
+    """Dependencia con los parámetros comunes `cursor` y `limit`."""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Cursor opaco devuelto en X-Next-Cursor"),
+        limit: int = Query(settings.PAGE_DEFAULT_LIMIT, ge=1, le=settings.PAGE_MAX_LIMIT),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def _to_json(v: Any) -> Any:
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    return v
+
+
+def _from_json(v: Any, column) -> Any:
+    if v is None:
+        return None
+    try:
+        py_type = column.type.python_type
+    except NotImplementedError:
+        return v
+    if py_type is datetime:
+        return datetime.fromisoformat(v)
+    if py_type is date:
+        return date.fromisoformat(v)
+    return py_type(v)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_to_json(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError(cursor)
+        return [_from_json(v, k) for k, v in zip(keys, values)]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=ERR_BAD_CURSOR)
+
+
+def apply_keyset(stmt, keys: Sequence, page: PageParams, *, descending: bool = False):
+    """
+    Aplica filtro por cursor, ORDER BY sobre `keys` y LIMIT (+1 para saber si
+    hay más). Sirve tanto para `Query` como para `select()`.
+    `keys` debe terminar en una columna única (normalmente el id).
+    """
+    if page.cursor:
+        values = decode_cursor(page.cursor, keys)
+        if len(keys) == 1:
+            lhs, rhs = keys[0], values[0]
+        else:
+            lhs, rhs = tuple_(*keys), tuple_(*values)
+        stmt = stmt.where(lhs < rhs if descending else lhs > rhs)
+    order = [k.desc() if descending else k.asc() for k in keys]
+    return stmt.order_by(*order).limit(page.limit + 1)
+
+
+def finish_page(rows: Sequence, keys: Sequence, page: PageParams, response: Optional[Response] = None) -> list:
+    """Recorta la fila extra y publica el cursor siguiente en la respuesta."""
+    rows = list(rows)
+    if len(rows) <= page.limit:
+        return rows
+    rows = rows[: page.limit]
+    if response is not None:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(last, k.key) for k in keys])
+    return rows
@@ -0,0 +1,233 @@
+# backend/core/patient_import.py
+"""
+Alta masiva de pacientes desde CSV o NDJSON (onboarding de una clínica).
+
+Se lee el archivo fila a fila y se trabaja por lotes de `IMPORT_BATCH`:
+
+1. Cada fila se valida con `PatientCreate` y se normaliza igual que en
+   `create_patient` (`norm_cedula`, nombres sin espacios sobrantes).
+2. Duplicados dentro del archivo: un set de cédulas ya vistas (la primera
+   gana; las siguientes se reportan).
+3. Duplicados en la BD: UNA consulta `cedula_norm IN (...)` por lote, más
+   otra para los `user_id`, en lugar de una por fila.
+4. Un único `INSERT ... VALUES (...), (...) ON CONFLICT (cedula_norm)
+   WHERE cedula_norm IS NOT NULL` por lote contra `ux_patients_cedula_norm`:
+   DO NOTHING (`skip`) o DO UPDATE solo con los campos presentes
+   (`update`). El ON CONFLICT también cubre altas concurrentes entre la
+   consulta y el insert; `xmax = 0` en el RETURNING distingue alta de
+   actualización.
+5. Commit por lote: un error de BD solo invalida ese lote.
+
+El informe cuenta filas por resultado y lista, con su número de línea, las
+que fallaron o se omitieron.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from typing import IO, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..models.patient import Patient, norm_cedula
+from ..models.user import User
+from ..schemas.patient import PatientCreate
+
+IMPORT_BATCH = 1000            # filas por INSERT (8 columnas -> 8000 parámetros)
+MAX_REPORTED_ROWS = 10000      # el informe no crece sin límite con archivos muy sucios
+IMPORT_FORMATS = ("csv", "ndjson")
+DUPLICATE_POLICIES = ("skip", "update")
+
+FIELDS = ("first_name", "last_name", "birth_date", "diagnosis", "notes", "user_id", "cedula")
+# Encabezados habituales en las planillas de las clínicas
+HEADER_ALIASES = {
+    "nombre": "first_name", "nombres": "first_name",
+    "apellido": "last_name", "apellidos": "last_name",
+    "fecha_nacimiento": "birth_date", "nacimiento": "birth_date",
+    "diagnostico": "diagnosis", "diagnóstico": "diagnosis",
+    "notas": "notes", "observaciones": "notes",
+    "cédula": "cedula", "documento": "cedula",
+    "usuario_id": "user_id",
+}
+
+ERR_DUP_IN_FILE = "Cédula repetida en el archivo (línea {line})"
+ERR_DUP_IN_DB = "Cédula ya registrada"
+ERR_UNKNOWN_USER = "user_id: usuario inexistente"
+ERR_BATCH = "Error de base de datos en el lote"
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    failed: int = 0
+    dry_run: bool = False
+    issues: List[dict] = field(default_factory=list)
+    issues_truncated: bool = False
+
+    def _issue(self, line: int, status: str, detail: str) -> None:
+        if len(self.issues) < MAX_REPORTED_ROWS:
+            self.issues.append({"line": line, "status": status, "detail": detail})
+        else:
+            self.issues_truncated = True
+
+    def fail(self, line: int, detail: str) -> None:
+        self.failed += 1
+        self._issue(line, "error", detail)
+
+    def skip(self, line: int, detail: str) -> None:
+        self.skipped += 1
+        self._issue(line, "skipped", detail)
+
+
+def _header(name: Optional[str]) -> Optional[str]:
+    if name is None:
+        return None
+    key = name.strip().lower().replace(" ", "_")
+    return HEADER_ALIASES.get(key, key)
+
+
+def read_rows(fh: IO[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    """(línea, fila cruda) en streaming; la fila es una excepción si no se pudo leer."""
+    if fmt == "csv":
+        reader = csv.DictReader(fh)
+        if reader.fieldnames:
+            reader.fieldnames = [_header(h) for h in reader.fieldnames]
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line, text in enumerate(fh, 1):
+        if not text.strip():
+            continue
+        try:
+            yield line, json.loads(text)
+        except ValueError as exc:
+            yield line, exc
+
+
+def _describe(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+    return str(exc)
+
+
+def prepare_row(raw) -> dict:
+    """Fila cruda -> valores de `patients`. Lanza ValidationError/ValueError."""
+    if isinstance(raw, Exception):
+        raise ValueError(f"JSON inválido: {raw}")
+    if not isinstance(raw, dict):
+        raise ValueError("Se esperaba un objeto por línea")
+    # CSV: celda vacía = sin dato
+    data = PatientCreate.parse_obj({k: (None if v == "" else v) for k, v in raw.items() if k in FIELDS})
+    return {
+        "first_name": data.first_name.strip(),
+        "last_name": data.last_name.strip(),
+        "birth_date": data.birth_date,
+        "diagnosis": data.diagnosis or None,
+        "notes": data.notes or None,
+        "user_id": data.user_id,
+        "cedula": data.cedula,
+        "cedula_norm": norm_cedula(data.cedula),
+    }
+
+
+def _insert_stmt(rows: List[dict], on_duplicate: str):
+    stmt = pg_insert(Patient).values(rows)
+    conflict = {"index_elements": [Patient.cedula_norm], "index_where": Patient.cedula_norm.is_not(None)}
+    if on_duplicate == "update":
+        # Igual que PUT /patients/{id}: un campo vacío en el archivo no borra el existente
+        stmt = stmt.on_conflict_do_update(**conflict, set_={
+            c: func.coalesce(stmt.excluded[c], getattr(Patient, c))
+            for c in ("first_name", "last_name", "birth_date", "diagnosis", "notes", "user_id", "cedula")
+        })
+    else:
+        stmt = stmt.on_conflict_do_nothing(**conflict)
+    return stmt.returning(Patient.cedula_norm, literal_column("xmax = 0").label("inserted"))
+
+
+def _flush(db: Session, batch: List[Tuple[int, dict]], on_duplicate: str, dry_run: bool,
+           report: ImportReport) -> None:
+    cedulas = [r["cedula_norm"] for _, r in batch if r["cedula_norm"]]
+    existing = set(db.scalars(select(Patient.cedula_norm).where(Patient.cedula_norm.in_(cedulas)))) if cedulas else set()
+    user_ids = {r["user_id"] for _, r in batch if r["user_id"] is not None}
+    known_users = set(db.scalars(select(User.id).where(User.id.in_(user_ids)))) if user_ids else set()
+
+    pending: List[Tuple[int, dict]] = []
+    for line, row in batch:
+        if row["user_id"] is not None and row["user_id"] not in known_users:
+            report.fail(line, ERR_UNKNOWN_USER)
+        elif row["cedula_norm"] in existing and on_duplicate == "skip":
+            report.skip(line, ERR_DUP_IN_DB)
+        else:
+            pending.append((line, row))
+    if not pending:
+        return
+    if dry_run:
+        updates = sum(1 for _, r in pending if r["cedula_norm"] in existing)
+        report.updated += updates
+        report.created += len(pending) - updates
+        return
+
+    try:
+        returned = db.execute(_insert_stmt([r for _, r in pending], on_duplicate)).all()
+        db.commit()
+    except SQLAlchemyError as exc:
+        db.rollback()
+        detail = f"{ERR_BATCH}: {exc.__class__.__name__}"
+        for line, _ in pending:
+            report.fail(line, detail)
+        return
+    inserted = sum(1 for r in returned if r.inserted)
+    report.created += inserted
+    report.updated += len(returned) - inserted
+    if len(returned) < len(pending):
+        # DO NOTHING: alguien registró la cédula entre la consulta y el INSERT
+        done = {r.cedula_norm for r in returned}
+        for line, row in pending:
+            if row["cedula_norm"] and row["cedula_norm"] not in done:
+                report.skip(line, ERR_DUP_IN_DB)
+
+
+def import_patients(db: Session, fh: IO[str], fmt: str, *, on_duplicate: str = "skip",
+                    dry_run: bool = False, batch_size: int = IMPORT_BATCH) -> ImportReport:
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"format must be one of {IMPORT_FORMATS}")
+    if on_duplicate not in DUPLICATE_POLICIES:
+        raise ValueError(f"on_duplicate must be one of {DUPLICATE_POLICIES}")
+    report = ImportReport(dry_run=dry_run)
+    seen: dict = {}                     # cedula_norm -> primera línea
+    batch: List[Tuple[int, dict]] = []
+    for line, raw in read_rows(fh, fmt):
+        report.rows += 1
+        try:
+            row = prepare_row(raw)
+        except (ValidationError, ValueError, TypeError) as exc:
+            report.fail(line, _describe(exc))
+            continue
+        cedula = row["cedula_norm"]
+        if cedula:
+            if cedula in seen:
+                report.skip(line, ERR_DUP_IN_FILE.format(line=seen[cedula]))
+                continue
+            seen[cedula] = line
+        batch.append((line, row))
+        if len(batch) >= batch_size:
+            _flush(db, batch, on_duplicate, dry_run, report)
+            batch = []
+    if batch:
+        _flush(db, batch, on_duplicate, dry_run, report)
+    return report
+
+
+def guess_format(filename: Optional[str]) -> Optional[str]:
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
@@ -0,0 +1,125 @@
+# backend/core/plan_rollups.py
+"""
+Agregado incremental del progreso por plan y meta (`plan_goal_rollups`).
+
+Cada log suma sus valores a la fila (plan, meta) en la MISMA transacción
+que lo crea, con un único `INSERT ... ON CONFLICT DO UPDATE` para todas sus
+metas: n, suma, suma de cuadrados, mín/máx, último valor y primera/última
+fecha. Así, resúmenes y tableros leen O(metas) filas en vez de O(sesiones).
+El ON CONFLICT toma el lock de la fila: dos logs simultáneos del mismo plan
+se aplican uno tras otro, sin perder sumas.
+
+Editar o borrar un log no se puede deshacer incrementalmente (mín/máx y
+último valor), así que para esos casos `rebuild_plan` recalcula el plan
+completo. Bloquea la fila del plan con FOR UPDATE: como cada INSERT en
+`session_logs` toma FOR KEY SHARE sobre el plan por la FK, los logs en
+curso terminan antes y los nuevos esperan al commit de la reconstrucción.
+"""
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from .progress import build_matrix
+from ..models.plan import PlanGoalRollup, SessionLog, TreatmentPlan
+
+
+def _values(progress: Optional[dict]) -> Dict[int, float]:
+    out = {}
+    for key, value in (progress or {}).items():
+        if str(key).isdigit():
+            try:
+                x = float(value)
+            except (TypeError, ValueError):
+                continue
+            if math.isfinite(x):
+                out[int(key)] = x
+    return out
+
+
+def apply_log(db: Session, plan_id: int, progress: Optional[dict], date: Optional[datetime] = None) -> None:
+    """Suma un log nuevo al agregado. No hace commit: va en la transacción del log."""
+    values = _values(progress)
+    if not values:
+        return
+    # Sin fecha explícita vale now(), igual que el server_default de SessionLog.date
+    when = date if date is not None else func.now()
+    rows = [
+        {"plan_id": plan_id, "goal_index": k, "n": 1, "total": x, "total_sq": x * x,
+         "min_value": x, "max_value": x, "last_value": x, "first_date": when, "last_date": when}
+        for k, x in sorted(values.items())  # orden fijo de locks entre transacciones
+    ]
+    stmt = pg_insert(PlanGoalRollup).values(rows)
+    new, cur = stmt.excluded, PlanGoalRollup
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[cur.plan_id, cur.goal_index],
+        set_={
+            "n": cur.n + new.n,
+            "total": cur.total + new.total,
+            "total_sq": cur.total_sq + new.total_sq,
+            "min_value": func.least(cur.min_value, new.min_value),
+            "max_value": func.greatest(cur.max_value, new.max_value),
+            # un log con fecha retroactiva no reemplaza el último valor
+            "last_value": case((new.last_date >= cur.last_date, new.last_value), else_=cur.last_value),
+            "first_date": func.least(cur.first_date, new.first_date),
+            "last_date": func.greatest(cur.last_date, new.last_date),
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+
+
+def rollup_rows(plan_id: int, dates: np.ndarray, V: np.ndarray) -> List[dict]:
+    """Filas del agregado a partir de la matriz sesiones×metas de core/progress.py."""
+    mask = ~np.isnan(V)
+    V0 = np.where(mask, V, 0.0)
+    n = mask.sum(axis=0)
+    last = len(V) - 1 - np.argmax(mask[::-1], axis=0)
+    first = np.argmax(mask, axis=0)
+    lo = np.where(mask, V, np.inf).min(axis=0, initial=np.inf)
+    hi = np.where(mask, V, -np.inf).max(axis=0, initial=-np.inf)
+    return [
+        {"plan_id": plan_id, "goal_index": int(k), "n": int(n[k]), "total": float(V0[:, k].sum()),
+         "total_sq": float((V0[:, k] ** 2).sum()), "min_value": float(lo[k]), "max_value": float(hi[k]),
+         "last_value": float(V[last[k], k]),
+         "first_date": dates[first[k]].astype(datetime), "last_date": dates[last[k]].astype(datetime)}
+        for k in np.flatnonzero(n)
+    ]
+
+
+def rebuild_plan(db: Session, plan_id: int) -> int:
+    """Recalcula el agregado del plan desde sus logs (tras editar/borrar logs). Sin commit."""
+    db.execute(select(TreatmentPlan.id).where(TreatmentPlan.id == plan_id).with_for_update())
+    logs = db.execute(
+        select(SessionLog.date, SessionLog.progress)
+        .where(SessionLog.plan_id == plan_id, SessionLog.date.is_not(None))
+        .order_by(SessionLog.date, SessionLog.id)
+    ).all()
+    db.execute(delete(PlanGoalRollup).where(PlanGoalRollup.plan_id == plan_id))
+    if not logs:
+        return 0
+    dates, V = build_matrix([(r.date, r.progress) for r in logs], 0)
+    rows = rollup_rows(plan_id, dates, V)
+    if rows:
+        db.execute(insert(PlanGoalRollup), rows)
+    return len(rows)
+
+
+def summarize(rollup: PlanGoalRollup) -> dict:
+    """Media y desviación estándar (muestral) desde las sumas."""
+    mean = rollup.total / rollup.n
+    var = (rollup.total_sq - rollup.n * mean * mean) / (rollup.n - 1) if rollup.n > 1 else None
+    return {
+        "count": rollup.n,
+        "mean": mean,
+        "sd": math.sqrt(max(var, 0.0)) if var is not None else None,  # max: error de redondeo
+        "min": rollup.min_value,
+        "max": rollup.max_value,
+        "last": rollup.last_value,
+        "first_date": rollup.first_date,
+        "last_date": rollup.last_date,
+    }
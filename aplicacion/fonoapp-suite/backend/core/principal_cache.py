@@ -0,0 +1,148 @@
+# backend/core/principal_cache.py
+"""
+Caché TTL/LRU del usuario autenticado para `get_current_user`.
+
+La clave es el token completo: si el mismo token ya fue verificado, se evita
+volver a validar la firma JWT y la consulta `SELECT ... FROM users`. Cada
+entrada guarda `jti`/`sub` y expira en lo que ocurra primero: el TTL
+configurado o el `exp` del token.
+
+La caché es local al proceso y solo se invalida ante cambios hechos con el
+ORM en este worker (flush de instancias y `update()`/`delete()` sobre User).
+Cambios por SQL crudo, desde otro worker o desde otro servicio no la
+invalidan: ahí el TTL (AUTH_CACHE_TTL_SECONDS, corto a propósito) acota el
+tiempo que un cambio de rol o una desactivación tarda en verse.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from .config import settings
+from ..models.user import User
+
+
+@dataclass
+class _Entry:
+    jti: Optional[str]
+    sub: str
+    expires_at: float
+    user: User  # instancia desacoplada (detached), solo lectura
+
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._by_sub: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()  # también la usan las invalidaciones desde el threadpool
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, token: str) -> Optional[User]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._drop(token)
+                return None
+            self._entries.move_to_end(token)
+            return entry.user
+
+    def put(self, token: str, payload: dict, user: User) -> None:
+        if not self.enabled:
+            return
+        now_wall = time.time()
+        ttl = self.ttl
+        if "exp" in payload:
+            ttl = min(ttl, float(payload["exp"]) - now_wall)
+        if ttl <= 0:
+            return
+        entry = _Entry(payload.get("jti"), payload["sub"], time.monotonic() + ttl, user)
+        with self._lock:
+            self._drop(token)
+            self._entries[token] = entry
+            self._by_sub.setdefault(entry.sub, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_subject(self, sub: str) -> None:
+        """Descarta todos los tokens cacheados de un usuario (cambio de rol, borrado...)."""
+        with self._lock:
+            for token in list(self._by_sub.get(sub, ())):
+                self._drop(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_sub.clear()
+
+    def _drop(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._by_sub.get(entry.sub)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                self._by_sub.pop(entry.sub, None)
+
+
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+)
+
+
+# ---------------- Invalidación automática ----------------
+# Se registran los emails afectados al hacer flush y se invalidan tras el
+# commit, para que otra petición no vuelva a cachear la fila vieja.
+_PENDING_KEY = "principal_cache_invalidate"
+_ALL = object()  # marca de "vaciar todo" dentro del set de emails
+
+
+def _mark(session: Session, *emails: Optional[str]) -> None:
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    pending.update(e for e in emails if e)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_user_changes(session: Session, flush_context, instances) -> None:
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, User):
+            continue
+        hist = inspect(obj).attrs.email.history
+        _mark(session, obj.email, *(hist.deleted or ()))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_user_changes(state: ORMExecuteState) -> None:
+    # update(User)/delete(User) no pasan por flush y no se sabe a qué filas tocan:
+    # tras el commit se vacía la caché completa
+    if (state.is_update or state.is_delete) and state.bind_mapper is inspect(User):
+        _mark(state.session, _ALL)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, ())
+    if _ALL in pending:
+        principal_cache.clear()
+        return
+    for email in pending:
+        principal_cache.invalidate_subject(email)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,228 @@
+# backend/core/progress.py
+"""
+Analítica de progreso de un plan (GET /plans/{id}/progress).
+
+Los logs del plan se cargan una vez en arreglos columnares: `t` (días desde
+la primera sesión) y `V` (sesiones × metas, NaN donde la sesión no midió
+esa meta). Con eso, todas las metas se calculan a la vez, sin bucles por
+meta ni por sesión:
+
+- media móvil de las últimas `window` mediciones: sumas acumuladas;
+- pendiente por mínimos cuadrados (valor vs. días) -> `slope_per_week`;
+- % hacia la meta: (media móvil actual - línea base) / (meta - línea base),
+  con línea base = primer valor medido;
+- `achieved_at`: primera sesión que alcanzó la meta (en su dirección);
+- `projected_date`: cruce de la recta de tendencia con la meta, solo si la
+  tendencia va hacia ella, no es estable y el cruce cae dentro de
+  PROJECTION_MAX_DAYS desde la última sesión.
+
+El resultado se guarda en una caché LRU local al proceso. Se invalida al
+hacer commit de cambios en logs o metas del plan (eventos de Session, como
+core/principal_cache.py). Además, cada lectura compara una huella barata
+(nº de logs, id máximo) para ver los logs creados desde otros workers.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import settings
+from ..models.plan import SessionLog, TreatmentPlan
+
+FLAT_FRACTION = 0.005   # |pendiente semanal| < 0.5% de la distancia base->meta = estable
+PROJECTION_MAX_DAYS = 3 * 365  # más lejos no es una proyección útil (y evita desbordar datetime64)
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def build_matrix(rows: Sequence[Tuple[datetime, dict]], n_goals: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(fechas datetime64[us], V sesiones×metas) desde filas (date, progress) ordenadas por fecha."""
+    width = n_goals
+    for _, progress in rows:  # índices fuera de `goals` también se reportan
+        for key in progress or ():
+            if str(key).isdigit():
+                width = max(width, int(key) + 1)
+    V = np.full((len(rows), width), np.nan)
+    for i, (_, progress) in enumerate(rows):
+        for key, value in (progress or {}).items():
+            if str(key).isdigit():
+                V[i, int(key)] = _number(value)
+    dates = np.array([d for d, _ in rows], dtype="datetime64[us]")
+    return dates, V
+
+
+def compute_progress(goals: List[dict], dates: np.ndarray, V: np.ndarray, window: int) -> dict:
+    n, g = V.shape
+    cols = np.arange(g)
+    mask = ~np.isnan(V)
+    V0 = np.where(mask, V, 0.0)
+    t = (dates - dates[0]).astype("timedelta64[s]").astype(np.float64) / 86400.0 if n else np.zeros(0)
+
+    # Media móvil de las últimas `window` mediciones de cada meta: se compactan
+    # los valores medidos al inicio de cada columna (orden estable) y se usan
+    # sumas acumuladas por rango de medición
+    order = np.argsort(~mask, axis=0, kind="stable")
+    S = np.vstack([np.zeros((1, g)), np.cumsum(np.take_along_axis(V0, order, axis=0), axis=0)])
+    rank = np.cumsum(mask, axis=0)                  # nº de mediciones hasta cada sesión
+    lo = np.maximum(rank - window, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rolling = np.where(mask, (np.take_along_axis(S, rank, axis=0) - np.take_along_axis(S, lo, axis=0))
+                           / (rank - lo), np.nan)
+
+    # Regresión lineal por meta: sumas enmascaradas, todas las columnas a la vez
+    k = mask.sum(axis=0)
+    tm = t[:, None] * mask
+    sx, sy = tm.sum(axis=0), V0.sum(axis=0)
+    sxx, sxy = (tm * t[:, None]).sum(axis=0), (t[:, None] * V0).sum(axis=0)
+    den = k * sxx - sx ** 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = np.where((k >= 2) & (den > 1e-12), (k * sxy - sx * sy) / den, np.nan)
+        intercept = (sy - slope * sx) / k
+
+    has = mask.any(axis=0)
+    first = np.argmax(mask, axis=0)
+    last = n - 1 - np.argmax(mask[::-1], axis=0) if n else first
+    baseline = np.where(has, V[first, cols], np.nan) if n else np.full(g, np.nan)
+    latest = np.where(has, V[last, cols], np.nan) if n else np.full(g, np.nan)
+    rolling_latest = np.where(has, rolling[last, cols], np.nan) if n else np.full(g, np.nan)
+
+    target = np.array([_number(goals[i].get("target")) if i < len(goals) and isinstance(goals[i], dict)
+                       else np.nan for i in cols], dtype=np.float64)
+    direction = np.sign(target - baseline)          # +1 subir hasta la meta, -1 bajar; NaN sin meta
+    with np.errstate(invalid="ignore", divide="ignore"):
+        percent = np.where(direction != 0, (rolling_latest - baseline) / (target - baseline) * 100, np.nan)
+        reached = mask & ((V - target) * direction >= 0) & (direction != 0)
+        toward = slope * direction > 0
+        t_cross = np.where(toward, (target - intercept) / slope, np.nan)
+    achieved = reached.any(axis=0)
+    achieved_idx = np.argmax(reached, axis=0)
+    t_last = t[last] if n else np.zeros(g)
+    t_cross = np.maximum(t_cross, t_last)         # la recta ya cruzó pero los valores aún no
+
+    weekly = slope * 7
+    scale = np.where(np.isnan(target) | (direction == 0), np.abs(baseline), np.abs(target - baseline))
+    flat = np.abs(weekly) <= FLAT_FRACTION * np.where(scale > 0, scale, 1.0)
+    trend = np.where(np.isnan(slope), None, np.where(flat, "flat", np.where(slope > 0, "up", "down")))
+    projectable = ~achieved & ~flat & np.isfinite(t_cross) & (t_cross - t_last <= PROJECTION_MAX_DAYS)
+
+    out_goals = []
+    for i in cols:  # solo arma la respuesta; los cálculos ya están hechos
+        goal = goals[i] if i < len(goals) and isinstance(goals[i], dict) else {}
+        m = mask[:, i]
+        out_goals.append({
+            "index": int(i),
+            "title": goal.get("title"),
+            "metric": goal.get("metric"),
+            "target": _opt(target[i]),
+            "points": int(k[i]),
+            "baseline": _opt(baseline[i]),
+            "latest": _opt(latest[i]),
+            "rolling_latest": _opt(rolling_latest[i]),
+            "slope_per_week": _opt(weekly[i]),
+            "trend": trend[i],
+            "on_track": None if np.isnan(direction[i]) or direction[i] == 0 or np.isnan(slope[i]) else bool(toward[i]),
+            "percent_to_target": _opt(percent[i], 1),
+            "achieved_at": _dt(dates[achieved_idx[i]]) if achieved[i] else None,
+            "projected_date": (
+                _dt(dates[0] + np.timedelta64(int(round(t_cross[i] * 86400)), "s")) if projectable[i] else None
+            ),
+            "series": [
+                {"date": _dt(d), "value": _opt(v), "rolling": _opt(r)}
+                for d, v, r in zip(dates[m], V[m, i], rolling[m, i])
+            ],
+        })
+    return {
+        "sessions": int(n),
+        "first_date": _dt(dates[0]) if n else None,
+        "last_date": _dt(dates[-1]) if n else None,
+        "window": window,
+        "goals": out_goals,
+    }
+
+
+def _opt(x: float, digits: int = 4) -> Optional[float]:
+    return None if x is None or not np.isfinite(x) else round(float(x), digits)
+
+
+def _dt(d: np.datetime64) -> datetime:
+    value = d.astype("datetime64[s]").item()
+    if not isinstance(value, datetime):  # fuera del rango de datetime, numpy devuelve un int
+        raise ValueError(f"date out of range: {d}")
+    return value
+
+
+class ProgressCache:
+    """LRU por (plan, ventana); cada entrada guarda la huella con la que se calculó."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[Hashable, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, plan_id: int, window: int, fingerprint: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get((plan_id, window))
+            if entry is None or entry[0] != fingerprint:
+                return None
+            self._entries.move_to_end((plan_id, window))
+            return entry[1]
+
+    def put(self, plan_id: int, window: int, fingerprint: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[(plan_id, window)] = (fingerprint, value)
+            self._entries.move_to_end((plan_id, window))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, plan_id: int) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == plan_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+progress_cache = ProgressCache(max_entries=settings.PROGRESS_CACHE_MAX_ENTRIES)
+
+
+# ---------------- Invalidación automática ----------------
+_PENDING_KEY = "progress_cache_invalidate"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_plan_changes(session: Session, flush_context) -> None:
+    pending = None
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, SessionLog):
+            plan_id = obj.plan_id
+        elif isinstance(obj, TreatmentPlan):
+            plan_id = obj.id
+        else:
+            continue
+        if pending is None:
+            pending = session.info.setdefault(_PENDING_KEY, set())
+        pending.add(plan_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for plan_id in session.info.pop(_PENDING_KEY, ()):
+        progress_cache.invalidate(plan_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
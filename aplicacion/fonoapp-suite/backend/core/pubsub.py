@@ -0,0 +1,132 @@
+# backend/core/pubsub.py
+"""
+Brokers de pub/sub para las salas de tiempo real (chat y señalización WebRTC).
+
+`ConnectionManager` publica cada mensaje en el broker y entrega localmente lo
+que el broker le devuelve; así dos peers conectados a workers (o contenedores)
+distintos se ven entre sí.
+
+- `InProcessBroker`: un solo proceso (desarrollo, un worker).
+- `RedisBroker`: protocolo Redis PUBLISH/SUBSCRIBE, un canal por sala. Recibe
+  cualquier cliente compatible con `redis.asyncio.Redis`, p. ej.
+  `fakeredis.aioredis.FakeRedis` en pruebas.
+
+Este módulo no depende de la configuración de la app para poder probarse solo.
+"""
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# (sala, payload) -> entrega local
+Handler = Callable[[str, str], Awaitable[None]]
+
+
+class Broker(ABC):
+    def __init__(self):
+        self._handler: Optional[Handler] = None
+
+    def bind(self, handler: Handler) -> None:
+        """Callback invocado por cada mensaje recibido en una sala suscrita."""
+        self._handler = handler
+
+    async def _dispatch(self, room: str, payload: str) -> None:
+        if self._handler is None:
+            return
+        try:
+            await self._handler(room, payload)
+        except Exception:  # un fallo de entrega no debe tumbar el lector
+            logger.exception("Error delivering message to room %s", room)
+
+    @abstractmethod
+    async def subscribe(self, room: str) -> None: ...
+
+    @abstractmethod
+    async def unsubscribe(self, room: str) -> None: ...
+
+    @abstractmethod
+    async def publish(self, room: str, payload: str) -> None: ...
+
+    async def close(self) -> None:
+        pass
+
+
+class InProcessBroker(Broker):
+    def __init__(self):
+        super().__init__()
+        self._rooms: Set[str] = set()
+
+    async def subscribe(self, room: str) -> None:
+        self._rooms.add(room)
+
+    async def unsubscribe(self, room: str) -> None:
+        self._rooms.discard(room)
+
+    async def publish(self, room: str, payload: str) -> None:
+        if room in self._rooms:
+            await self._dispatch(room, payload)
+
+
+class RedisBroker(Broker):
+    CHANNEL_PREFIX = "fonoapp:room:"
+
+    def __init__(self, client):
+        super().__init__()
+        self._redis = client
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self._reader: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBroker":
+        try:
+            import redis.asyncio as aioredis
+        except ImportError as exc:  # dependencia opcional
+            raise RuntimeError("REALTIME_BROKER_URL requires the 'redis' package") from exc
+        return cls(aioredis.from_url(url, decode_responses=True))
+
+    def _channel(self, room: str) -> str:
+        return f"{self.CHANNEL_PREFIX}{room}"
+
+    async def subscribe(self, room: str) -> None:
+        await self._pubsub.subscribe(self._channel(room))
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read_loop())
+
+    async def unsubscribe(self, room: str) -> None:
+        await self._pubsub.unsubscribe(self._channel(room))
+
+    async def publish(self, room: str, payload: str) -> None:
+        await self._redis.publish(self._channel(room), payload)
+
+    async def _read_loop(self) -> None:
+        prefix_len = len(self.CHANNEL_PREFIX)
+        # Sin canales suscritos get_message no espera: se sale y `subscribe` relanza el lector
+        while self._pubsub.subscribed:
+            try:
+                msg = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Redis pub/sub read failed; retrying")
+                await asyncio.sleep(1.0)
+                continue
+            if not msg or msg.get("type") != "message":
+                continue
+            channel, data = msg["channel"], msg["data"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            if isinstance(data, bytes):
+                data = data.decode()
+            await self._dispatch(channel[prefix_len:], data)
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+        await self._pubsub.aclose()
+        await self._redis.aclose()
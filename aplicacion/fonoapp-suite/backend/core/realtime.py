@@ -0,0 +1,370 @@
+# backend/core/realtime.py
+"""
+Envío con backpressure para las salas de tiempo real.
+
+Cada conexión (`Peer`) tiene una cola de salida acotada y su propia tarea
+escritora: difundir un mensaje a una sala es encolar en cada peer (O(1), sin
+await), así que un cliente lento ya no frena al resto. Cuando la cola de un
+peer se llena se aplica la política de consumidor lento:
+
+- `drop_oldest`: descarta el mensaje más antiguo pendiente (por defecto; en
+  chat/señalización lo reciente es lo que importa).
+- `drop_new`: descarta el mensaje que llega.
+- `disconnect`: cierra la conexión (código 1013, "try again later").
+
+Formato de los frames (se negocia con el subprotocolo del WebSocket):
+
+- sin subprotocolo: texto, un mensaje por frame (clientes existentes).
+- `fonoapp.json`: texto, cada frame es un array JSON de mensajes.
+- `fonoapp.msgpack`: binario, cada frame es un array msgpack de mensajes.
+
+Con los dos últimos el escritor agrupa lo que llega dentro de una ventana
+corta (p. ej. ráfagas de candidatos ICE) en un solo frame, y el cliente
+también puede mandar varios mensajes en un frame. La compresión por mensaje
+(permessage-deflate) la negocia uvicorn con el cliente; agrupar hace que
+valga la pena.
+
+`RoomRegistry` guarda el estado de cada sala en este worker: sus peers, un
+historial circular de los últimos mensajes (acotado por sala y en total) y
+la presencia. Al conectarse, un cliente recibe ese estado sin ir a la BD.
+
+Este módulo no depende de la configuración de la app para poder probarse solo.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+try:  # dependencia opcional: sin msgpack no se ofrece el subprotocolo binario
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "drop_new", "disconnect")
+WS_UNSUPPORTED_DATA = 1003
+WS_TRY_AGAIN_LATER = 1013
+
+Frame = Union[str, bytes]
+
+
+class CodecError(ValueError):
+    """Frame entrante que no se puede decodificar con el códec negociado."""
+
+
+class TextCodec:
+    """Sin subprotocolo: un mensaje por frame de texto, sin agrupar."""
+    subprotocol: Optional[str] = None
+    batching = False
+
+    def __init__(self, parse_json: bool = False):
+        # En /ws/signal el texto es JSON: se decodifica para que los peers
+        # binarios reciban objetos y no cadenas con JSON dentro.
+        self.parse_json = parse_json
+
+    def decode(self, frame: Frame) -> List:
+        if isinstance(frame, bytes):
+            raise CodecError("Binary frames require a subprotocol")
+        if self.parse_json:
+            try:
+                return [json.loads(frame)]
+            except ValueError:
+                pass
+        return [frame]
+
+    def encode(self, messages: Sequence) -> List[Frame]:
+        return [m if isinstance(m, str) else json.dumps(m, separators=(",", ":")) for m in messages]
+
+
+class JsonBatchCodec:
+    subprotocol = "fonoapp.json"
+    batching = True
+
+    def decode(self, frame: Frame) -> List:
+        try:
+            data = json.loads(frame)
+        except ValueError as exc:
+            raise CodecError("Invalid JSON frame") from exc
+        if not isinstance(data, list):
+            raise CodecError("Frame must be an array of messages")
+        return data
+
+    def encode(self, messages: Sequence) -> List[Frame]:
+        return [json.dumps(list(messages), separators=(",", ":"))]
+
+
+class MsgpackBatchCodec:
+    subprotocol = "fonoapp.msgpack"
+    batching = True
+
+    def decode(self, frame: Frame) -> List:
+        if not isinstance(frame, bytes):
+            raise CodecError("Expected a binary frame")
+        try:
+            data = msgpack.unpackb(frame, raw=False)
+        except Exception as exc:
+            raise CodecError("Invalid msgpack frame") from exc
+        if not isinstance(data, list):
+            raise CodecError("Frame must be an array of messages")
+        return data
+
+    def encode(self, messages: Sequence) -> List[Frame]:
+        return [msgpack.packb(list(messages), use_bin_type=True)]
+
+
+BATCH_CODECS = {JsonBatchCodec.subprotocol: JsonBatchCodec}
+if msgpack is not None:
+    BATCH_CODECS[MsgpackBatchCodec.subprotocol] = MsgpackBatchCodec
+
+
+def negotiate_codec(offered: Sequence[str], parse_json: bool = False):
+    """Primer subprotocolo ofrecido por el cliente que soportamos; si no, texto."""
+    for name in offered:
+        if name in BATCH_CODECS:
+            return BATCH_CODECS[name]()
+    return TextCodec(parse_json=parse_json)
+
+
+@dataclass
+class RoomMetrics:
+    """Contadores por sala; la profundidad de cola se calcula al consultar."""
+    enqueued: int = 0
+    sent: int = 0
+    frames: int = 0
+    dropped: int = 0
+    slow_disconnects: int = 0
+    send_ms_total: float = 0.0
+    send_ms_max: float = 0.0
+
+    def record_send(self, ms: float) -> None:
+        self.sent += 1
+        self.send_ms_total += ms
+        if ms > self.send_ms_max:
+            self.send_ms_max = ms
+
+    def snapshot(self, peers) -> dict:
+        depths = [p.queue.qsize() for p in peers]
+        return {
+            "peers": len(depths),
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "slow_disconnects": self.slow_disconnects,
+            "send_ms_avg": round(self.send_ms_total / self.sent, 3) if self.sent else 0.0,
+            "send_ms_max": round(self.send_ms_max, 3),
+        }
+
+
+class Peer:
+    """
+    Una conexión WebSocket dentro de una sala. `send` solo encola; la tarea
+    escritora codifica y envía con un timeout por frame, agrupando hasta
+    `max_batch` mensajes por frame si el códec lo permite.
+    `on_close` se invoca una vez cuando el peer deja de ser utilizable.
+    """
+
+    def __init__(
+        self,
+        ws,
+        room: str,
+        metrics: RoomMetrics,
+        *,
+        queue_size: int,
+        policy: str,
+        send_timeout: float,
+        codec=None,
+        batch_window: float = 0.0,
+        max_batch: int = 64,
+        member: Optional[dict] = None,
+        on_close: Optional[Callable[["Peer"], None]] = None,
+    ):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.ws = ws
+        self.room = room
+        self.metrics = metrics
+        self.member = member or {}  # entrada de presencia: {"id", "name"}
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.codec = codec or TextCodec()
+        self.batch_window = batch_window if self.codec.batching else 0.0
+        self.max_batch = max_batch if self.codec.batching else 1
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+        self._on_close = on_close
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def send(self, message) -> bool:
+        """Encola sin bloquear; False si el mensaje no se aceptó."""
+        if self.closed:
+            return False
+        item = (time.perf_counter(), message)
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            if self.policy == "drop_new":
+                self.metrics.dropped += 1
+                return False
+            if self.policy == "disconnect":
+                self.metrics.slow_disconnects += 1
+                self._abort(WS_TRY_AGAIN_LATER)
+                return False
+            self.queue.get_nowait()  # drop_oldest
+            self.metrics.dropped += 1
+            self.queue.put_nowait(item)
+        self.metrics.enqueued += 1
+        return True
+
+    async def _write_loop(self) -> None:
+        while True:
+            batch = [await self.queue.get()]
+            if self.batch_window:
+                # Ventana de agrupación: lo que llegue mientras tanto viaja en el mismo frame
+                await asyncio.sleep(self.batch_window)
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                for frame in self.codec.encode([message for _, message in batch]):
+                    if isinstance(frame, bytes):
+                        send = self.ws.send_bytes(frame)
+                    else:
+                        send = self.ws.send_text(frame)
+                    await asyncio.wait_for(send, timeout=self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # conexión caída o demasiado lenta: se limpia y termina el escritor
+                self._abort(WS_TRY_AGAIN_LATER, from_writer=True)
+                return
+            now = time.perf_counter()
+            for enqueued_at, _ in batch:
+                self.metrics.record_send((now - enqueued_at) * 1000)
+            self.metrics.frames += 1
+
+    def _abort(self, code: int, from_writer: bool = False) -> None:
+        if self.closed:
+            return
+        self.close(from_writer=from_writer)
+        asyncio.create_task(self._close_ws(code))
+
+    async def _close_ws(self, code: int) -> None:
+        try:
+            await self.ws.close(code=code)
+        except Exception:  # ya estaba cerrada
+            pass
+
+    def close(self, from_writer: bool = False) -> None:
+        """Detiene el escritor y descarta lo pendiente; idempotente."""
+        if self.closed:
+            return
+        self.closed = True
+        if not from_writer:
+            self._writer.cancel()
+        if self._on_close is not None:
+            self._on_close(self)
+
+
+def _approx_size(message) -> int:
+    if isinstance(message, (str, bytes)):
+        return len(message)
+    return len(json.dumps(message, separators=(",", ":")))
+
+
+class RoomState:
+    def __init__(self, keep_history: bool):
+        self.peers: Set[Peer] = set()
+        self.metrics = RoomMetrics()
+        self.keep_history = keep_history
+        self.history: Deque[Tuple[object, int]] = deque()  # (mensaje, bytes aprox.)
+        self.history_bytes = 0
+        self.members: Dict[str, dict] = {}  # presencia de todos los workers
+        self.last_active = time.monotonic()
+
+    def snapshot(self) -> dict:
+        return {
+            "type": "snapshot",
+            "history": [message for message, _ in self.history],
+            "presence": list(self.members.values()),
+        }
+
+
+class RoomRegistry:
+    """
+    Salas conocidas por este worker, de la menos a la más recientemente activa.
+    Una sala sigue existiendo sin peers locales (para conservar su historial)
+    hasta que `idle_rooms` la reporta y se elimina con `drop`.
+    """
+
+    def __init__(self, *, history_messages: int, room_bytes: int, total_bytes: int):
+        self.history_messages = history_messages
+        self.room_bytes = room_bytes
+        self.total_bytes = total_bytes
+        self.used_bytes = 0
+        self.rooms: "OrderedDict[str, RoomState]" = OrderedDict()
+
+    def get(self, room: str) -> Optional[RoomState]:
+        return self.rooms.get(room)
+
+    def create(self, room: str, keep_history: bool) -> RoomState:
+        state = self.rooms[room] = RoomState(keep_history and self.history_messages > 0)
+        return state
+
+    def touch(self, room: str) -> None:
+        state = self.rooms.get(room)
+        if state is not None:
+            state.last_active = time.monotonic()
+            self.rooms.move_to_end(room)
+
+    def record(self, room: str, message) -> None:
+        state = self.rooms.get(room)
+        if state is None or not state.keep_history:
+            return
+        size = _approx_size(message)
+        if size > self.room_bytes:
+            return  # no cabe ni solo: no se guarda
+        state.history.append((message, size))
+        state.history_bytes += size
+        self.used_bytes += size
+        while len(state.history) > self.history_messages or state.history_bytes > self.room_bytes:
+            self._pop_oldest(state)
+        # Límite global: se vacía el historial de las salas menos activas primero
+        for other in self.rooms.values():
+            if self.used_bytes <= self.total_bytes:
+                break
+            while other.history and self.used_bytes > self.total_bytes:
+                self._pop_oldest(other)
+
+    def _pop_oldest(self, state: RoomState) -> None:
+        _, size = state.history.popleft()
+        state.history_bytes -= size
+        self.used_bytes -= size
+
+    def drop(self, room: str) -> None:
+        state = self.rooms.pop(room, None)
+        if state is not None:
+            self.used_bytes -= state.history_bytes
+
+    def idle_rooms(self, idle_seconds: float) -> List[str]:
+        cutoff = time.monotonic() - idle_seconds
+        idle = []
+        for room, state in self.rooms.items():  # orden LRU: se puede cortar al primer activo
+            if state.last_active > cutoff:
+                break
+            if not state.peers:
+                idle.append(room)
+        return idle
+
+    def stats(self) -> Dict[str, dict]:
+        out = {}
+        for room, state in self.rooms.items():
+            out[room] = state.metrics.snapshot(state.peers)
+            out[room].update(members=len(state.members), history=len(state.history),
+                             history_bytes=state.history_bytes)
+        return out
@@ -0,0 +1,194 @@
+# backend/core/replica.py
+"""
+Enrutamiento de lecturas a una réplica de Postgres (streaming replication).
+
+- `get_read_db`: dependencia de solo lectura. Entrega una sesión sobre la
+  réplica (AsyncSession o Session según DB_ASYNC, igual que `get_async_db`)
+  y cae al primario si no hay réplica configurada, si está caída o atrasada
+  más de REPLICA_MAX_LAG_SECONDS, o si el cliente acaba de escribir.
+- `read_your_writes_middleware`: tras una mutación exitosa deja una cookie
+  que fuerza lecturas al primario durante REPLICA_STICKY_SECONDS, para que
+  el cliente vea sus propios cambios aunque la réplica vaya por detrás.
+
+El estado de la réplica se re-evalúa cada REPLICA_CHECK_INTERVAL_SECONDS;
+si cae entre dos chequeos, la primera consulta que falla por conexión la
+marca caída y se repite en el primario (ver `_ReadFailover`), sin 500.
+"""
+import logging
+import time
+from contextlib import AsyncExitStack
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+from .database import READ_FAILOVER_KEY, AnySession, AsyncSessionLocal, SessionLocal, open_session
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_STICKY_COOKIE = "db_primary_until"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Atraso en segundos; 0 si la réplica ya aplicó todo lo recibido (evita falsos
+# positivos cuando el primario está ocioso y no genera transacciones nuevas)
+_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+replica_engine = None
+ReplicaSessionLocal = None
+async_replica_engine = None
+AsyncReplicaSessionLocal = None
+
+if settings.DATABASE_REPLICA_URL:
+    if settings.DB_ASYNC:
+        _pool_size, _max_overflow = settings.pool_limits(sync=False)  # su parte del presupuesto, no uno entero
+        async_replica_engine = create_async_engine(
+            settings.async_replica_url,
+            pool_pre_ping=True,
+            pool_size=_pool_size,
+            max_overflow=_max_overflow,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            echo=settings.SQLALCHEMY_ECHO,
+        )
+        AsyncReplicaSessionLocal = async_sessionmaker(
+            bind=async_replica_engine, autoflush=False, expire_on_commit=False,
+        )
+    else:
+        _pool_size, _max_overflow = settings.pool_limits(sync=True)
+        replica_engine = create_engine(
+            settings.DATABASE_REPLICA_URL,
+            pool_pre_ping=True,
+            pool_size=_pool_size,
+            max_overflow=_max_overflow,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            echo=settings.SQLALCHEMY_ECHO,
+            future=True,
+        )
+        ReplicaSessionLocal = sessionmaker(
+            bind=replica_engine, autocommit=False, autoflush=False,
+            expire_on_commit=False, future=True,
+        )
+
+
+class ReplicaHealth:
+    """Estado de la réplica, re-evaluado como mucho cada REPLICA_CHECK_INTERVAL_SECONDS."""
+
+    def __init__(self):
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self._checked_at = 0.0
+
+    def _due(self) -> bool:
+        return time.monotonic() - self._checked_at >= settings.REPLICA_CHECK_INTERVAL_SECONDS
+
+    def _record(self, lag: Optional[float]) -> bool:
+        self._checked_at = time.monotonic()
+        self.lag = lag
+        was_healthy = self.healthy
+        self.healthy = lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+        if was_healthy and not self.healthy:
+            logger.warning("Read replica unavailable or lagging (lag=%s); using primary", lag)
+        return self.healthy
+
+    def _check_sync(self) -> Optional[float]:
+        try:
+            with replica_engine.connect() as conn:
+                return float(conn.execute(_LAG_SQL).scalar() or 0)
+        except SQLAlchemyError:
+            return None
+
+    async def _check_async(self) -> Optional[float]:
+        try:
+            async with async_replica_engine.connect() as conn:
+                return float((await conn.execute(_LAG_SQL)).scalar() or 0)
+        except (SQLAlchemyError, OSError):
+            return None
+
+    def mark_down(self, exc: BaseException) -> None:
+        """Falla de conexión en una petición: réplica caída hasta el próximo chequeo."""
+        if self.healthy:
+            logger.warning("Read replica query failed (%s); retrying on primary", exc.__class__.__name__)
+        self._checked_at = time.monotonic()
+        self.healthy = False
+        self.lag = None
+
+    async def is_usable(self) -> bool:
+        if not self._due():
+            return self.healthy
+        # Marca el intento antes de consultar: peticiones concurrentes no repiten el chequeo
+        self._checked_at = time.monotonic()
+        if async_replica_engine is not None:
+            return self._record(await self._check_async())
+        return self._record(await run_in_threadpool(self._check_sync))
+
+
+replica_health = ReplicaHealth()
+
+
+class _ReadFailover:
+    """Sesión del primario que abre db_execute/db_get si la réplica falla (core/database.py)."""
+
+    def __init__(self):
+        self.used = False      # ya hubo una consulta exitosa en la réplica: no se cambia a mitad
+        self.session: Optional[AnySession] = None
+        self._stack = AsyncExitStack()
+
+    async def switch(self, exc: BaseException) -> AnySession:
+        replica_health.mark_down(exc)
+        self.session = await self._stack.enter_async_context(open_session(AsyncSessionLocal, SessionLocal))
+        return self.session
+
+    async def aclose(self) -> None:
+        await self._stack.aclose()
+
+
+def _wants_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_db(request: Request) -> AsyncIterator[AnySession]:
+    use_replica = (
+        (ReplicaSessionLocal is not None or AsyncReplicaSessionLocal is not None)
+        and not _wants_primary(request)
+        and await replica_health.is_usable()
+    )
+    if not use_replica:
+        async with open_session(AsyncSessionLocal, SessionLocal) as db:
+            yield db
+        return
+    failover = _ReadFailover()
+    try:
+        async with open_session(AsyncReplicaSessionLocal, ReplicaSessionLocal) as db:
+            db.info[READ_FAILOVER_KEY] = failover
+            yield db
+    finally:
+        await failover.aclose()
+
+
+async def read_your_writes_middleware(request: Request, call_next):
+    response = await call_next(request)
+    if (
+        settings.DATABASE_REPLICA_URL
+        and request.method not in SAFE_METHODS
+        and response.status_code < 400
+    ):
+        response.set_cookie(
+            PRIMARY_STICKY_COOKIE,
+            str(int(time.time()) + settings.REPLICA_STICKY_SECONDS),
+            max_age=settings.REPLICA_STICKY_SECONDS,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
@@ -1,4 +1,10 @@
 # backend/core/security.py
+import asyncio
+import hashlib
+import hmac
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 from jose import jwt, JWTError, ExpiredSignatureError
@@ -13,6 +19,21 @@ def hash_password(password: str) -> str:
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
+# Pool acotado para bcrypt: no bloquea el event loop ni compite con el
+# threadpool de Starlette que atiende los endpoints síncronos.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS or min(8, os.cpu_count() or 1),
+    thread_name_prefix="pwd-hash",
+)
+
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, hash_password, password)
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, plain, hashed)
+
 def create_access_token(
     subject: str,
     role: str,
@@ -54,3 +75,14 @@ def decode_token(token: str) -> dict | None:
         return None
     except JWTError:
         return None
+
+# URLs firmadas para /files/{id}/content: <audio>/<video> no pueden mandar
+# el header Authorization, así que el cliente pide una URL de vida corta.
+def sign_media_url(file_id: int, expires_at: int) -> str:
+    msg = f"media:{file_id}:{expires_at}".encode()
+    return hmac.new(settings.JWT_SECRET.encode(), msg, hashlib.sha256).hexdigest()
+
+def verify_media_signature(file_id: int, expires_at: int | None, sig: str | None) -> bool:
+    if expires_at is None or not sig or expires_at < time.time():
+        return False
+    return hmac.compare_digest(sign_media_url(file_id, expires_at), sig)
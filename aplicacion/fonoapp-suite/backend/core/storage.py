@@ -0,0 +1,146 @@
+# backend/core/storage.py
+"""
+Almacenamiento direccionado por contenido para MediaFile.
+
+Cada contenido distinto se guarda una sola vez en
+`STORAGE_DIR/blobs/<aa>/<bb>/<sha256><ext>` y tiene una fila en `media_blobs`
+con `ref_count` = nº de MediaFile que lo usan. Subir 200 veces la misma
+ficha PDF cuesta 200 filas de metadatos y un solo archivo en disco.
+
+Orden de operaciones (evita perder blobs con subidas/borrados concurrentes):
+- alta: lock del contenido -> upsert de la fila -> mover el archivo -> commit.
+- baja: decremento (bloquea la fila) -> si llega a 0, borrar la fila -> commit
+  -> `purge_blob_files`: lock del contenido y, si nadie volvió a darlo de
+  alta, borrar el archivo y sus derivados. Nada se borra antes del commit:
+  si la baja hace rollback, la fila vuelve y su contenido sigue en disco.
+
+El "lock del contenido" es un advisory lock de transacción por sha256: una
+subida del mismo contenido entre el commit de la baja y la purga espera o
+hace esperar a la purga, y la purga ve su fila.
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from starlette.concurrency import run_in_threadpool
+
+from .database import AnySession, db_commit, db_execute
+from ..models.file import MediaBlob
+
+STORAGE_DIR = Path("backend/storage")
+BLOBS_DIR = STORAGE_DIR / "blobs"
+MEDIA_PREFIX = "/media/"
+HASH_BLOCK = 1024 * 1024
+BLOB_LOCK_SEED = 7_340_119  # espacio de claves de pg_advisory_xact_lock para blobs
+
+
+def blob_relpath(sha256: str, ext: str) -> str:
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+
+def blob_path(sha256: str, ext: str) -> Path:
+    return STORAGE_DIR / blob_relpath(sha256, ext)
+
+
+def media_url(sha256: str, ext: str) -> str:
+    return f"{MEDIA_PREFIX}{blob_relpath(sha256, ext)}"
+
+
+def resolve_media_path(path: str) -> Optional[Path]:
+    """`MediaFile.path` (/media/...) -> archivo en disco; None si saldría del almacenamiento."""
+    rel = path[len(MEDIA_PREFIX):] if path.startswith(MEDIA_PREFIX) else path
+    full = (STORAGE_DIR / rel).resolve()
+    if STORAGE_DIR.resolve() not in full.parents:
+        return None
+    return full
+
+
+def hash_file(path: Path) -> tuple[str, int]:
+    """(sha256, tamaño) leyendo por bloques; para archivos escritos fuera de orden."""
+    digest, size = hashlib.sha256(), 0
+    with open(path, "rb") as fh:
+        while block := fh.read(HASH_BLOCK):
+            digest.update(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
+
+def _lock_content(sha256: str):
+    return select(func.pg_advisory_xact_lock(func.hashtextextended(sha256, BLOB_LOCK_SEED)))
+
+
+async def acquire_blob(db: AnySession, sha256: str, size: int, ext: str) -> str:
+    """
+    Suma una referencia al blob (lo crea si no existe). Devuelve la extensión
+    con la que está guardado: la del primer archivo con ese contenido.
+    """
+    await db_execute(db, _lock_content(sha256))  # hasta el commit: excluye a purge_blob_files
+    stmt = (
+        pg_insert(MediaBlob)
+        .values(sha256=sha256, size_bytes=size, ext=ext, ref_count=1)
+        .on_conflict_do_update(
+            index_elements=[MediaBlob.sha256],
+            set_={"ref_count": MediaBlob.ref_count + 1},
+        )
+        .returning(MediaBlob.ext)
+    )
+    return (await db_execute(db, stmt)).scalar_one()
+
+
+def place_blob(src: Path, sha256: str, ext: str) -> bool:
+    """
+    Mueve `src` a su ruta de blob si aún no está en disco (primera copia o
+    archivo perdido). Devuelve True si lo movió; si no, `src` sobra.
+    """
+    dst = blob_path(sha256, ext)
+    if dst.exists():
+        return False
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(src, dst)  # mismo FS: rename atómico
+    return True
+
+
+async def release_blob(db: AnySession, sha256: Optional[str]) -> List[Path]:
+    """
+    Resta una referencia; con 0 borra la fila. No toca el disco: devuelve el
+    blob y sus derivados para `purge_blob_files`, tras un commit exitoso.
+    """
+    if not sha256:
+        return []
+    row = (await db_execute(
+        db,
+        update(MediaBlob)
+        .where(MediaBlob.sha256 == sha256)
+        .values(ref_count=MediaBlob.ref_count - 1)
+        .returning(MediaBlob.ref_count, MediaBlob.ext),
+    )).one_or_none()
+    if row is None or row.ref_count > 0:
+        return []
+    await db_execute(db, delete(MediaBlob).where(MediaBlob.sha256 == sha256))  # CASCADE: media_derivatives
+    return [blob_path(sha256, row.ext)]
+
+
+def _unlink_all(paths: List[Path]) -> None:
+    for path in paths:
+        path.unlink(missing_ok=True)
+        for derived in path.parent.glob(f"{path.name.split('.')[0]}.*"):  # <sha256>.thumb.webp, .peaks, .speech.ogg
+            derived.unlink(missing_ok=True)
+
+
+async def purge_blob_files(db: AnySession, sha256: str, paths: List[Path]) -> bool:
+    """
+    Borra del disco lo que devolvió `release_blob`, en una transacción propia
+    tras su commit. Si entretanto se volvió a subir el contenido, no borra.
+    Devuelve True si borró.
+    """
+    if not paths:
+        return False
+    await db_execute(db, _lock_content(sha256))
+    revived = (await db_execute(db, select(MediaBlob.sha256).where(MediaBlob.sha256 == sha256))).first()
+    if revived is None:
+        await run_in_threadpool(_unlink_all, paths)
+    await db_commit(db)  # libera el lock
+    return revived is None
@@ -0,0 +1,92 @@
+# backend/jobs/analyze_recordings.py
+"""
+Análisis acústico de las grabaciones WAV sin análisis vigente: archivos
+anteriores al pipeline, análisis descartados con la cola llena o hechos con
+una versión anterior del algoritmo (ANALYSIS_VERSION). Con `--all` reanaliza
+todo (p. ej. tras cambiar ACOUSTIC_F0_MIN_HZ / ACOUSTIC_F0_MAX_HZ).
+Requiere backend/migrations/007_acoustic_analyses.sql.
+
+    docker compose exec api python -m backend.jobs.analyze_recordings [--all] [--workers 4]
+"""
+import argparse
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import exists, or_, select
+
+from ..core.acoustics import ANALYSIS_VERSION, ANALYZABLE_EXTS, analyze_wav
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.media_pipeline import analysis_options, save_analysis
+from ..core.storage import resolve_media_path
+from ..models.acoustics import AcousticAnalysis
+from ..models.file import MediaFile
+
+logger = logging.getLogger("analyze_recordings")
+
+
+def _pending(db, reanalyze: bool, after: int, batch: int) -> list:
+    stmt = (
+        select(MediaFile.id, MediaFile.path)
+        .where(
+            MediaFile.sha256.is_not(None),
+            or_(*(MediaFile.path.ilike(f"%{ext}") for ext in sorted(ANALYZABLE_EXTS))),
+            MediaFile.id > after,
+        )
+        .order_by(MediaFile.id)
+        .limit(batch)
+    )
+    if not reanalyze:
+        current = exists().where(
+            AcousticAnalysis.media_file_id == MediaFile.id,
+            AcousticAnalysis.analyzer_version >= ANALYSIS_VERSION,
+        )
+        stmt = stmt.where(~current)
+    return db.execute(stmt).all()
+
+
+def run(reanalyze: bool = False, workers: int = 2, batch: int = 100) -> dict:
+    counts = {"analyzed": 0, "missing": 0, "failed": 0}
+    options = analysis_options()
+    ctx = multiprocessing.get_context("spawn")
+    last = 0
+    with SessionLocal() as db, ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        while True:
+            rows = _pending(db, reanalyze, last, batch)
+            if not rows:
+                break
+            futures = []
+            for row in rows:
+                src = resolve_media_path(row.path)
+                if src is None or not src.is_file():
+                    counts["missing"] += 1
+                    continue
+                futures.append((row, pool.submit(analyze_wav, str(src), **options)))
+            for row, future in futures:
+                try:
+                    save_analysis(db, row.id, future.result())
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    logger.exception("Failed to analyze media file %s", row.id)
+                    counts["failed"] += 1
+                    continue
+                counts["analyzed"] += 1
+            last = rows[-1].id
+    return counts
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--all", action="store_true", help="reanaliza también los que ya tienen análisis vigente")
+    ap.add_argument("--workers", type=int, default=max(1, settings.DERIVATIVE_WORKERS))
+    ap.add_argument("--batch", type=int, default=100)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    counts = run(reanalyze=args.all, workers=args.workers, batch=args.batch)
+    logger.info("Analysis finished: %s", counts)
+
+
+if __name__ == "__main__":
+    main()
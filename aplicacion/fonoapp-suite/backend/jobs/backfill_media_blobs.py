@@ -0,0 +1,92 @@
+# backend/jobs/backfill_media_blobs.py
+"""
+Pasa los MediaFile anteriores al almacenamiento por contenido a blobs/.
+
+Para cada fila sin sha256: calcula el hash del archivo, suma una referencia
+al blob (lo crea si es nuevo), mueve o descarta el archivo original y
+actualiza la fila. Una transacción por archivo; se puede relanzar (solo
+procesa filas con sha256 NULL). Requiere backend/migrations/005_media_blobs.sql.
+
+    docker compose exec api python -m backend.jobs.backfill_media_blobs [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import select
+
+from ..core.database import SessionLocal
+from ..core.storage import (
+    acquire_blob, blob_path, hash_file, media_url, place_blob, resolve_media_path,
+)
+from ..models.file import MediaFile
+
+logger = logging.getLogger("backfill_media_blobs")
+
+
+async def _migrate_one(db, record: MediaFile, dry_run: bool) -> str:
+    src = resolve_media_path(record.path)  # None: fuera del almacenamiento, no se toca
+    if src is None or not src.is_file():
+        return "missing"
+    sha256, size = hash_file(src)
+    if dry_run:
+        return "would_migrate"
+    blob_ext = await acquire_blob(db, sha256, size, src.suffix.lower())
+    placed = place_blob(src, sha256, blob_ext)
+    record.sha256, record.size_bytes = sha256, size
+    record.path = media_url(sha256, blob_ext)
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        if placed:
+            blob_path(sha256, blob_ext).replace(src)
+        raise
+    if not placed:
+        src.unlink(missing_ok=True)  # duplicado de un blob existente
+        return "deduplicated"
+    return "migrated"
+
+
+async def run(dry_run: bool = False, batch: int = 500) -> dict:
+    counts: dict = {}
+    last_id = 0
+    with SessionLocal() as db:
+        while True:
+            # keyset por id: las filas migradas dejan de cumplir el filtro
+            ids = db.execute(
+                select(MediaFile.id)
+                .where(MediaFile.sha256.is_(None), MediaFile.id > last_id)
+                .order_by(MediaFile.id)
+                .limit(batch)
+            ).scalars().all()
+            if not ids:
+                break
+            for file_id in ids:
+                record = db.execute(
+                    select(MediaFile).where(MediaFile.id == file_id).with_for_update()
+                ).scalar_one()
+                try:
+                    outcome = await _migrate_one(db, record, dry_run)
+                except Exception:
+                    logger.exception("Failed to migrate media file %s", file_id)
+                    outcome = "failed"
+                if outcome in ("missing", "would_migrate"):
+                    db.rollback()  # libera el bloqueo de la fila
+                counts[outcome] = counts.get(outcome, 0) + 1
+            last_id = ids[-1]
+    return counts
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--dry-run", action="store_true", help="solo calcula hashes, no modifica nada")
+    ap.add_argument("--batch", type=int, default=500)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    counts = asyncio.run(run(dry_run=args.dry_run, batch=args.batch))
+    logger.info("Backfill finished: %s", counts)
+
+
+if __name__ == "__main__":
+    main()
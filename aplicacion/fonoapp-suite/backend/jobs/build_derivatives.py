@@ -0,0 +1,83 @@
+# backend/jobs/build_derivatives.py
+"""
+Genera los derivados de media (miniaturas, picos de onda, audio comprimido)
+de los blobs que no tienen ninguno: archivos anteriores al pipeline, subidas
+descartadas con la cola llena o workers reiniciados con trabajo pendiente.
+Con `--all` regenera todos (p. ej. tras cambiar DERIVATIVE_THUMB_SIZE).
+Requiere backend/migrations/006_media_derivatives.sql.
+
+    docker compose exec api python -m backend.jobs.build_derivatives [--all] [--workers 4]
+"""
+import argparse
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import exists, select
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.derivatives import AUDIO_EXTS, IMAGE_EXTS, build_derivatives
+from ..core.media_pipeline import derivative_options, save_derivatives
+from ..core.storage import blob_path
+from ..models.file import MediaBlob, MediaDerivative
+
+logger = logging.getLogger("build_derivatives")
+
+
+def _pending(db, rebuild: bool, after: str, batch: int) -> list:
+    stmt = (
+        select(MediaBlob.sha256, MediaBlob.ext)
+        .where(MediaBlob.ext.in_(sorted(IMAGE_EXTS | AUDIO_EXTS)), MediaBlob.sha256 > after)
+        .order_by(MediaBlob.sha256)
+        .limit(batch)
+    )
+    if not rebuild:
+        stmt = stmt.where(~exists().where(MediaDerivative.sha256 == MediaBlob.sha256))
+    return db.execute(stmt).all()
+
+
+def run(rebuild: bool = False, workers: int = 2, batch: int = 200) -> dict:
+    counts = {"built": 0, "empty": 0, "failed": 0}
+    options = derivative_options()
+    ctx = multiprocessing.get_context("spawn")
+    last = ""
+    with SessionLocal() as db, ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        while True:
+            # keyset por sha256: lo procesado no vuelve a aparecer aunque quede sin derivados
+            rows = _pending(db, rebuild, last, batch)
+            if not rows:
+                break
+            futures = [
+                (row, pool.submit(build_derivatives, str(blob_path(row.sha256, row.ext).resolve()),
+                                  row.sha256, row.ext, **options))
+                for row in rows
+            ]
+            for row, future in futures:
+                try:
+                    made = future.result()
+                    save_derivatives(db, row.sha256, row.ext, made)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    logger.exception("Failed to build derivatives for blob %s", row.sha256)
+                    counts["failed"] += 1
+                    continue
+                counts["built" if made else "empty"] += 1
+            last = rows[-1].sha256
+    return counts
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--all", action="store_true", help="regenera también los blobs que ya tienen derivados")
+    ap.add_argument("--workers", type=int, default=max(1, settings.DERIVATIVE_WORKERS))
+    ap.add_argument("--batch", type=int, default=200)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    counts = run(rebuild=args.all, workers=args.workers, batch=args.batch)
+    logger.info("Derivatives finished: %s", counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# backend/jobs/import_patients.py
+"""
+Importa pacientes desde un CSV o NDJSON (misma lógica que POST /patients/import).
+
+Imprime el informe en JSON; el código de salida es 1 si alguna fila falló.
+
+    docker compose exec -T api python -m backend.jobs.import_patients - --format csv < pacientes.csv
+    docker compose exec api python -m backend.jobs.import_patients /data/pacientes.ndjson --on-duplicate update
+"""
+import argparse
+import io
+import json
+import sys
+from dataclasses import asdict
+
+from ..core.database import SessionLocal
+from ..core.patient_import import DUPLICATE_POLICIES, IMPORT_BATCH, IMPORT_FORMATS, guess_format, import_patients
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("path", help="archivo a importar; '-' = stdin")
+    ap.add_argument("--format", choices=IMPORT_FORMATS)
+    ap.add_argument("--on-duplicate", choices=DUPLICATE_POLICIES, default="skip")
+    ap.add_argument("--dry-run", action="store_true", help="solo valida y cuenta, no escribe")
+    ap.add_argument("--batch", type=int, default=IMPORT_BATCH)
+    args = ap.parse_args()
+
+    fmt = args.format or guess_format(args.path)
+    if fmt is None:
+        ap.error("no se reconoce el formato: use --format")
+    if args.path == "-":
+        fh = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+    else:
+        fh = open(args.path, encoding="utf-8-sig", newline="")
+    with fh, SessionLocal() as db:
+        report = import_patients(db, fh, fmt, on_duplicate=args.on_duplicate,
+                                 dry_run=args.dry_run, batch_size=args.batch)
+    json.dump(asdict(report), sys.stdout, ensure_ascii=False, indent=2, default=str)
+    sys.stdout.write("\n")
+    sys.exit(1 if report.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# backend/jobs/refresh_dashboard.py
+"""
+Refresca las vistas materializadas del tablero (GET /dashboard) sin esperar
+al intervalo de la API. Útil tras cargas masivas o con
+DASHBOARD_REFRESH_SECONDS=0 (refresco solo por cron).
+Requiere backend/migrations/010_dashboard_views.sql.
+
+    docker compose exec api python -m backend.jobs.refresh_dashboard
+"""
+import argparse
+import logging
+
+from sqlalchemy import select
+
+from ..core.database import SessionLocal
+from ..core.dashboard import refresh_views
+from ..models.dashboard import DashboardRefresh
+
+logger = logging.getLogger("refresh_dashboard")
+
+
+def run() -> bool:
+    with SessionLocal() as db:
+        if not refresh_views(db):
+            return False
+        for row in db.execute(select(DashboardRefresh).order_by(DashboardRefresh.view_name)).scalars():
+            logger.info("%-26s %6d ms", row.view_name, row.duration_ms or 0)
+    return True
+
+
+def main() -> None:
+    argparse.ArgumentParser(description=__doc__.splitlines()[1]).parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    if not run():
+        logger.warning("Refresh skipped: not Postgres, or another process is refreshing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# backend/jobs/rescore_assessments.py
+"""
+Recalcula en el servidor el puntaje de los resultados de evaluación cuya
+plantilla tiene `items` (core/assessment_scoring.py). Por defecto solo los
+puntuados con otra versión de la plantilla; `--all` los recalcula todos.
+Recorre cada plantilla por lotes (keyset por id) con commit por lote.
+Requiere backend/migrations/011_assessment_scoring.sql.
+
+    docker compose exec api python -m backend.jobs.rescore_assessments [--template 3] [--all]
+"""
+import argparse
+import logging
+
+from sqlalchemy import select
+
+from ..core.assessment_scoring import RESCORE_BATCH, TemplateError, rescore_template
+from ..core.database import SessionLocal
+from ..models.assessment import AssessmentTemplate
+
+logger = logging.getLogger("rescore_assessments")
+
+
+def run(template_id: int = None, rescore_all: bool = False, batch: int = RESCORE_BATCH) -> dict:
+    totals = {"rescored": 0, "invalid": 0, "templates": 0}
+    with SessionLocal() as db:
+        stmt = select(AssessmentTemplate.id).order_by(AssessmentTemplate.id)
+        if template_id is not None:
+            stmt = stmt.where(AssessmentTemplate.id == template_id)
+        for tid in db.scalars(stmt).all():
+            try:
+                counts = rescore_template(db, tid, only_stale=not rescore_all, batch=batch)
+            except TemplateError as exc:  # plantilla guardada antes de validar el schema
+                logger.error("Template %s cannot be compiled: %s", tid, exc)
+                continue
+            if counts["rescored"] or counts["invalid"]:
+                logger.info("Template %s: %s", tid, counts)
+                totals["templates"] += 1
+            totals["rescored"] += counts["rescored"]
+            totals["invalid"] += counts["invalid"]
+    return totals
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--template", type=int, help="solo esta plantilla")
+    ap.add_argument("--all", action="store_true", help="recalcula también los que ya están al día")
+    ap.add_argument("--batch", type=int, default=RESCORE_BATCH)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    totals = run(template_id=args.template, rescore_all=args.all, batch=args.batch)
+    logger.info("Rescoring finished: %s", totals)
+
+
+if __name__ == "__main__":
+    main()
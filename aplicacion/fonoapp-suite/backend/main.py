@@ -1,13 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 from .core.config import settings
 from .core.database import Base, engine
+from .core.media_pipeline import pipeline as media_pipeline
+from .core.pagination import NEXT_CURSOR_HEADER
+from .core.replica import read_your_writes_middleware
 from . import models  # asegura que __init__ importa todos los modelos
 
 from .routers import (
-    auth, patients, appointments, plans, assessments, assignments, files, realtime
+    auth, patients, appointments, plans, assessments, assignments, files, realtime, dashboard
 )
 
 def init_db():
@@ -21,12 +23,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],  # el frontend debe poder leer el cursor
 )
 
+# Tras una escritura, las lecturas del mismo cliente van al primario un rato
+app.middleware("http")(read_your_writes_middleware)
+
 @app.on_event("startup")
 def on_startup():
     init_db()
 
+@app.on_event("startup")
+async def start_background_jobs():
+    realtime.manager.start()  # evicción de salas inactivas
+    files.start_upload_gc()   # sesiones de subida abandonadas
+    media_pipeline.start()  # derivados de media y análisis acústico
+    dashboard.start_dashboard_refresh()  # vistas materializadas del tablero
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    files.stop_upload_gc()
+    dashboard.stop_dashboard_refresh()
+    await media_pipeline.stop()
+    await realtime.manager.close()
+
 # Cada router ya define su prefix internamente (p. ej., /auth)
 app.include_router(auth.router)
 app.include_router(patients.router)
@@ -36,8 +56,9 @@ app.include_router(assessments.router)
 app.include_router(assignments.router)
 app.include_router(files.router)
 app.include_router(realtime.router)
+app.include_router(dashboard.router)
 
-app.mount("/media", StaticFiles(directory="backend/storage"), name="media")
+# /media ya no se monta como estático público: GET /files/{id}/content (autenticado)
 
 @app.get("/health")
 def health():
@@ -0,0 +1,20 @@
+-- 001_patient_search.sql
+-- Búsqueda indexada de pacientes (nombre sin tildes + prefijo de cédula).
+-- Idempotente. Ejecutar fuera de una transacción (CREATE INDEX CONCURRENTLY):
+--   docker compose exec -T db psql -U fono -d fonoapp < backend/migrations/001_patient_search.sql
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() es STABLE; el índice necesita una función IMMUTABLE
+CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_patients_search_name_trgm
+    ON patients USING gin (f_unaccent(lower(first_name || ' ' || last_name)) gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_patients_cedula_norm_prefix
+    ON patients (cedula_norm text_pattern_ops);
+
+ANALYZE patients;
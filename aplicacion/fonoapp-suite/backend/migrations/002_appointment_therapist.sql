@@ -0,0 +1,41 @@
+-- 002_appointment_therapist.sql
+-- Citas por terapeuta + constraint de exclusión (GiST) contra solapamientos.
+-- Idempotente. Si ya existen citas activas solapadas para un mismo terapeuta
+-- el constraint fallará: resolverlas (cancelar/mover) y volver a ejecutar.
+--
+-- ck_appointments_range se crea NOT VALID (no revisa filas existentes) y se
+-- valida al final. Si el VALIDATE falla hay citas con ends_at <= starts_at;
+-- localizarlas y corregirlas (o cancelarlas) antes de volver a ejecutar:
+--   SELECT id, patient_id, starts_at, ends_at, status
+--     FROM appointments WHERE ends_at <= starts_at ORDER BY starts_at;
+-- Una limpieza razonable es darles la duración mínima de una cita:
+--   UPDATE appointments SET ends_at = starts_at + interval '30 minutes'
+--    WHERE ends_at <= starts_at;
+--   docker compose exec -T db psql -U fono -d fonoapp < backend/migrations/002_appointment_therapist.sql
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE appointments
+    ADD COLUMN IF NOT EXISTS therapist_id integer REFERENCES users(id);
+
+CREATE INDEX IF NOT EXISTS ix_appointments_therapist_id ON appointments (therapist_id);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'ck_appointments_range') THEN
+        ALTER TABLE appointments
+            ADD CONSTRAINT ck_appointments_range CHECK (ends_at > starts_at) NOT VALID;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'ex_appointments_therapist_overlap') THEN
+        ALTER TABLE appointments
+            ADD CONSTRAINT ex_appointments_therapist_overlap
+            EXCLUDE USING gist (therapist_id WITH =, tsrange(starts_at, ends_at, '[)') WITH &&)
+            WHERE (therapist_id IS NOT NULL AND status <> 'canceled');
+    END IF;
+END $$;
+
+-- No-op si ya está validado; falla (sin bloquear escrituras) si quedan filas
+-- inválidas: ver la consulta de la cabecera.
+ALTER TABLE appointments VALIDATE CONSTRAINT ck_appointments_range;
+
+ANALYZE appointments;
@@ -0,0 +1,33 @@
+-- 003_appointment_series.sql
+-- Series recurrentes con expansión perezosa; solo las excepciones se guardan en appointments.
+-- Idempotente.
+--   docker compose exec -T db psql -U fono -d fonoapp < backend/migrations/003_appointment_series.sql
+
+CREATE TABLE IF NOT EXISTS appointment_series (
+    id               serial PRIMARY KEY,
+    patient_id       integer NOT NULL REFERENCES patients(id),
+    therapist_id     integer REFERENCES users(id),
+    starts_at        timestamp NOT NULL,
+    duration_minutes integer NOT NULL,
+    freq             varchar(16) NOT NULL DEFAULT 'weekly',
+    interval         integer NOT NULL DEFAULT 1,
+    until            timestamp,
+    status           varchar(32) NOT NULL DEFAULT 'active',
+    notes            text,
+    created_at       timestamp DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_appointment_series_id ON appointment_series (id);
+CREATE INDEX IF NOT EXISTS ix_appointment_series_patient_id ON appointment_series (patient_id);
+CREATE INDEX IF NOT EXISTS ix_appointment_series_therapist_id ON appointment_series (therapist_id);
+
+ALTER TABLE appointments
+    ADD COLUMN IF NOT EXISTS series_id integer REFERENCES appointment_series(id) ON DELETE CASCADE,
+    ADD COLUMN IF NOT EXISTS original_starts_at timestamp;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_appointments_series_occurrence') THEN
+        ALTER TABLE appointments
+            ADD CONSTRAINT uq_appointments_series_occurrence UNIQUE (series_id, original_starts_at);
+    END IF;
+END $$;
@@ -0,0 +1,16 @@
+-- 004_upload_sessions.sql
+-- Subidas reanudables por trozos (/files/uploads). Idempotente.
+--   docker compose exec -T db psql -U fono -d fonoapp < backend/migrations/004_upload_sessions.sql
+
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id          varchar(32) PRIMARY KEY,
+    created_by  integer NOT NULL REFERENCES users(id),
+    patient_id  integer REFERENCES patients(id),
+    filename    varchar(255) NOT NULL,
+    ext         varchar(16) NOT NULL,
+    size        bigint NOT NULL,
+    received    json NOT NULL DEFAULT '[]',
+    created_at  timestamp DEFAULT now(),
+    updated_at  timestamp DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_upload_sessions_updated_at ON upload_sessions (updated_at);
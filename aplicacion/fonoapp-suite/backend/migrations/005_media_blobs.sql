@@ -0,0 +1,19 @@
+-- 005_media_blobs.sql
+-- Almacenamiento por contenido (sha256) con conteo de referencias. Idempotente.
+--   docker compose exec -T db psql -U fono -d fonoapp < backend/migrations/005_media_blobs.sql
+-- Después, mover los archivos existentes a blobs/:
+--   docker compose exec api python -m backend.jobs.backfill_media_blobs
+
+CREATE TABLE IF NOT EXISTS media_blobs (
+    sha256      varchar(64) PRIMARY KEY,
+    size_bytes  bigint NOT NULL,
+    ext         varchar(16) NOT NULL,
+    ref_count   integer NOT NULL DEFAULT 0,
+    created_at  timestamp DEFAULT now()
+);
+
+ALTER TABLE media_files
+    ADD COLUMN IF NOT EXISTS sha256 varchar(64) REFERENCES media_blobs(sha256),
+    ADD COLUMN IF NOT EXISTS size_bytes bigint,
+    ADD COLUMN IF NOT EXISTS original_name varchar(255);
+CREATE INDEX IF NOT EXISTS ix_media_files_sha256 ON media_files (sha256);
@@ -0,0 +1,16 @@
+-- 006_media_derivatives.sql
+-- Derivados por blob (miniaturas, picos de forma de onda, audio comprimido). Idempotente.
+--   docker compose exec -T db psql -U fono -d fonoapp < backend/migrations/006_media_derivatives.sql
+-- Para generar los de archivos ya subidos:
+--   docker compose exec api python -m backend.jobs.build_derivatives
+
+CREATE TABLE IF NOT EXISTS media_derivatives (
+    sha256        varchar(64) NOT NULL REFERENCES media_blobs(sha256) ON DELETE CASCADE,
+    kind          varchar(16) NOT NULL,
+    path          varchar(512) NOT NULL,
+    content_type  varchar(100) NOT NULL,
+    size_bytes    bigint NOT NULL,
+    meta          json,
+    created_at    timestamp DEFAULT now(),
+    PRIMARY KEY (sha256, kind)
+);
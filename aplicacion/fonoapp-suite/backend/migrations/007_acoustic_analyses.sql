@@ -0,0 +1,27 @@
+-- 007_acoustic_analyses.sql
+-- Análisis acústico por grabación (F0, intensidad, jitter/shimmer, velocidad de habla). Idempotente.
+--   docker compose exec -T db psql -U fono -d fonoapp < backend/migrations/007_acoustic_analyses.sql
+-- Para analizar los WAV ya subidos:
+--   docker compose exec api python -m backend.jobs.analyze_recordings
+
+CREATE TABLE IF NOT EXISTS acoustic_analyses (
+    id                 serial PRIMARY KEY,
+    media_file_id      integer NOT NULL UNIQUE REFERENCES media_files(id) ON DELETE CASCADE,
+    patient_id         integer REFERENCES patients(id) ON DELETE CASCADE,
+    analyzer_version   integer NOT NULL,
+    duration_seconds   double precision NOT NULL,
+    voiced_fraction    double precision,
+    f0_mean_hz         double precision,
+    f0_sd_semitones    double precision,
+    intensity_mean_db  double precision,
+    jitter_local       double precision,
+    shimmer_local      double precision,
+    speaking_rate      double precision,
+    features           json NOT NULL,
+    contour            json,
+    created_at         timestamp DEFAULT now(),
+    updated_at         timestamp DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_acoustic_analyses_id ON acoustic_analyses (id);
+CREATE INDEX IF NOT EXISTS ix_acoustic_analyses_patient ON acoustic_analyses (patient_id, id);
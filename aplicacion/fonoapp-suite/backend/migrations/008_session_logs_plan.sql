@@ -0,0 +1,6 @@
+-- 008_session_logs_plan.sql
+-- Índice de logs por plan: listado de sesiones y huella de caché de GET /plans/{id}/progress.
+-- Idempotente. Ejecutar fuera de una transacción (CREATE INDEX CONCURRENTLY):
+--   docker compose exec -T db psql -U fono -d fonoapp < backend/migrations/008_session_logs_plan.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_session_logs_plan ON session_logs (plan_id, id);
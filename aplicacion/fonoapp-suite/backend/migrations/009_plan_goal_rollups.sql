@@ -0,0 +1,39 @@
+-- 009_plan_goal_rollups.sql
+-- Agregado incremental de progreso por plan y meta (POST /plans/{id}/logs lo mantiene). Idempotente.
+--   docker compose exec -T db psql -U fono -d fonoapp < backend/migrations/009_plan_goal_rollups.sql
+
+CREATE TABLE IF NOT EXISTS plan_goal_rollups (
+    plan_id     integer NOT NULL REFERENCES treatment_plans(id) ON DELETE CASCADE,
+    goal_index  integer NOT NULL,
+    n           integer NOT NULL,
+    total       double precision NOT NULL,
+    total_sq    double precision NOT NULL,
+    min_value   double precision NOT NULL,
+    max_value   double precision NOT NULL,
+    last_value  double precision NOT NULL,
+    first_date  timestamp NOT NULL,
+    last_date   timestamp NOT NULL,
+    updated_at  timestamp DEFAULT now(),
+    PRIMARY KEY (plan_id, goal_index)
+);
+
+-- Carga inicial desde los logs existentes (una pasada, agrupada)
+INSERT INTO plan_goal_rollups (plan_id, goal_index, n, total, total_sq, min_value, max_value,
+                               last_value, first_date, last_date)
+SELECT l.plan_id,
+       p.key::integer,
+       count(*),
+       sum(p.value::double precision),
+       sum(p.value::double precision ^ 2),
+       min(p.value::double precision),
+       max(p.value::double precision),
+       (array_agg(p.value::double precision ORDER BY l.date DESC, l.id DESC))[1],
+       min(l.date),
+       max(l.date)
+FROM session_logs l
+CROSS JOIN LATERAL json_each_text(l.progress) AS p(key, value)
+WHERE l.date IS NOT NULL
+  AND p.key ~ '^[0-9]+$'
+  AND p.value ~ '^-?[0-9]+(\.[0-9]+)?([eE][-+]?[0-9]+)?$'
+GROUP BY l.plan_id, p.key::integer
+ON CONFLICT (plan_id, goal_index) DO NOTHING;
@@ -0,0 +1,143 @@
+-- 010_dashboard_views.sql
+-- Vistas materializadas del tablero de la clínica (GET /dashboard) y registro de refrescos. Idempotente.
+--   docker compose exec -T db psql -U fono -d fonoapp < backend/migrations/010_dashboard_views.sql
+-- La API las refresca cada DASHBOARD_REFRESH_SECONDS; a mano o por cron:
+--   docker compose exec api python -m backend.jobs.refresh_dashboard
+-- Mantener sincronizado con core/dashboard.py (VIEWS).
+
+CREATE TABLE IF NOT EXISTS dashboard_refreshes (
+    view_name     varchar(64) PRIMARY KEY,
+    refreshed_at  timestamptz NOT NULL,
+    duration_ms   integer
+);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_dashboard_totals AS
+SELECT 1 AS id,
+       (SELECT count(*) FROM patients WHERE deleted_at IS NULL) AS patients,
+       (SELECT count(*) FROM treatment_plans WHERE status = 'active') AS active_plans,
+       a.appointments, a.completed, a.canceled, a.no_show, a.unresolved,
+       t.assignments_due, t.assignments_done, t.assignments_overdue
+FROM (
+    SELECT count(*) AS appointments,
+           count(*) FILTER (WHERE status = 'completed') AS completed,
+           count(*) FILTER (WHERE status = 'canceled') AS canceled,
+           count(*) FILTER (WHERE status = 'no_show') AS no_show,
+           count(*) FILTER (WHERE status = 'scheduled') AS unresolved
+    FROM appointments
+    WHERE starts_at >= now() - interval '90 days' AND starts_at < now()
+) a,
+(
+    SELECT count(*) FILTER (WHERE due_at >= now() - interval '90 days') AS assignments_due,
+           count(*) FILTER (WHERE due_at >= now() - interval '90 days' AND status = 'done') AS assignments_done,
+           count(*) FILTER (WHERE status <> 'done') AS assignments_overdue
+    FROM assignments
+    WHERE due_at < now()
+) t;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_dashboard_totals ON mv_dashboard_totals (id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_dashboard_therapists AS
+WITH caseload AS (
+    SELECT therapist_id, patient_id FROM appointments
+    WHERE therapist_id IS NOT NULL AND starts_at >= now() - interval '90 days'
+    UNION
+    SELECT therapist_id, patient_id FROM appointment_series
+    WHERE therapist_id IS NOT NULL AND status = 'active'
+),
+load AS (
+    SELECT c.therapist_id,
+           count(DISTINCT c.patient_id) AS caseload,
+           count(p.id) AS active_plans
+    FROM caseload c
+    LEFT JOIN treatment_plans p ON p.patient_id = c.patient_id AND p.status = 'active'
+    GROUP BY c.therapist_id
+),
+visits AS (
+    SELECT therapist_id,
+           count(*) AS appointments,
+           count(*) FILTER (WHERE status = 'completed') AS completed,
+           count(*) FILTER (WHERE status = 'canceled') AS canceled,
+           count(*) FILTER (WHERE status = 'no_show') AS no_show,
+           count(*) FILTER (WHERE status = 'scheduled') AS unresolved
+    FROM appointments
+    WHERE therapist_id IS NOT NULL AND starts_at >= now() - interval '90 days' AND starts_at < now()
+    GROUP BY therapist_id
+)
+SELECT u.id AS therapist_id, u.full_name,
+       coalesce(l.caseload, 0) AS caseload, coalesce(l.active_plans, 0) AS active_plans,
+       coalesce(v.appointments, 0) AS appointments, coalesce(v.completed, 0) AS completed,
+       coalesce(v.canceled, 0) AS canceled, coalesce(v.no_show, 0) AS no_show,
+       coalesce(v.unresolved, 0) AS unresolved
+FROM users u
+LEFT JOIN load l ON l.therapist_id = u.id
+LEFT JOIN visits v ON v.therapist_id = u.id
+WHERE u.role = 'therapist' OR l.therapist_id IS NOT NULL OR v.therapist_id IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_dashboard_therapists ON mv_dashboard_therapists (therapist_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_dashboard_weekly AS
+WITH weeks AS (
+    SELECT generate_series(date_trunc('week', localtimestamp) - interval '25 weeks', date_trunc('week', localtimestamp), interval '1 week') AS week
+),
+logs AS (
+    SELECT date_trunc('week', l.date) AS week, count(*) AS sessions,
+           count(DISTINCT p.patient_id) AS patients
+    FROM session_logs l JOIN treatment_plans p ON p.id = l.plan_id
+    WHERE l.date >= date_trunc('week', localtimestamp) - interval '25 weeks'
+    GROUP BY 1
+),
+appts AS (
+    SELECT date_trunc('week', starts_at) AS week, count(*) AS appointments,
+           count(*) FILTER (WHERE status = 'completed') AS completed,
+           count(*) FILTER (WHERE status = 'canceled') AS canceled,
+           count(*) FILTER (WHERE status = 'no_show') AS no_show
+    FROM appointments
+    WHERE starts_at >= date_trunc('week', localtimestamp) - interval '25 weeks' AND starts_at < now()
+    GROUP BY 1
+),
+tasks AS (
+    SELECT date_trunc('week', due_at) AS week, count(*) AS assignments_due,
+           count(*) FILTER (WHERE status = 'done') AS assignments_done
+    FROM assignments
+    WHERE due_at >= date_trunc('week', localtimestamp) - interval '25 weeks' AND due_at < now()
+    GROUP BY 1
+)
+SELECT w.week,
+       coalesce(l.sessions, 0) AS sessions, coalesce(l.patients, 0) AS patients,
+       coalesce(a.appointments, 0) AS appointments, coalesce(a.completed, 0) AS completed,
+       coalesce(a.canceled, 0) AS canceled, coalesce(a.no_show, 0) AS no_show,
+       coalesce(t.assignments_due, 0) AS assignments_due,
+       coalesce(t.assignments_done, 0) AS assignments_done
+FROM weeks w
+LEFT JOIN logs l USING (week)
+LEFT JOIN appts a USING (week)
+LEFT JOIN tasks t USING (week);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_dashboard_weekly ON mv_dashboard_weekly (week);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_dashboard_scores AS
+WITH stats AS (
+    SELECT template_id, count(*) AS n,
+           avg(score)::float8 AS mean, stddev_samp(score)::float8 AS sd,
+           min(score) AS min_score, max(score) AS max_score,
+           percentile_cont(ARRAY[0.25, 0.5, 0.75]) WITHIN GROUP (ORDER BY score) AS quartiles
+    FROM assessment_results
+    WHERE score IS NOT NULL
+    GROUP BY template_id
+),
+buckets AS (
+    -- 10 intervalos iguales en [min, max + 1)
+    SELECT r.template_id,
+           width_bucket(r.score::float8, s.min_score::float8, (s.max_score + 1)::float8, 10) AS bucket,
+           count(*) AS c
+    FROM assessment_results r JOIN stats s USING (template_id)
+    WHERE r.score IS NOT NULL
+    GROUP BY 1, 2
+)
+SELECT s.template_id, t.name, s.n, s.mean, s.sd, s.min_score, s.max_score,
+       s.quartiles[1] AS p25, s.quartiles[2] AS median, s.quartiles[3] AS p75,
+       ARRAY(
+           SELECT coalesce(b.c, 0)
+           FROM generate_series(1, 10) g
+           LEFT JOIN buckets b ON b.template_id = s.template_id AND b.bucket = g
+           ORDER BY g
+       ) AS histogram
+FROM stats s JOIN assessment_templates t ON t.id = s.template_id;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_dashboard_scores ON mv_dashboard_scores (template_id);
@@ -0,0 +1,13 @@
+-- 011_assessment_scoring.sql
+-- Puntaje en el servidor de las evaluaciones: subescalas y versión de plantilla usada.
+-- Idempotente. Ejecutar fuera de una transacción (CREATE INDEX CONCURRENTLY):
+--   docker compose exec -T db psql -U fono -d fonoapp < backend/migrations/011_assessment_scoring.sql
+-- Para puntuar los resultados existentes de plantillas con `items`:
+--   docker compose exec api python -m backend.jobs.rescore_assessments
+
+ALTER TABLE assessment_results ADD COLUMN IF NOT EXISTS subscores jsonb;
+ALTER TABLE assessment_results ADD COLUMN IF NOT EXISTS scored_with timestamp;
+
+-- Recorrido por plantilla en lotes (keyset por id) del re-puntaje
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_assessment_results_template
+    ON assessment_results (template_id, id);
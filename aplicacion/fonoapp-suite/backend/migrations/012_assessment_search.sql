@@ -0,0 +1,17 @@
+-- 012_assessment_search.sql
+-- Índices para GET /assessments/results/search (filtros por respuestas y puntaje).
+-- Idempotente. Ejecutar fuera de una transacción (CREATE INDEX CONCURRENTLY):
+--   docker compose exec -T db psql -U fono -d fonoapp < backend/migrations/012_assessment_search.sql
+
+-- responses @> '{"q7": 3}': una entrada por (ruta, valor)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_assessment_results_responses
+    ON assessment_results USING gin (responses jsonb_path_ops);
+
+-- Reemplaza a ix_assessment_results_template (011): mismo prefijo, y con
+-- patient_id/score incluidos las búsquedas sin filtro por ítem son Index Only Scan
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_assessment_results_template_cover
+    ON assessment_results (template_id, id) INCLUDE (patient_id, score);
+DROP INDEX CONCURRENTLY IF EXISTS ix_assessment_results_template;
+
+-- Index Only Scan depende del visibility map
+VACUUM (ANALYZE) assessment_results;
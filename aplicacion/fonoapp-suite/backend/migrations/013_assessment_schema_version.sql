@@ -0,0 +1,12 @@
+-- 013_assessment_schema_version.sql
+-- Versión de plantilla = último cambio de `schema` (no de cualquier columna):
+-- renombrar una plantilla ya no deja sus resultados como pendientes de re-puntaje.
+-- Idempotente:
+--   docker compose exec -T db psql -U fono -d fonoapp < backend/migrations/013_assessment_schema_version.sql
+
+ALTER TABLE assessment_templates ADD COLUMN IF NOT EXISTS schema_updated_at timestamp;
+-- Igual a updated_at: los resultados con scored_with = updated_at siguen al día
+UPDATE assessment_templates SET schema_updated_at = COALESCE(updated_at, now())
+    WHERE schema_updated_at IS NULL;
+ALTER TABLE assessment_templates ALTER COLUMN schema_updated_at SET DEFAULT now();
+ALTER TABLE assessment_templates ALTER COLUMN schema_updated_at SET NOT NULL;
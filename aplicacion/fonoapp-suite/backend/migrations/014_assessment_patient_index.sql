@@ -0,0 +1,8 @@
+-- 014_assessment_patient_index.sql
+-- GET /assessments/results/patient/{id} y /results/search?patient_id=...: sin este
+-- índice se recorría toda la plantilla (o la tabla) filtrando por paciente.
+-- Idempotente. Ejecutar fuera de una transacción (CREATE INDEX CONCURRENTLY):
+--   docker compose exec -T db psql -U fono -d fonoapp < backend/migrations/014_assessment_patient_index.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_assessment_results_patient_cover
+    ON assessment_results (patient_id, id) INCLUDE (template_id, score);
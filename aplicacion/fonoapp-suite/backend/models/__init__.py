@@ -1,8 +1,10 @@
 # backend/models/__init__.py
 from .user import User
 from .patient import Patient
-from .plan import TreatmentPlan, SessionLog
-from .appointment import Appointment
+from .plan import TreatmentPlan, SessionLog, PlanGoalRollup
+from .appointment import Appointment, AppointmentSeries
 from .assessment import AssessmentTemplate, AssessmentResult
 from .assignment import Assignment
-from .file import MediaFile
+from .file import MediaBlob, MediaDerivative, MediaFile, UploadSession
+from .acoustics import AcousticAnalysis
+from .dashboard import DashboardRefresh
@@ -0,0 +1,28 @@
+# backend/models/acoustics.py
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Index, JSON, func
+from ..core.database import Base
+
+class AcousticAnalysis(Base):
+    """Rasgos acústicos de una grabación (ver core/acoustics.py); uno por MediaFile."""
+    __tablename__ = "acoustic_analyses"
+    id = Column(Integer, primary_key=True, index=True)
+    media_file_id = Column(Integer, ForeignKey("media_files.id", ondelete="CASCADE"), nullable=False, unique=True)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=True)
+    analyzer_version = Column(Integer, nullable=False)
+    # Columnas para consultar/ordenar sin abrir el JSON; el resto va en `features`
+    duration_seconds = Column(Float, nullable=False)
+    voiced_fraction = Column(Float, nullable=True)
+    f0_mean_hz = Column(Float, nullable=True)
+    f0_sd_semitones = Column(Float, nullable=True)
+    intensity_mean_db = Column(Float, nullable=True)
+    jitter_local = Column(Float, nullable=True)
+    shimmer_local = Column(Float, nullable=True)
+    speaking_rate = Column(Float, nullable=True)       # sílabas/s
+    features = Column(JSON, nullable=False)
+    contour = Column(JSON, nullable=True)              # {"hop": s, "f0": [...], "intensity": [...]}
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_acoustic_analyses_patient", "patient_id", "id"),  # historial por paciente (keyset)
+    )
@@ -1,14 +1,110 @@
-from sqlalchemy import Column, Integer, DateTime, String, ForeignKey, Text
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from sqlalchemy import (
+    Column, Integer, DateTime, String, ForeignKey, Text, CheckConstraint, UniqueConstraint,
+    DDL, event, func, literal_column, text,
+)
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 from sqlalchemy.orm import relationship
 from ..core.database import Base
 
+
+def appt_range(starts_at, ends_at):
+    """
+    Rango semiabierto [inicio, fin) de una cita. Debe coincidir con la
+    expresión del constraint de exclusión para que Postgres use su índice GiST.
+    """
+    return func.tsrange(starts_at, ends_at, literal_column("'[)'"))
+
+
+SERIES_FREQ_DAYS = {"daily": 1, "weekly": 7}
+SERIES_MAX_MINUTES = 480  # duración máxima de una ocurrencia
+
+
+class AppointmentSeries(Base):
+    """
+    Serie recurrente (p. ej. terapia semanal). Sus ocurrencias no se guardan:
+    se expanden al consultar una ventana. Solo las excepciones (reprogramada,
+    cancelada, completada...) se materializan como `Appointment` con
+    `series_id` + `original_starts_at`.
+    """
+    __tablename__ = "appointment_series"
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False, index=True)
+    therapist_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    starts_at = Column(DateTime, nullable=False)          # primera ocurrencia
+    duration_minutes = Column(Integer, nullable=False)
+    freq = Column(String(16), nullable=False, default="weekly")  # daily|weekly
+    interval = Column(Integer, nullable=False, default=1)       # cada N días/semanas
+    until = Column(DateTime, nullable=True)               # inicio de la última ocurrencia posible
+    status = Column(String(32), nullable=False, default="active")  # active|ended
+    notes = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+    patient = relationship("Patient")
+
+    @property
+    def period(self) -> timedelta:
+        return timedelta(days=SERIES_FREQ_DAYS[self.freq] * self.interval)
+
+    @property
+    def duration(self) -> timedelta:
+        return timedelta(minutes=self.duration_minutes)
+
+    def is_occurrence(self, start: datetime) -> bool:
+        return (
+            start >= self.starts_at
+            and (self.until is None or start <= self.until)
+            and (start - self.starts_at) % self.period == timedelta(0)
+        )
+
+    def occurrences(self, window_start: datetime, window_end: datetime) -> Iterator[datetime]:
+        """Inicios de las ocurrencias que solapan [window_start, window_end); O(ventana)."""
+        period = self.period
+        k = max(0, (window_start - self.duration - self.starts_at) // period + 1)
+        while True:
+            start = self.starts_at + k * period
+            if start >= window_end or (self.until is not None and start > self.until):
+                return
+            yield start
+            k += 1
+
+
 class Appointment(Base):
     __tablename__ = "appointments"
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
+    therapist_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     starts_at = Column(DateTime, nullable=False)
     ends_at = Column(DateTime, nullable=False)
     status = Column(String(32), default="scheduled")  # scheduled|completed|canceled
     notes = Column(Text, nullable=True)
 
+    # Excepción materializada de una serie (null en citas sueltas)
+    series_id = Column(Integer, ForeignKey("appointment_series.id", ondelete="CASCADE"), nullable=True)
+    original_starts_at = Column(DateTime, nullable=True)
+
     patient = relationship("Patient")
+
+    __table_args__ = (
+        CheckConstraint("ends_at > starts_at", name="ck_appointments_range"),
+        UniqueConstraint("series_id", "original_starts_at", name="uq_appointments_series_occurrence"),
+        # Un terapeuta no puede tener dos citas activas solapadas (índice GiST)
+        ExcludeConstraint(
+            (therapist_id, "="),
+            (appt_range(starts_at, ends_at), "&&"),
+            name="ex_appointments_therapist_overlap",
+            using="gist",
+            where=text("therapist_id IS NOT NULL AND status <> 'canceled'"),
+        ),
+    )
+
+
+# btree_gist permite combinar `=` sobre enteros con `&&` sobre rangos en GiST.
+# En BDs existentes ejecutar backend/migrations/002_appointment_therapist.sql
+event.listen(
+    Appointment.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
@@ -1,5 +1,5 @@
 # backend/models/assessment.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB  # usa JSONB en Postgres
 from ..core.database import Base
@@ -12,6 +12,8 @@ class AssessmentTemplate(Base):
     schema_ = Column("schema", JSONB, nullable=False, default=dict)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # Versión para puntaje y caché: solo cambia con `schema` (un renombre no re-puntúa)
+    schema_updated_at = Column(DateTime, nullable=False, server_default=func.now())
 
     results = relationship(
         "AssessmentResult",
@@ -27,7 +29,22 @@ class AssessmentResult(Base):
     patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
     responses = Column(JSONB, nullable=False, default=dict)
     score = Column(Integer, nullable=True)
+    # Puntaje del servidor (core/assessment_scoring.py): total sin redondear y subescalas
+    subscores = Column(JSONB, nullable=True)
+    scored_with = Column(DateTime, nullable=True)  # schema_updated_at de la plantilla usada al puntuar
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     template = relationship("AssessmentTemplate", back_populates="results")
+
+    __table_args__ = (
+        # Re-puntaje por lotes y búsqueda por plantilla (index-only con patient_id/score)
+        Index("ix_assessment_results_template_cover", "template_id", "id",
+              postgresql_include=["patient_id", "score"]),
+        # Listado por paciente y búsqueda con patient_id (index-only con template_id/score)
+        Index("ix_assessment_results_patient_cover", "patient_id", "id",
+              postgresql_include=["template_id", "score"]),
+        # Filtros por respuesta: responses @> {"q7": 3} (core/assessment_search.py)
+        Index("ix_assessment_results_responses", "responses",
+              postgresql_using="gin", postgresql_ops={"responses": "jsonb_path_ops"}),
+    )
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from ..core.database import Base
+
+
+class DashboardRefresh(Base):
+    """Último refresco de cada vista materializada del tablero (ver core/dashboard.py)."""
+    __tablename__ = "dashboard_refreshes"
+    view_name = Column(String(64), primary_key=True)
+    refreshed_at = Column(DateTime(timezone=True), nullable=False)
+    duration_ms = Column(Integer, nullable=True)
@@ -1,6 +1,16 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DateTime, JSON, func
+from sqlalchemy.orm import relationship
 from ..core.database import Base
 
+class MediaBlob(Base):
+    """Contenido único en disco, compartido por los MediaFile con el mismo sha256."""
+    __tablename__ = "media_blobs"
+    sha256 = Column(String(64), primary_key=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    ext = Column(String(16), nullable=False)        # la del primer archivo con este contenido
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.now())
+
 class MediaFile(Base):
     __tablename__ = "media_files"
     id = Column(Integer, primary_key=True, index=True)
@@ -8,3 +18,43 @@ class MediaFile(Base):
     path = Column(String(512), nullable=False)  # relative to storage
     kind = Column(String(32), default="file")
     created_at = Column(DateTime, server_default=func.now())
+    # null solo en archivos previos al almacenamiento por contenido (ver backend.jobs.backfill_media_blobs)
+    sha256 = Column(String(64), ForeignKey("media_blobs.sha256"), nullable=True, index=True)
+    size_bytes = Column(BigInteger, nullable=True)
+    original_name = Column(String(255), nullable=True)
+
+    # Derivados del contenido (compartidos por todos los MediaFile con el mismo blob)
+    derivatives = relationship(
+        "MediaDerivative",
+        primaryjoin="foreign(MediaDerivative.sha256) == MediaFile.sha256",
+        viewonly=True,
+        lazy="selectin",  # carga anticipada: válida también con AsyncSession
+    )
+
+class MediaDerivative(Base):
+    """Miniatura, picos de forma de onda o versión comprimida de un blob (ver core/derivatives.py)."""
+    __tablename__ = "media_derivatives"
+    sha256 = Column(String(64), ForeignKey("media_blobs.sha256", ondelete="CASCADE"), primary_key=True)
+    kind = Column(String(16), primary_key=True)       # thumbnail|peaks|audio
+    path = Column(String(512), nullable=False)         # /media/blobs/aa/bb/<sha256>.<sufijo>
+    content_type = Column(String(100), nullable=False)
+    size_bytes = Column(BigInteger, nullable=False)
+    meta = Column(JSON, nullable=True)                 # dimensiones, puntos/s, duración, bitrate...
+    created_at = Column(DateTime, server_default=func.now())
+
+class UploadSession(Base):
+    """
+    Subida reanudable en curso. Los trozos se escriben por posición en un
+    archivo preasignado (`STORAGE_DIR/.uploads/<id>.part`); `received` guarda
+    los rangos [inicio, fin) ya persistidos, fusionados y ordenados.
+    """
+    __tablename__ = "upload_sessions"
+    id = Column(String(32), primary_key=True)  # uuid4().hex
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=True)
+    filename = Column(String(255), nullable=False)
+    ext = Column(String(16), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    received = Column(JSON, nullable=False, default=list)  # [[0, 1048576], ...]
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), index=True)
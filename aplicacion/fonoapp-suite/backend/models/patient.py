@@ -1,10 +1,28 @@
+import re
+
 from sqlalchemy import (
-    Column, Integer, String, Date, DateTime, Text, ForeignKey, func, Index, text
+    Column, Integer, String, Date, DateTime, Text, ForeignKey, func, Index, text, DDL, event
 )
 from sqlalchemy.orm import relationship
 from ..core.database import Base
 
 
+def norm_cedula(v: str | None) -> str | None:
+    if not v:
+        return None
+    # Deja solo dígitos y letras (sin tildes, sin guiones/espacios)
+    v = re.sub(r"[^0-9A-Za-z]", "", v).upper()
+    return v or None
+
+
+def search_name_expr(first_name, last_name):
+    """
+    Nombre completo en minúsculas y sin tildes; debe coincidir exactamente con
+    la expresión del índice trigram para que Postgres lo use.
+    """
+    return func.f_unaccent(func.lower(first_name + " " + last_name), type_=String)
+
+
 class Patient(Base):
     __tablename__ = "patients"
 
@@ -38,6 +56,19 @@ class Patient(Base):
             unique=True,
             postgresql_where=text("cedula_norm IS NOT NULL"),
         ),
+        # Búsqueda por nombre (ILIKE '%q%' y similitud) sin seq scan
+        Index(
+            "ix_patients_search_name_trgm",
+            search_name_expr(first_name, last_name).label("search_name"),
+            postgresql_using="gin",
+            postgresql_ops={"search_name": "gin_trgm_ops"},
+        ),
+        # Prefijo de cédula para type-ahead (LIKE 'q%')
+        Index(
+            "ix_patients_cedula_norm_prefix",
+            "cedula_norm",
+            postgresql_ops={"cedula_norm": "text_pattern_ops"},
+        ),
     )
 
     def __repr__(self) -> str:  # útil al depurar
@@ -45,3 +76,19 @@ class Patient(Base):
             f"<Patient id={self.id} name='{self.first_name} {self.last_name}' "
             f"cedula='{self.cedula}' cedula_norm='{self.cedula_norm}'>"
         )
+
+
+# Extensiones y función inmutable requeridas por el índice trigram.
+# Solo aplica en instalaciones nuevas (create_all); en BDs existentes
+# ejecutar backend/migrations/001_patient_search.sql
+event.listen(
+    Patient.__table__,
+    "before_create",
+    DDL(
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm; "
+        "CREATE EXTENSION IF NOT EXISTS unaccent; "
+        "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+        "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+    ).execute_if(dialect="postgresql"),
+)
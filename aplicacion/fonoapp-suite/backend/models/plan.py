@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, JSON, func
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Text, JSON, Index, func
 from sqlalchemy.orm import relationship
 from ..core.database import Base
 
@@ -22,3 +22,24 @@ class SessionLog(Base):
     notes = Column(Text, nullable=True)
 
     plan = relationship("TreatmentPlan")
+
+    __table_args__ = (
+        # logs de un plan y huella (count, max id) de GET /plans/{id}/progress
+        Index("ix_session_logs_plan", "plan_id", "id"),
+    )
+
+
+class PlanGoalRollup(Base):
+    """Agregado incremental por plan y meta (ver core/plan_rollups.py); se mantiene al escribir logs."""
+    __tablename__ = "plan_goal_rollups"
+    plan_id = Column(Integer, ForeignKey("treatment_plans.id", ondelete="CASCADE"), primary_key=True)
+    goal_index = Column(Integer, primary_key=True)     # clave de SessionLog.progress
+    n = Column(Integer, nullable=False)
+    total = Column(Float, nullable=False)              # suma de valores
+    total_sq = Column(Float, nullable=False)           # suma de cuadrados (varianza)
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+    last_value = Column(Float, nullable=False)         # valor del log más reciente
+    first_date = Column(DateTime, nullable=False)
+    last_date = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now())
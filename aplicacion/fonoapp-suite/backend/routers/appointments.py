@@ -1,36 +1,219 @@
 # backend/routers/appointments.py
-from typing import List, Optional
-from datetime import datetime
+from collections import defaultdict
+from heapq import heappop, heappush
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import date, datetime, time, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import DateTime, Integer, and_, column, or_, select, values
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
-from ..core.database import get_db
+from ..core.database import get_db, get_async_db, db_execute, db_get, AnySession
 from ..core.deps import require_roles
-from ..models.appointment import Appointment
-from ..schemas.appointment import AppointmentCreate, AppointmentUpdate, AppointmentOut
+from ..core.replica import get_read_db
+from ..core.pagination import PageParams, apply_keyset, finish_page
+from ..models.appointment import Appointment, AppointmentSeries, SERIES_MAX_MINUTES, appt_range
+from ..schemas.appointment import (
+    AppointmentCreate, AppointmentUpdate, AppointmentOut, AppointmentOccurrenceOut,
+    AppointmentBulkCreate, AppointmentBulkResult, SlotConflict, TherapistAvailability,
+    AppointmentSeriesCreate, AppointmentSeriesOut, SeriesExceptionCreate,
+)
 
 router = APIRouter(prefix="/appointments", tags=["appointments"])
 
 # 🔁 Evita duplicación de literales
 APPT_NOT_FOUND = "Appointment not found"
+APPT_OVERLAP = "Overlapping appointment for therapist"
+SERIES_NOT_FOUND = "Series not found"
+CANCELED = "canceled"
+
+# (therapist_id, starts_at, ends_at, status)
+Slot = Tuple[Optional[int], datetime, datetime, Optional[str]]
+Interval = Tuple[datetime, datetime]
+Occurrence = Tuple[AppointmentSeries, datetime]
+
+SERIES_CHECK_HORIZON = timedelta(days=365)  # ocurrencias validadas al crear una serie abierta
+
+# ----------------- Series: expansión perezosa -----------------
+
+def _series_stmt(
+    window_start: datetime,
+    window_end: datetime,
+    therapist_ids: Optional[List[int]] = None,
+    patient_id: Optional[int] = None,
+):
+    stmt = select(AppointmentSeries).where(
+        AppointmentSeries.status == "active",
+        AppointmentSeries.starts_at < window_end,
+        or_(
+            AppointmentSeries.until.is_(None),
+            AppointmentSeries.until > window_start - timedelta(minutes=SERIES_MAX_MINUTES),
+        ),
+    )
+    if therapist_ids is not None:
+        stmt = stmt.where(AppointmentSeries.therapist_id.in_(therapist_ids))
+    if patient_id is not None:
+        stmt = stmt.where(AppointmentSeries.patient_id == patient_id)
+    return stmt
+
+def _exceptions_stmt(series_ids: List[int], window_start: datetime, window_end: datetime):
+    # Ocurrencias ya materializadas (reprogramadas/canceladas): no se expanden
+    return select(Appointment.series_id, Appointment.original_starts_at).where(
+        Appointment.series_id.in_(series_ids),
+        Appointment.original_starts_at > window_start - timedelta(minutes=SERIES_MAX_MINUTES),
+        Appointment.original_starts_at < window_end,
+    )
+
+def _expand(series: List[AppointmentSeries], exceptions, window_start: datetime, window_end: datetime) -> List[Occurrence]:
+    skip = {(sid, start) for sid, start in exceptions}
+    return [
+        (s, start)
+        for s in series
+        for start in s.occurrences(window_start, window_end)
+        if (s.id, start) not in skip
+    ]
+
+def _virtual_occurrences(db: Session, window_start: datetime, window_end: datetime, **filters) -> List[Occurrence]:
+    series = db.execute(_series_stmt(window_start, window_end, **filters)).scalars().all()
+    if not series:
+        return []
+    exceptions = db.execute(_exceptions_stmt([s.id for s in series], window_start, window_end)).all()
+    return _expand(series, exceptions, window_start, window_end)
+
+async def _avirtual_occurrences(db: AnySession, window_start: datetime, window_end: datetime, **filters) -> List[Occurrence]:
+    series = (await db_execute(db, _series_stmt(window_start, window_end, **filters))).scalars().all()
+    if not series:
+        return []
+    stmt = _exceptions_stmt([s.id for s in series], window_start, window_end)
+    return _expand(series, (await db_execute(db, stmt)).all(), window_start, window_end)
+
+def _occurrence_out(series: AppointmentSeries, start: datetime) -> dict:
+    return {
+        "id": None,
+        "series_id": series.id,
+        "original_starts_at": start,
+        "patient_id": series.patient_id,
+        "therapist_id": series.therapist_id,
+        "starts_at": start,
+        "ends_at": start + series.duration,
+        "status": "scheduled",
+        "notes": series.notes,
+    }
+
+def _starts_at_of(item) -> datetime:
+    return item["starts_at"] if isinstance(item, dict) else item.starts_at
+
+AVAILABILITY_MAX_DAYS = 62
+AVAILABILITY_MAX_THERAPISTS = 50
 
 def _overlaps(
     db: Session,
     starts_at: datetime,
     ends_at: datetime,
-    therapist_id: int,
+    therapist_id: Optional[int],
     exclude_id: Optional[int] = None,
+    exclude_occurrence: Optional[Tuple[int, datetime]] = None,
 ) -> bool:
+    if therapist_id is None:
+        return False
+    # Misma expresión que el constraint de exclusión -> usa su índice GiST
     q = db.query(Appointment).filter(
         Appointment.therapist_id == therapist_id,
-        Appointment.starts_at < ends_at,
-        Appointment.ends_at > starts_at,
+        Appointment.status != CANCELED,
+        appt_range(Appointment.starts_at, Appointment.ends_at).op("&&")(appt_range(starts_at, ends_at)),
     )
     if exclude_id:
         q = q.filter(Appointment.id != exclude_id)
-    return db.query(q.exists()).scalar()
+    if db.query(q.exists()).scalar():
+        return True
+    # Ocurrencias virtuales de series del mismo terapeuta
+    return any(
+        (series.id, start) != exclude_occurrence
+        for series, start in _virtual_occurrences(db, starts_at, ends_at, therapist_ids=[therapist_id])
+    )
+
+def _find_conflicts(db: Session, slots: List[Slot]) -> Dict[int, SlotConflict]:
+    """
+    Conflictos de un lote de franjas propuestas, por índice:
+    - contra citas existentes: una sola consulta (VALUES + índice GiST),
+    - dentro del propio lote y contra ocurrencias virtuales de series:
+      barrido por terapeuta ordenado por inicio.
+    """
+    conflicts: Dict[int, SlotConflict] = {}
+
+    def entry(i: int) -> SlotConflict:
+        return conflicts.setdefault(i, SlotConflict(index=i))
+
+    rows = [
+        (i, t, s, e) for i, (t, s, e, st) in enumerate(slots)
+        if t is not None and st != CANCELED
+    ]
+    if not rows:
+        return conflicts
+
+    proposed = values(
+        column("idx", Integer),
+        column("therapist_id", Integer),
+        column("starts_at", DateTime),
+        column("ends_at", DateTime),
+        name="proposed",
+    ).data(rows)
+    stmt = (
+        select(proposed.c.idx, Appointment.id)
+        .select_from(proposed)
+        .join(
+            Appointment,
+            and_(
+                Appointment.therapist_id == proposed.c.therapist_id,
+                Appointment.status != CANCELED,
+                appt_range(Appointment.starts_at, Appointment.ends_at)
+                .op("&&")(appt_range(proposed.c.starts_at, proposed.c.ends_at)),
+            ),
+        )
+        .order_by(proposed.c.idx, Appointment.id)
+    )
+    for idx, appt_id in db.execute(stmt):
+        entry(idx).conflicts_with.append(appt_id)
+
+    # Ocurrencias virtuales de series en la ventana del lote (una expansión por lote)
+    window_start = min(r[2] for r in rows)
+    window_end = max(r[3] for r in rows)
+    virtual = _virtual_occurrences(
+        db, window_start, window_end, therapist_ids=sorted({r[1] for r in rows})
+    )
+
+    by_therapist = defaultdict(list)
+    for i, t, s, e in rows:
+        by_therapist[t].append((s, e, "slot", i))
+    for series, start in virtual:
+        by_therapist[series.therapist_id].append((start, start + series.duration, "series", series.id))
+    for items in by_therapist.values():
+        items.sort(key=lambda it: it[0])
+        # heap (fin, orden, tipo, ref) de intervalos abiertos
+        open_items: List[Tuple[datetime, int, str, int]] = []
+        for seq, (s, e, kind, ref) in enumerate(items):
+            while open_items and open_items[0][0] <= s:
+                heappop(open_items)
+            for _, _, o_kind, o_ref in open_items:
+                if kind == "slot" and o_kind == "slot":
+                    entry(ref).overlaps_batch.append(o_ref)
+                    entry(o_ref).overlaps_batch.append(ref)
+                elif kind == "slot":
+                    entry(ref).conflicts_with_series.append(o_ref)
+                elif o_kind == "slot":
+                    entry(o_ref).conflicts_with_series.append(ref)
+            heappush(open_items, (e, seq, kind, ref))
+    for c in conflicts.values():
+        c.overlaps_batch.sort()
+        c.conflicts_with_series = sorted(set(c.conflicts_with_series))
+    return conflicts
+
+def _with_default_therapist(data: dict, user) -> dict:
+    # Si agenda un terapeuta y no indica otro, la cita es suya
+    if data.get("therapist_id") is None and getattr(user, "role", None) == "therapist":
+        data["therapist_id"] = user.id
+    return data
 
 def _get_appt_or_404(db: Session, appt_id: int) -> Appointment:
     appt = db.get(Appointment, appt_id)
@@ -44,19 +227,23 @@ def create_appointment(
     db: Session = Depends(get_db),
     user=Depends(require_roles("admin", "therapist", "assistant")),
 ):
+    payload = _with_default_therapist(data.dict(), user)
     try:
         # Validación de solapamiento
-        if _overlaps(db, data.starts_at, data.ends_at, data.therapist_id):
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Overlapping appointment for therapist",
-            )
+        if payload["status"] != CANCELED and _overlaps(
+            db, payload["starts_at"], payload["ends_at"], payload["therapist_id"]
+        ):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=APPT_OVERLAP)
 
-        appt = Appointment(**data.dict())
+        appt = Appointment(**payload)
         db.add(appt)
         db.commit()
         db.refresh(appt)
         return appt
+    except IntegrityError:
+        # Carrera con otra petición: lo detecta el constraint de exclusión
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=APPT_OVERLAP)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(
@@ -64,18 +251,209 @@ def create_appointment(
             detail="Database error creating appointment",
         )
 
-@router.get("/", response_model=List[AppointmentOut])
-def list_appointments(
-    limit: int = Query(100, ge=1, le=500),
-    offset: int = Query(0, ge=0),
+@router.post("/bulk/check", response_model=List[SlotConflict])
+def check_appointments_bulk(
+    data: AppointmentBulkCreate,
+    db: Session = Depends(get_db),
+    user=Depends(require_roles("admin", "therapist", "assistant")),
+):
+    """Valida un lote de franjas sin crearlas; devuelve solo las que tienen conflicto."""
+    items = [_with_default_therapist(it.dict(), user) for it in data.items]
+    conflicts = _find_conflicts(
+        db, [(it["therapist_id"], it["starts_at"], it["ends_at"], it["status"]) for it in items]
+    )
+    return [conflicts[i] for i in sorted(conflicts)]
+
+@router.post("/bulk", response_model=AppointmentBulkResult, status_code=status.HTTP_201_CREATED)
+def create_appointments_bulk(
+    data: AppointmentBulkCreate,
+    atomic: bool = Query(True, description="Si alguna franja tiene conflicto no se crea ninguna"),
+    db: Session = Depends(get_db),
+    user=Depends(require_roles("admin", "therapist", "assistant")),
+):
+    """
+    Crea un lote de citas (p. ej. una serie semanal) en una transacción.
+    Con atomic=false crea las franjas libres y reporta las demás.
+    """
+    items = [_with_default_therapist(it.dict(), user) for it in data.items]
+    conflicts = _find_conflicts(
+        db, [(it["therapist_id"], it["starts_at"], it["ends_at"], it["status"]) for it in items]
+    )
+    report = [conflicts[i] for i in sorted(conflicts)]
+    if report and atomic:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": APPT_OVERLAP, "conflicts": [c.dict() for c in report]},
+        )
+
+    created = [Appointment(**it) for i, it in enumerate(items) if i not in conflicts]
+    try:
+        db.add_all(created)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=APPT_OVERLAP)
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Database error creating appointments",
+        )
+    return AppointmentBulkResult(created=created, conflicts=report)
+
+# ----------------- Series recurrentes -----------------
+
+def _get_series_or_404(db: Session, series_id: int) -> AppointmentSeries:
+    series = db.get(AppointmentSeries, series_id)
+    if not series:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=SERIES_NOT_FOUND)
+    return series
+
+@router.post("/series", response_model=AppointmentSeriesOut, status_code=status.HTTP_201_CREATED)
+def create_series(
+    data: AppointmentSeriesCreate,
+    db: Session = Depends(get_db),
+    user=Depends(require_roles("admin", "therapist", "assistant")),
+):
+    """
+    Crea una serie recurrente: una fila, sin importar cuántas ocurrencias tenga.
+    Las ocurrencias (hasta `until`/`count`, o un año si es abierta) se validan
+    contra la agenda en un solo lote.
+    """
+    series = AppointmentSeries(**_with_default_therapist(data.dict(exclude={"count"}), user))
+    if data.count:
+        series.until = series.starts_at + (data.count - 1) * series.period
+
+    check_end = series.starts_at + SERIES_CHECK_HORIZON
+    if series.until is not None:
+        check_end = min(check_end, series.until + series.duration)
+    starts = list(series.occurrences(series.starts_at, check_end))
+    conflicts = _find_conflicts(
+        db, [(series.therapist_id, st, st + series.duration, "scheduled") for st in starts]
+    )
+    if conflicts:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": APPT_OVERLAP,
+                "conflicts": [
+                    {**conflicts[i].dict(), "starts_at": starts[i].isoformat()} for i in sorted(conflicts)
+                ],
+            },
+        )
+    try:
+        db.add(series)
+        db.commit()
+        db.refresh(series)
+        return series
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Database error creating series",
+        )
+
+@router.get("/series/{series_id}", response_model=AppointmentSeriesOut)
+def get_series(
+    series_id: int,
+    db: Session = Depends(get_db),
+    user=Depends(require_roles("admin", "therapist", "assistant")),
+):
+    return _get_series_or_404(db, series_id)
+
+@router.delete("/series/{series_id}", status_code=status.HTTP_204_NO_CONTENT)
+def end_series(
+    series_id: int,
+    from_date: Optional[datetime] = Query(None, description="Sin ocurrencias desde esta fecha (por defecto: ahora)"),
+    db: Session = Depends(get_db),
+    user=Depends(require_roles("admin", "therapist")),
+):
+    """Termina la serie; las excepciones ya materializadas se conservan como citas."""
+    series = _get_series_or_404(db, series_id)
+    cutoff = from_date or datetime.now()
+    try:
+        if cutoff <= series.starts_at:
+            series.status = "ended"
+        else:
+            last = cutoff - timedelta(microseconds=1)
+            series.until = last if series.until is None else min(series.until, last)
+        db.commit()
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Database error ending series",
+        )
+
+@router.post("/series/{series_id}/exceptions", response_model=AppointmentOut, status_code=status.HTTP_201_CREATED)
+def create_series_exception(
+    series_id: int,
+    data: SeriesExceptionCreate,
+    db: Session = Depends(get_db),
+    user=Depends(require_roles("admin", "therapist", "assistant")),
+):
+    """
+    Materializa una ocurrencia para reprogramarla o cancelarla. Después se
+    edita como cualquier cita (PUT /appointments/{id}).
+    """
+    series = _get_series_or_404(db, series_id)
+    original = data.original_starts_at
+    if series.status != "active" or not series.is_occurrence(original):
+        raise HTTPException(status_code=422, detail="original_starts_at is not an occurrence of this series")
+
+    starts = data.starts_at or original
+    ends = data.ends_at or (starts + series.duration)
+    if ends <= starts:
+        raise HTTPException(status_code=422, detail="ends_at must be after starts_at")
+    new_status = data.status or "scheduled"
+
+    try:
+        if new_status != CANCELED and _overlaps(
+            db, starts, ends, series.therapist_id, exclude_occurrence=(series.id, original)
+        ):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=APPT_OVERLAP)
+        appt = Appointment(
+            patient_id=series.patient_id,
+            therapist_id=series.therapist_id,
+            series_id=series.id,
+            original_starts_at=original,
+            starts_at=starts,
+            ends_at=ends,
+            status=new_status,
+            notes=data.notes if data.notes is not None else series.notes,
+        )
+        db.add(appt)
+        db.commit()
+        db.refresh(appt)
+        return appt
+    except IntegrityError:
+        # Ocurrencia ya materializada o carrera con otra cita
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Occurrence already materialized or overlapping")
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Database error creating series exception",
+        )
+
+# ----------------- Consultas -----------------
+
+@router.get("/", response_model=List[AppointmentOccurrenceOut])
+async def list_appointments(
+    response: Response,
+    page: PageParams = Depends(),
+    offset: int = Query(0, ge=0, deprecated=True),
     patient_id: Optional[int] = None,
     therapist_id: Optional[int] = None,
     starts_from: Optional[datetime] = None,
     ends_before: Optional[datetime] = None,
-    db: Session = Depends(get_db),
+    expand_series: bool = Query(True, description="Con starts_from y ends_before incluye ocurrencias de series"),
+    db: AnySession = Depends(get_read_db),
     user=Depends(require_roles("admin", "therapist", "assistant")),
 ):
-    q = db.query(Appointment)
+    q = select(Appointment)
     if patient_id is not None:
         q = q.filter(Appointment.patient_id == patient_id)
     if therapist_id is not None:
@@ -85,15 +463,143 @@ def list_appointments(
     if ends_before is not None:
         q = q.filter(Appointment.ends_at <= ends_before)
 
-    return q.order_by(Appointment.starts_at.asc()).offset(offset).limit(limit).all()
+    if expand_series and starts_from is not None and ends_before is not None:
+        # Vista de calendario: citas reales + ocurrencias virtuales de la ventana,
+        # hasta `limit` elementos (se pagina moviendo la ventana, sin cursor)
+        q = q.order_by(Appointment.starts_at, Appointment.id).limit(page.limit)
+        rows = (await db_execute(db, q)).scalars().all()
+        virtual = await _avirtual_occurrences(
+            db, starts_from, ends_before,
+            therapist_ids=[therapist_id] if therapist_id is not None else None,
+            patient_id=patient_id,
+        )
+        merged = list(rows) + [
+            _occurrence_out(series, start)
+            for series, start in virtual
+            if start >= starts_from and start + series.duration <= ends_before
+        ]
+        merged.sort(key=_starts_at_of)
+        return merged[: page.limit]
+
+    # Keyset sobre (starts_at, id); `offset` se mantiene solo por compatibilidad
+    keys = (Appointment.starts_at, Appointment.id)
+    q = apply_keyset(q, keys, page)
+    if offset and not page.cursor:
+        q = q.offset(offset)
+    rows = (await db_execute(db, q)).scalars().all()
+    return finish_page(rows, keys, page, response)
+
+def _chop(gap_start: datetime, gap_end: datetime, origin: datetime, slot: timedelta, step: timedelta) -> Iterator[Interval]:
+    """Parte un hueco libre en franjas de `slot`, alineadas a `step` desde `origin`."""
+    offset = gap_start - origin
+    t = origin + -(-offset // step) * step  # redondeo hacia arriba a la grilla
+    while t + slot <= gap_end:
+        yield t, t + slot
+        t += step
+
+def _free_slots(
+    busy: List[Interval],
+    days: List[date],
+    work_start: time,
+    work_end: time,
+    slot: timedelta,
+    step: timedelta,
+) -> List[Interval]:
+    """
+    Franjas libres dentro del horario laboral de cada día.
+    `busy` debe venir ordenado por inicio; se recorre una sola vez (los
+    intervalos solapados o contiguos se fusionan al avanzar `cursor`).
+    """
+    free: List[Interval] = []
+    k = 0
+    for day in days:
+        ws, we = datetime.combine(day, work_start), datetime.combine(day, work_end)
+        while k < len(busy) and busy[k][1] <= ws:
+            k += 1
+        cursor, j = ws, k
+        while j < len(busy) and busy[j][0] < we:
+            b_start, b_end = busy[j]
+            if b_start > cursor:
+                free.extend(_chop(cursor, b_start, ws, slot, step))
+            cursor = max(cursor, b_end)
+            j += 1
+        if cursor < we:
+            free.extend(_chop(cursor, we, ws, slot, step))
+    return free
+
+@router.get("/availability", response_model=List[TherapistAvailability])
+async def availability(
+    therapist_id: List[int] = Query(..., description="Uno o más terapeutas (repetir el parámetro)"),
+    date_from: date = Query(...),
+    date_to: date = Query(..., description="Inclusive"),
+    slot_minutes: int = Query(30, ge=5, le=480),
+    step_minutes: Optional[int] = Query(None, ge=5, le=480, description="Por defecto = slot_minutes"),
+    work_start: time = Query(time(8, 0)),
+    work_end: time = Query(time(18, 0)),
+    weekdays: List[int] = Query([0, 1, 2, 3, 4], description="0=lunes ... 6=domingo"),
+    db: AnySession = Depends(get_read_db),
+    user=Depends(require_roles("admin", "therapist", "assistant")),
+):
+    """Huecos libres por terapeuta: una consulta de ocupación + un barrido lineal."""
+    if date_to < date_from or (date_to - date_from).days >= AVAILABILITY_MAX_DAYS:
+        raise HTTPException(status_code=422, detail=f"Date range must be 1..{AVAILABILITY_MAX_DAYS} days")
+    if work_end <= work_start:
+        raise HTTPException(status_code=422, detail="work_end must be after work_start")
+    therapists = sorted(set(therapist_id))
+    if len(therapists) > AVAILABILITY_MAX_THERAPISTS:
+        raise HTTPException(status_code=422, detail=f"At most {AVAILABILITY_MAX_THERAPISTS} therapists")
+
+    allowed_days = set(weekdays)
+    days = [
+        d for d in (date_from + timedelta(n) for n in range((date_to - date_from).days + 1))
+        if d.weekday() in allowed_days
+    ]
+    window_start = datetime.combine(date_from, time.min)
+    window_end = datetime.combine(date_to + timedelta(days=1), time.min)
+
+    stmt = (
+        select(Appointment.therapist_id, Appointment.starts_at, Appointment.ends_at)
+        .where(
+            Appointment.therapist_id.in_(therapists),
+            Appointment.status != CANCELED,
+            appt_range(Appointment.starts_at, Appointment.ends_at)
+            .op("&&")(appt_range(window_start, window_end)),
+        )
+        .order_by(Appointment.therapist_id, Appointment.starts_at)
+    )
+    busy: Dict[int, List[Interval]] = defaultdict(list)
+    for t_id, s_at, e_at in (await db_execute(db, stmt)).all():
+        busy[t_id].append((s_at, e_at))
+    virtual = await _avirtual_occurrences(db, window_start, window_end, therapist_ids=therapists)
+    for series, start in virtual:
+        busy[series.therapist_id].append((start, start + series.duration))
+    if virtual:
+        for intervals in busy.values():
+            intervals.sort()
+
+    slot = timedelta(minutes=slot_minutes)
+    step = timedelta(minutes=step_minutes or slot_minutes)
+    return [
+        TherapistAvailability(
+            therapist_id=t_id,
+            slots=[
+                {"starts_at": s_at, "ends_at": e_at}
+                for s_at, e_at in _free_slots(busy[t_id], days, work_start, work_end, slot, step)
+            ],
+        )
+        for t_id in therapists
+    ]
 
 @router.get("/{id}", response_model=AppointmentOut)
-def get_appointment(
+async def get_appointment(
     id: int,
-    db: Session = Depends(get_db),
+    db: AnySession = Depends(get_async_db),
     user=Depends(require_roles("admin", "therapist", "assistant")),
 ):
-    return _get_appt_or_404(db, id)
+    appt = await db_get(db, Appointment, id)
+    if not appt:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=APPT_NOT_FOUND)
+    return appt
 
 @router.put("/{id}", response_model=AppointmentOut)
 def update_appointment(
@@ -107,16 +613,14 @@ def update_appointment(
     try:
         incoming = data.dict(exclude_unset=True)
 
-        # Revalida solapamiento si cambian fechas/terapeuta
-        if {"starts_at", "ends_at", "therapist_id"} & set(incoming):
+        # Revalida solapamiento si cambian fechas/terapeuta/estado
+        if {"starts_at", "ends_at", "therapist_id", "status"} & set(incoming):
             starts = incoming.get("starts_at", appt.starts_at)
             ends = incoming.get("ends_at", appt.ends_at)
             therapist = incoming.get("therapist_id", appt.therapist_id)
-            if _overlaps(db, starts, ends, therapist, exclude_id=appt.id):
-                raise HTTPException(
-                    status_code=status.HTTP_409_CONFLICT,
-                    detail="Overlapping appointment for therapist",
-                )
+            new_status = incoming.get("status", appt.status)
+            if new_status != CANCELED and _overlaps(db, starts, ends, therapist, exclude_id=appt.id):
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=APPT_OVERLAP)
 
         for k, v in incoming.items():
             setattr(appt, k, v)
@@ -124,6 +628,9 @@ def update_appointment(
         db.commit()
         db.refresh(appt)
         return appt
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=APPT_OVERLAP)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(
@@ -1,20 +1,49 @@
 # backend/routers/assessments.py
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import func, select
 
-from ..core.database import get_db
+from ..core.assessment_scoring import ResponseError, TemplateError, compile_schema, rescore_template, template_cache
+from ..core.assessment_search import Explain, ResultSearchParams, search_statement, summarize_plan
+from ..core.database import SessionLocal, get_db, db_execute, db_get, AnySession
 from ..core.deps import require_roles
+from ..core.replica import get_read_db
+from ..core.pagination import PageParams, apply_keyset, finish_page
 from ..models.assessment import AssessmentTemplate, AssessmentResult
 from ..schemas.assessment import (
     AssessmentTemplateCreate, AssessmentTemplateUpdate, AssessmentTemplateOut,
     AssessmentResultCreate,  AssessmentResultUpdate,  AssessmentResultOut,
+    AssessmentResultMatchOut, SearchPlanOut,
 )
 
 # 👇 ESTO es lo que falta si te da el AttributeError
 router = APIRouter(prefix="/assessments", tags=["assessments"])
 
+ERR_TEMPLATE_NOT_FOUND = "Template not found"
+ERR_EXPLAIN_UNSUPPORTED = "EXPLAIN is only available on PostgreSQL"
+
+# Columnas del índice (template_id, id) INCLUDE (patient_id, score): sin
+# include_responses la búsqueda puede resolverse con Index Only Scan
+SEARCH_SUMMARY_COLUMNS = (
+    AssessmentResult.id, AssessmentResult.template_id, AssessmentResult.patient_id, AssessmentResult.score,
+)
+SEARCH_FULL_COLUMNS = SEARCH_SUMMARY_COLUMNS + (
+    AssessmentResult.responses, AssessmentResult.subscores, AssessmentResult.created_at,
+)
+
+
+def _check_schema(schema) -> None:
+    try:
+        compile_schema(schema)
+    except TemplateError as exc:
+        raise HTTPException(status_code=422, detail=f"Invalid template schema: {exc}")
+
+
+def _rescore_in_background(template_id: int) -> None:
+    with SessionLocal() as db:
+        rescore_template(db, template_id)
+
 # ---------------- Templates ----------------
 
 @router.post("/templates", response_model=AssessmentTemplateOut, status_code=status.HTTP_201_CREATED)
@@ -23,6 +52,7 @@ def create_template(
     db: Session = Depends(get_db),
     user=Depends(require_roles("admin", "therapist")),
 ):
+    _check_schema(data.schema_)
     # Usa el atributo Python schema_, no "schema"
     t = AssessmentTemplate(name=data.name, schema_=data.schema_)
     db.add(t); db.commit(); db.refresh(t)
@@ -41,19 +71,26 @@ def list_templates(
 def update_template(
     template_id: int,
     data: AssessmentTemplateUpdate,
+    background: BackgroundTasks,
     db: Session = Depends(get_db),
     user=Depends(require_roles("admin", "therapist")),
 ):
     t = db.get(AssessmentTemplate, template_id)
     if not t:
-        raise HTTPException(status_code=404, detail="Template not found")
+        raise HTTPException(status_code=404, detail=ERR_TEMPLATE_NOT_FOUND)
 
     if data.name is not None:
         t.name = data.name
-    if data.schema_ is not None:
+    rescore = data.schema_ is not None and data.schema_ != t.schema_
+    if rescore:
+        _check_schema(data.schema_)
         t.schema_ = data.schema_
+        t.schema_updated_at = func.now()  # nueva versión: caché y scored_with
 
     db.commit(); db.refresh(t)
+    if rescore:
+        # Los resultados puntuados con la versión anterior se recalculan por lotes tras responder
+        background.add_task(_rescore_in_background, t.id)
     return t
 
 # ---------------- Results ----------------
@@ -64,18 +101,75 @@ def create_result(
     db: Session = Depends(get_db),
     user=Depends(require_roles("admin", "therapist", "assistant")),
 ):
+    template = db.get(AssessmentTemplate, data.template_id)
+    if not template:
+        raise HTTPException(status_code=404, detail=ERR_TEMPLATE_NOT_FOUND)
     r = AssessmentResult(**data.dict())
+    compiled = template_cache.get(template)
+    if compiled.scorable:
+        # El puntaje lo calcula el servidor; el `score` enviado se ignora
+        try:
+            r.score, r.subscores = compiled.score(data.responses)
+        except ResponseError as exc:
+            raise HTTPException(status_code=422, detail={"message": "Invalid responses", "errors": exc.errors})
+        r.scored_with = template.schema_updated_at
     db.add(r); db.commit(); db.refresh(r)
     return r
 
 @router.get("/results/patient/{patient_id}", response_model=List[AssessmentResultOut])
-def list_results_by_patient(
+async def list_results_by_patient(
     patient_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AnySession = Depends(get_read_db),
+    page: PageParams = Depends(),
     user=Depends(require_roles("admin", "therapist", "assistant")),
 ):
-    return db.execute(
-        select(AssessmentResult)
-        .where(AssessmentResult.patient_id == patient_id)
-        .order_by(AssessmentResult.id.desc())
-    ).scalars().all()
+    keys = (AssessmentResult.id,)
+    stmt = apply_keyset(
+        select(AssessmentResult).where(AssessmentResult.patient_id == patient_id),
+        keys, page, descending=True,
+    )
+    rows = (await db_execute(db, stmt)).scalars().all()
+    return finish_page(rows, keys, page, response)
+
+
+async def _search_statement(db: AnySession, params: ResultSearchParams, page: PageParams, include_responses: bool):
+    compiled = None
+    if params.template_id is not None:
+        template = await db_get(db, AssessmentTemplate, params.template_id)
+        if not template:
+            raise HTTPException(status_code=404, detail=ERR_TEMPLATE_NOT_FOUND)
+        compiled = template_cache.get(template)
+    columns = SEARCH_FULL_COLUMNS if include_responses else SEARCH_SUMMARY_COLUMNS
+    stmt = search_statement(params, compiled, list(columns))
+    return apply_keyset(stmt, (AssessmentResult.id,), page, descending=True)
+
+@router.get("/results/search", response_model=List[AssessmentResultMatchOut])
+async def search_results(
+    response: Response,
+    params: ResultSearchParams = Depends(),
+    include_responses: bool = False,
+    db: AnySession = Depends(get_read_db),
+    page: PageParams = Depends(),
+    user=Depends(require_roles("admin", "therapist")),
+):
+    """Resultados que cumplen todos los filtros, del más nuevo al más viejo (cursor en X-Next-Cursor)."""
+    stmt = await _search_statement(db, params, page, include_responses)
+    rows = (await db_execute(db, stmt)).all()
+    return finish_page(rows, (AssessmentResult.id,), page, response)
+
+@router.get("/results/search/explain", response_model=SearchPlanOut)
+async def explain_search(
+    params: ResultSearchParams = Depends(),
+    include_responses: bool = False,
+    analyze: bool = False,
+    db: AnySession = Depends(get_read_db),
+    page: PageParams = Depends(),
+    user=Depends(require_roles("admin")),
+):
+    """Plan de la misma consulta que /results/search (con analyze=true, también tiempos y buffers)."""
+    if db.bind.dialect.name != "postgresql":
+        raise HTTPException(status_code=501, detail=ERR_EXPLAIN_UNSUPPORTED)
+    stmt = await _search_statement(db, params, page, include_responses)
+    raw = (await db_execute(db, Explain(stmt, analyze))).scalar_one()
+    return summarize_plan(raw)
@@ -1,12 +1,14 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
-from ..core.database import get_db
+from ..core.database import get_db, get_async_db, db_execute, AnySession
 from ..models.assignment import Assignment
 from ..schemas.assignment import AssignmentCreate, AssignmentUpdate, AssignmentOut
 from ..core.deps import require_roles, get_current_user
+from ..core.pagination import PageParams, apply_keyset, finish_page
 
 router = APIRouter(prefix="/assignments", tags=["assignments"])
 
@@ -25,16 +27,20 @@ def create(
         raise HTTPException(500, "Database error creating assignment")
 
 @router.get("/patient/{patient_id}", response_model=List[AssignmentOut])
-def list_for_patient(
+async def list_for_patient(
     patient_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AnySession = Depends(get_async_db),
     user=Depends(get_current_user),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=500),
+    page: PageParams = Depends(),
+    skip: int = Query(0, ge=0, deprecated=True),
 ):
-    return (
-        db.query(Assignment)
-        .filter(Assignment.patient_id==patient_id)
-        .order_by(Assignment.id.desc())
-        .offset(skip).limit(limit).all()
+    keys = (Assignment.id,)
+    q = apply_keyset(
+        select(Assignment).where(Assignment.patient_id==patient_id),
+        keys, page, descending=True,
     )
+    if skip and not page.cursor:
+        q = q.offset(skip)
+    rows = (await db_execute(db, q)).scalars().all()
+    return finish_page(rows, keys, page, response)
@@ -1,39 +1,46 @@
 # backend/routers/auth.py
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
-from ..core.database import get_db
-from ..core.security import verify_password, create_access_token, hash_password
+from ..core.database import get_db, get_async_db, db_execute, db_commit, db_rollback, db_refresh, AnySession
+from ..core.security import verify_password_async, create_access_token, hash_password_async
 from ..core.deps import get_current_user, require_roles
 from ..schemas.auth import UserCreate, UserOut
 from ..models import User  # asegúrate de exportar User en backend/models/__init__.py
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+ERR_EMAIL_TAKEN = "Email already registered"
+
+# Acceso a BD vía helpers async: AsyncSession o threadpool, nunca bloquea el loop
+async def _get_user_by_email(db: AnySession, email: str) -> User | None:
+    return (await db_execute(db, select(User).where(User.email == email))).scalars().first()
+
 @router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-async def register(user_in: UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == user_in.email).first()
+async def register(user_in: UserCreate, db: AnySession = Depends(get_async_db)):
+    existing = await _get_user_by_email(db, user_in.email)
     if existing:
-        raise HTTPException(status_code=409, detail="Email already registered")
+        raise HTTPException(status_code=409, detail=ERR_EMAIL_TAKEN)
     user = User(
         full_name=user_in.full_name,
         email=user_in.email,
         role=user_in.role,
-        hashed_password=hash_password(user_in.password),
+        hashed_password=await hash_password_async(user_in.password),
     )
     db.add(user)
     try:
-        db.commit()
+        await db_commit(db)
     except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Email already registered")
-    db.refresh(user)
+        await db_rollback(db)
+        raise HTTPException(status_code=409, detail=ERR_EMAIL_TAKEN)
+    await db_refresh(db, user)
     return user
 
 @router.post("/login")
-async def login(request: Request, db: Session = Depends(get_db)):
+async def login(request: Request, db: AnySession = Depends(get_async_db)):
     """
     Acepta:
       - x-www-form-urlencoded: username, password
@@ -57,8 +64,8 @@ async def login(request: Request, db: Session = Depends(get_db)):
     if not username or not password:
         raise HTTPException(status_code=422, detail="username/email and password are required")
 
-    user = db.query(User).filter(User.email == username).first()
-    if not user or not verify_password(password, user.hashed_password):
+    user = await _get_user_by_email(db, username)
+    if not user or not await verify_password_async(password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
     token = create_access_token(subject=user.email, role=user.role)
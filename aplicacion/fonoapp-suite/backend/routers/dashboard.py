@@ -0,0 +1,89 @@
+# backend/routers/dashboard.py
+import asyncio
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+
+from ..core.config import settings
+from ..core.dashboard import (
+    DASHBOARD_WINDOW_DAYS, VIEWS, appointment_rates, rate, refresh_views, score_edges, staleness,
+    scores_view, therapists_view, totals_view, weekly_view,
+)
+from ..core.database import AnySession, SessionLocal, db_execute
+from ..core.deps import require_roles
+from ..core.replica import get_read_db
+from ..models.dashboard import DashboardRefresh
+from ..schemas.dashboard import DashboardOut
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+logger = logging.getLogger(__name__)
+
+
+@router.get("/", response_model=DashboardOut)
+async def get_dashboard(
+    db: AnySession = Depends(get_read_db),
+    user=Depends(require_roles("admin")),
+):
+    """Métricas de la clínica desde las vistas materializadas (ver core/dashboard.py)."""
+    refreshed_at, now = (await db_execute(
+        db,
+        select(func.min(DashboardRefresh.refreshed_at), func.now())
+        .where(DashboardRefresh.view_name.in_(list(VIEWS))),
+    )).one()
+    totals = (await db_execute(db, select(totals_view))).first()
+    therapists = (await db_execute(
+        db, select(therapists_view).order_by(therapists_view.c.caseload.desc(), therapists_view.c.therapist_id)
+    )).all()
+    weeks = (await db_execute(db, select(weekly_view).order_by(weekly_view.c.week))).all()
+    scores = (await db_execute(db, select(scores_view).order_by(scores_view.c.name, scores_view.c.template_id))).all()
+
+    return {
+        "refreshed_at": refreshed_at,
+        "stale_seconds": staleness(refreshed_at, now),
+        "window_days": DASHBOARD_WINDOW_DAYS,
+        "totals": totals and {
+            **totals._mapping, **appointment_rates(totals),
+            "assignment_completion_rate": rate(totals.assignments_done, totals.assignments_due),
+        },
+        "therapists": [{**r._mapping, **appointment_rates(r)} for r in therapists],
+        "weeks": [r._mapping for r in weeks],
+        "scores": [
+            {**r._mapping, "min": r.min_score, "max": r.max_score,
+             "bucket_edges": score_edges(r.min_score, r.max_score)}
+            for r in scores
+        ],
+    }
+
+
+# ---------- Refresco periódico ----------
+def refresh_dashboard() -> bool:
+    with SessionLocal() as db:
+        # Margen de medio intervalo: el worker que llega tarde no vuelve a refrescar
+        return refresh_views(db, max_age_seconds=settings.DASHBOARD_REFRESH_SECONDS / 2)
+
+
+async def _dashboard_refresh_loop() -> None:
+    while True:
+        try:
+            if await run_in_threadpool(refresh_dashboard):
+                logger.info("Dashboard views refreshed")
+        except Exception:  # BD caída, migración pendiente...: se reintenta en la próxima vuelta
+            logger.exception("Dashboard refresh failed")
+        await asyncio.sleep(settings.DASHBOARD_REFRESH_SECONDS)
+
+
+_refresh_task: Optional[asyncio.Task] = None
+
+
+def start_dashboard_refresh() -> None:
+    global _refresh_task
+    if _refresh_task is None and settings.DASHBOARD_REFRESH_SECONDS > 0:
+        _refresh_task = asyncio.create_task(_dashboard_refresh_loop())
+
+
+def stop_dashboard_refresh() -> None:
+    if _refresh_task is not None:
+        _refresh_task.cancel()
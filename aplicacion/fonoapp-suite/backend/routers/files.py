@@ -1,30 +1,75 @@
 # backend/routers/files.py
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+import mimetypes
+from datetime import datetime, timedelta, timezone
 from typing import Optional, List
 from uuid import uuid4
 from pathlib import Path
 
 import aiofiles
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Header, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select, delete, func
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import defer
 
-from ..core.database import get_db
-from ..core.deps import require_roles
-from ..models.file import MediaFile
-from ..schemas.file import MediaFileOut
+from ..core.acoustics import ANALYZABLE_EXTS
+from ..core.config import settings
+from ..core.database import (
+    SessionLocal, get_async_db, db_get, db_commit, db_rollback, db_refresh, db_delete, db_execute, AnySession,
+)
+from ..core.deps import authenticate, require_roles
+from ..core.media import MediaInfo, make_etag, media_response
+from ..core.media_pipeline import pipeline as media_pipeline
+from ..core.pagination import PageParams, apply_keyset, finish_page
+from ..core.replica import get_read_db
+from ..core.security import sign_media_url, verify_media_signature
+from ..core.storage import (
+    MEDIA_PREFIX, STORAGE_DIR, acquire_blob, blob_path, hash_file, media_url, place_blob,
+    purge_blob_files, release_blob, resolve_media_path,
+)
+from ..models.acoustics import AcousticAnalysis
+from ..models.file import MediaFile, UploadSession
+from ..schemas.file import (
+    AcousticAnalysisOut, AcousticAnalysisSummaryOut, MediaFileOut, MediaUrlOut, UploadSessionCreate,
+    UploadSessionOut,
+)
 
 # --- Constantes y mensajes reutilizables (reduce duplicación) ---
-STORAGE_DIR = Path("backend/storage")
 ALLOWED_EXTS = {".png", ".jpg", ".jpeg", ".pdf", ".mp3", ".mp4", ".wav", ".webm", ".docx", ".xlsx", ".pptx", ".txt"}
 MAX_BYTES = 50 * 1024 * 1024  # 50MB
 
 ERR_EXT_NOT_ALLOWED = "File extension {ext} not allowed"
 ERR_TOO_LARGE = "File too large (>50MB)"
 ERR_DB_CREATE = "Database error while saving file"
+ERR_UPLOAD_NOT_FOUND = "Upload not found"
+ERR_UPLOAD_TOO_LARGE = "File too large (>{limit} bytes)"
+ERR_BAD_RANGE = "Invalid Content-Range"
+ERR_CHUNK_MISMATCH = "Chunk body does not match Content-Range"
+ERR_UPLOAD_INCOMPLETE = "Upload incomplete"
+ERR_UPLOAD_EXPIRED = "Upload expired"
+ERR_UPLOAD_CHANGED = "Upload changed while completing; retry"
+ERR_FILE_NOT_FOUND = "File not found"
+ERR_ANALYSIS_NOT_FOUND = "Analysis not available"
+ERR_NOT_ANALYZABLE = "Acoustic analysis only supports WAV recordings"
+STAFF_ROLES = ("admin", "therapist", "assistant")
+
+UPLOADS_DIR = STORAGE_DIR / ".uploads"   # archivos parciales/temporales (antes de ir a blobs/)
+WRITE_BLOCK = 1024 * 1024                # 1MiB por pwrite
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
 
 STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/files", tags=["files"])
 
@@ -51,17 +96,18 @@ def _validate_ext(ext: str) -> None:
         raise HTTPException(status_code=400, detail=ERR_EXT_NOT_ALLOWED.format(ext=ext))
 
 
-def _server_filename(ext: str) -> str:
-    """Nombre generado por el servidor (no controlado por usuario)."""
-    return f"{uuid4().hex}{ext}"
+def _tmp_path() -> Path:
+    """Archivo temporal generado por el servidor (no controlado por usuario)."""
+    return _safe_join(UPLOADS_DIR, f"tmp-{uuid4().hex}")
 
 
-async def _save_stream_async(dst_path: Path, in_file: UploadFile) -> int:
+async def _save_stream_async(dst_path: Path, in_file: UploadFile) -> tuple[int, str]:
     """
-    Copia asíncronamente el stream del UploadFile a disco, limitando el tamaño.
-    Devuelve los bytes escritos.
+    Copia asíncronamente el stream del UploadFile a disco, limitando el tamaño,
+    y calcula su sha256 al vuelo. Devuelve (bytes escritos, sha256).
     """
     written = 0
+    digest = hashlib.sha256()
     # Asíncrono: cumpliendo recomendación Sonar (“use an asynchronous file API”)
     async with aiofiles.open(dst_path, "wb") as out:
         while True:
@@ -71,8 +117,53 @@ async def _save_stream_async(dst_path: Path, in_file: UploadFile) -> int:
             written += len(chunk)
             if written > MAX_BYTES:
                 raise HTTPException(status_code=413, detail=ERR_TOO_LARGE)
+            digest.update(chunk)
             await out.write(chunk)
-    return written
+    return written, digest.hexdigest()
+
+
+async def _create_media_record(
+    db: AnySession,
+    src: Path,
+    sha256: str,
+    size: int,
+    ext: str,
+    patient_id: Optional[int],
+    original_name: Optional[str],
+    keep_src_on_error: bool = False,
+) -> MediaFile:
+    """
+    Registra `src` como MediaFile apuntando a su blob. Si el contenido ya
+    existía solo se suma una referencia y `src` se descarta tras el commit.
+    """
+    placed = False
+    try:
+        blob_ext = await acquire_blob(db, sha256, size, ext)  # bloquea la fila del blob
+        placed = place_blob(src, sha256, blob_ext)
+        record = MediaFile(
+            patient_id=patient_id,
+            path=media_url(sha256, blob_ext),
+            sha256=sha256,
+            size_bytes=size,
+            original_name=original_name,
+        )
+        db.add(record)
+        await db_commit(db)
+        await db_refresh(db, record)
+    except SQLAlchemyError:
+        await db_rollback(db)
+        if placed:
+            os.replace(blob_path(sha256, blob_ext), src)
+        if not keep_src_on_error:
+            src.unlink(missing_ok=True)
+        raise HTTPException(status_code=500, detail=ERR_DB_CREATE)
+    if not placed:
+        src.unlink(missing_ok=True)  # duplicado: ya estaba en disco
+    else:
+        media_pipeline.enqueue(sha256, blob_ext)  # blob nuevo: miniatura/picos/audio en segundo plano
+    if blob_ext in ANALYZABLE_EXTS:
+        media_pipeline.enqueue_analysis(record.id, sha256, blob_ext)  # por MediaFile: puede ser otro paciente
+    return record
 
 
 # ------------------- Endpoints -------------------
@@ -80,54 +171,506 @@ async def _save_stream_async(dst_path: Path, in_file: UploadFile) -> int:
 async def upload(
     patient_id: Optional[int] = None,
     f: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AnySession = Depends(get_async_db),
     user=Depends(require_roles("admin", "therapist", "assistant")),
 ):
     """
     Sube un archivo al almacenamiento local de manera segura:
     - valida extensión permitida,
-    - genera nombre de archivo por el servidor,
-    - guarda por streaming asíncrono con límite de tamaño,
+    - guarda por streaming asíncrono con límite de tamaño, calculando el sha256,
+    - deduplica por contenido (blobs/ con conteo de referencias),
     - registra el metadato en DB.
     """
     ext = _ext_of(f.filename)
     _validate_ext(ext)
 
-    fname = _server_filename(ext)          # nombre no controlado por usuario
-    full_path = _safe_join(STORAGE_DIR, fname)
+    tmp_path = _tmp_path()
+    try:
+        size, sha256 = await _save_stream_async(tmp_path, f)
+    except HTTPException:
+        # Limpieza en caso de fallo (tamaño, etc.)
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return await _create_media_record(
+        db, tmp_path, sha256, size, ext, patient_id, (f.filename or "")[:255] or None,
+    )
+
 
+@router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_file(
+    file_id: int,
+    db: AnySession = Depends(get_async_db),
+    user=Depends(require_roles("admin", "therapist")),
+):
+    record = (await db_execute(
+        db, select(MediaFile).where(MediaFile.id == file_id).with_for_update()
+    )).scalar_one_or_none()
+    if record is None:
+        raise HTTPException(status_code=404, detail=ERR_FILE_NOT_FOUND)
+    sha256 = record.sha256
+    try:
+        await db_delete(db, record)
+        orphaned = await release_blob(db, sha256)  # con 0 referencias: archivos a borrar tras el commit
+        await db_commit(db)
+    except SQLAlchemyError:
+        await db_rollback(db)
+        raise HTTPException(status_code=500, detail="Database error while deleting file")
     try:
-        # Guardar stream en disco (async)
-        await _save_stream_async(full_path, f)
+        await purge_blob_files(db, sha256, orphaned)
+    except SQLAlchemyError:
+        # El borrado ya está confirmado; a lo sumo queda un archivo huérfano en disco
+        await db_rollback(db)
+        logger.exception("Could not purge blob %s after deleting file %s", sha256, file_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
-        # Persistir metadatos
-        record = MediaFile(
-            patient_id=patient_id,
-            path=f"/media/{fname}",
-            # Si tu modelo tiene estos campos, puedes activarlos:
-            # original_name=f.filename,
-            # mime_type=f.content_type,
-            # size_bytes=size_written,
-        )
-        db.add(record)
-        db.commit()
-        db.refresh(record)
-        return record
 
-    except HTTPException:
-        # Limpieza en caso de fallo (tamaño/ext, etc.)
-        if full_path.exists():
-            try:
-                full_path.unlink()
-            except Exception:
-                pass
-        raise
+# ------------------- Servir contenido -------------------
+# Sin Authorization se acepta una URL firmada (GET /files/{id}/url)
+_optional_bearer = OAuth2PasswordBearer(tokenUrl="/auth/login", scheme_name="JWT", auto_error=False)
+
+
+async def _media_access(
+    file_id: int,
+    exp: Optional[int] = None,
+    sig: Optional[str] = None,
+    token: Optional[str] = Depends(_optional_bearer),
+) -> None:
+    if sig is not None:
+        if not verify_media_signature(file_id, exp, sig):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired signature")
+        return
+    if token is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    # La URL firmada no toca la base; con Bearer, authenticate abre sesión solo si no está en caché
+    if (await authenticate(token)).role not in STAFF_ROLES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient role")
+
+
+async def _get_file_or_404(db: AnySession, file_id: int) -> MediaFile:
+    record = await db_get(db, MediaFile, file_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=ERR_FILE_NOT_FOUND)
+    return record
+
+
+@router.get("/{file_id}/url", response_model=MediaUrlOut)
+async def get_file_url(
+    file_id: int,
+    db: AnySession = Depends(get_read_db),
+    user=Depends(require_roles(*STAFF_ROLES)),
+):
+    await _get_file_or_404(db, file_id)
+    exp = int(time.time()) + settings.MEDIA_URL_TTL_SECONDS
+    return MediaUrlOut(
+        url=f"/files/{file_id}/content?exp={exp}&sig={sign_media_url(file_id, exp)}",
+        expires_at=datetime.fromtimestamp(exp, tz=timezone.utc),
+    )
+
+
+@router.api_route("/{file_id}/content", methods=["GET", "HEAD"], dependencies=[Depends(_media_access)])
+async def get_file_content(
+    file_id: int,
+    request: Request,
+    variant: Optional[str] = Query(None, regex="^(thumbnail|peaks|audio)$"),
+    db: AnySession = Depends(get_read_db),
+):
+    """
+    Contenido del archivo con soporte de Range (seek en mp3/mp4/webm),
+    ETag fuerte (sha256) y GET condicional. Ver core/media.py.
+    `variant` sirve un derivado (miniatura, picos de onda, audio comprimido).
+    """
+    record = await _get_file_or_404(db, file_id)
+    if variant is not None:
+        return await _derivative_content(request, record, variant)
+    path = resolve_media_path(record.path)
+    try:
+        st = await run_in_threadpool(os.stat, path) if path is not None else None
+    except FileNotFoundError:
+        st = None
+    if st is None:
+        raise HTTPException(status_code=404, detail=ERR_FILE_NOT_FOUND)
+
+    name = record.original_name or path.name
+    info = MediaInfo(
+        path=path,
+        size=st.st_size,
+        mtime=st.st_mtime,
+        etag=make_etag(record.sha256, st.st_size, st.st_mtime),
+        content_type=mimetypes.guess_type(name)[0] or "application/octet-stream",
+        filename=record.original_name,
+        immutable=bool(record.sha256),  # blobs direccionados por contenido: nunca cambian
+    )
+    return media_response(
+        request, info,
+        accel_prefix=settings.MEDIA_ACCEL_REDIRECT_PREFIX,
+        accel_path=record.path[len(MEDIA_PREFIX):],
+    )
+
+
+async def _derivative_content(request: Request, record: MediaFile, kind: str) -> Response:
+    derivative = next((d for d in record.derivatives if d.kind == kind), None)
+    path = resolve_media_path(derivative.path) if derivative is not None else None
+    try:
+        st = await run_in_threadpool(os.stat, path) if path is not None else None
+    except FileNotFoundError:
+        st = None
+    if st is None:
+        raise HTTPException(status_code=404, detail="Derivative not available")
+    info = MediaInfo(
+        path=path,
+        size=st.st_size,
+        mtime=st.st_mtime,
+        etag=f'"{record.sha256}-{kind}"',
+        content_type=derivative.content_type,
+        immutable=True,
+    )
+    return media_response(
+        request, info,
+        accel_prefix=settings.MEDIA_ACCEL_REDIRECT_PREFIX,
+        accel_path=derivative.path[len(MEDIA_PREFIX):],
+    )
+
+
+# ------------------- Análisis acústico -------------------
+@router.get("/analyses", response_model=List[AcousticAnalysisSummaryOut])
+async def list_analyses(
+    patient_id: int,
+    response: Response,
+    page: PageParams = Depends(),
+    db: AnySession = Depends(get_read_db),
+    user=Depends(require_roles(*STAFF_ROLES)),
+):
+    """Historial acústico del paciente, más reciente primero (sin contornos: ver /files/{id}/analysis)."""
+    keys = [AcousticAnalysis.id]
+    stmt = (
+        select(AcousticAnalysis)
+        .where(AcousticAnalysis.patient_id == patient_id)
+        .options(defer(AcousticAnalysis.contour))
+    )
+    stmt = apply_keyset(stmt, keys, page, descending=True)
+    rows = (await db_execute(db, stmt)).scalars().all()
+    return finish_page(rows, keys, page, response)
+
+
+@router.get("/{file_id}/analysis", response_model=AcousticAnalysisOut)
+async def get_analysis(
+    file_id: int,
+    db: AnySession = Depends(get_read_db),
+    user=Depends(require_roles(*STAFF_ROLES)),
+):
+    analysis = (await db_execute(
+        db, select(AcousticAnalysis).where(AcousticAnalysis.media_file_id == file_id)
+    )).scalar_one_or_none()
+    if analysis is None:
+        raise HTTPException(status_code=404, detail=ERR_ANALYSIS_NOT_FOUND)
+    return analysis
+
+
+@router.post("/{file_id}/analysis", status_code=status.HTTP_202_ACCEPTED)
+async def request_analysis(
+    file_id: int,
+    db: AnySession = Depends(get_async_db),
+    user=Depends(require_roles("admin", "therapist")),
+):
+    """(Re)encola el análisis, p. ej. tras cambiar ACOUSTIC_F0_* para un paciente con voz aguda."""
+    record = await _get_file_or_404(db, file_id)
+    ext = Path(record.path).suffix.lower()
+    if not record.sha256 or ext not in ANALYZABLE_EXTS:
+        raise HTTPException(status_code=400, detail=ERR_NOT_ANALYZABLE)
+    if not media_pipeline.enqueue_analysis(record.id, record.sha256, ext):
+        raise HTTPException(status_code=503, detail="Analysis queue unavailable")
+    return {"status": "queued"}
+
+
+# ------------------- Subidas reanudables -------------------
+# 1) POST /files/uploads               -> crea la sesión y preasigna el archivo
+# 2) PUT  /files/uploads/{id}          -> un trozo, con `Content-Range: bytes a-b/total`
+# 3) GET  /files/uploads/{id}          -> offset contiguo recibido (para reanudar)
+# 4) POST /files/uploads/{id}/complete -> lo pasa a blobs/ y crea el MediaFile
+# Los trozos pueden llegar en cualquier orden o en paralelo: cada uno se escribe
+# en su posición y solo se registra cuando llegó completo.
+
+def _part_path(upload_id: str) -> Path:
+    return _safe_join(UPLOADS_DIR, f"{upload_id}.part")
+
+
+def _preallocate(path: Path, size: int) -> None:
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        try:
+            os.posix_fallocate(fd, 0, size)  # reserva bloques: sin ENOSPC a mitad de subida
+        except (AttributeError, OSError) as exc:
+            if isinstance(exc, OSError) and exc.errno == 28:  # ENOSPC
+                raise
+            os.ftruncate(fd, size)  # FS/SO sin fallocate: archivo disperso
+    finally:
+        os.close(fd)
 
+
+def _pwrite_all(fd: int, data: bytes, offset: int) -> None:
+    view = memoryview(data)
+    while view:
+        n = os.pwrite(fd, view, offset)
+        view, offset = view[n:], offset + n
+
+
+def _parse_content_range(value: str) -> tuple[int, int, int]:
+    """`bytes a-b/total` -> (a, b + 1, total): rango semiabierto."""
+    m = _CONTENT_RANGE.match(value.strip())
+    if not m:
+        raise HTTPException(status_code=400, detail=ERR_BAD_RANGE)
+    start, last, total = (int(g) for g in m.groups())
+    if last < start:
+        raise HTTPException(status_code=400, detail=ERR_BAD_RANGE)
+    return start, last + 1, total
+
+
+def _merge_range(ranges: List[List[int]], start: int, end: int) -> List[List[int]]:
+    merged: List[List[int]] = []
+    for a, b in sorted([*ranges, [start, end]]):
+        if merged and a <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], b)
+        else:
+            merged.append([a, b])
+    return merged
+
+
+def _contiguous_offset(ranges: List[List[int]]) -> int:
+    return ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+
+
+def _session_out(up: UploadSession) -> UploadSessionOut:
+    ttl = timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    return UploadSessionOut(
+        id=up.id,
+        filename=up.filename,
+        size=up.size,
+        offset=_contiguous_offset(up.received),
+        received=up.received,
+        expires_at=(up.updated_at or up.created_at) + ttl,
+    )
+
+
+async def _get_upload_or_404(db: AnySession, upload_id: str, user, lock: bool = False) -> UploadSession:
+    stmt = select(UploadSession).where(UploadSession.id == upload_id)
+    if lock:
+        # PUTs concurrentes de la misma sesión: se serializa el registro de rangos
+        stmt = stmt.with_for_update().execution_options(populate_existing=True)
+    up = (await db_execute(db, stmt)).scalar_one_or_none()
+    if up is None or (up.created_by != user.id and user.role != "admin"):
+        raise HTTPException(status_code=404, detail=ERR_UPLOAD_NOT_FOUND)
+    return up
+
+
+async def _write_chunk(path: Path, offset: int, length: int, request: Request) -> int:
+    """Escribe el cuerpo en `offset` por bloques (pwrite en el threadpool). Devuelve bytes escritos."""
+    try:
+        fd = await run_in_threadpool(os.open, path, os.O_WRONLY)
+    except FileNotFoundError:
+        # El GC de subidas ya borró el .part (sesión vencida)
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=ERR_UPLOAD_EXPIRED)
+    written = 0
+    buf = bytearray()
+    try:
+        async for piece in request.stream():
+            if written + len(buf) + len(piece) > length:
+                raise HTTPException(status_code=400, detail=ERR_CHUNK_MISMATCH)
+            buf += piece
+            if len(buf) >= WRITE_BLOCK:
+                await run_in_threadpool(_pwrite_all, fd, bytes(buf), offset + written)
+                written += len(buf)
+                buf.clear()
+        if buf:
+            await run_in_threadpool(_pwrite_all, fd, bytes(buf), offset + written)
+            written += len(buf)
+    finally:
+        os.close(fd)
+    return written
+
+
+@router.post("/uploads", response_model=UploadSessionOut, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    payload: UploadSessionCreate,
+    response: Response,
+    db: AnySession = Depends(get_async_db),
+    user=Depends(require_roles("admin", "therapist", "assistant")),
+):
+    ext = _ext_of(payload.filename)
+    _validate_ext(ext)
+    if payload.size > settings.UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=ERR_UPLOAD_TOO_LARGE.format(limit=settings.UPLOAD_MAX_BYTES))
+
+    up = UploadSession(
+        id=uuid4().hex,
+        created_by=user.id,
+        patient_id=payload.patient_id,
+        filename=payload.filename,
+        ext=ext,
+        size=payload.size,
+        received=[],
+    )
+    part = _part_path(up.id)
+    try:
+        await run_in_threadpool(_preallocate, part, payload.size)
+    except OSError:
+        part.unlink(missing_ok=True)
+        raise HTTPException(status_code=507, detail="Insufficient storage")
+    try:
+        db.add(up)
+        await db_commit(db)
+        await db_refresh(db, up)
     except SQLAlchemyError:
-        if full_path.exists():
-            try:
-                full_path.unlink()
-            except Exception:
-                pass
-        db.rollback()
+        part.unlink(missing_ok=True)
+        await db_rollback(db)
         raise HTTPException(status_code=500, detail=ERR_DB_CREATE)
+    response.headers["Location"] = f"/files/uploads/{up.id}"
+    return _session_out(up)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionOut)
+async def get_upload(
+    upload_id: str,
+    response: Response,
+    db: AnySession = Depends(get_async_db),
+    user=Depends(require_roles("admin", "therapist", "assistant")),
+):
+    out = _session_out(await _get_upload_or_404(db, upload_id, user))
+    response.headers["Upload-Offset"] = str(out.offset)
+    return out
+
+
+@router.put("/uploads/{upload_id}", response_model=UploadSessionOut)
+async def put_upload_chunk(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    content_range: str = Header(...),
+    db: AnySession = Depends(get_async_db),
+    user=Depends(require_roles("admin", "therapist", "assistant")),
+):
+    up = await _get_upload_or_404(db, upload_id, user)
+    size = up.size
+    # No retener conexión ni transacción mientras llega el cuerpo (puede tardar minutos)
+    await db_rollback(db)
+
+    start, end, total = _parse_content_range(content_range)
+    if total != size or end > size:
+        raise HTTPException(status_code=416, detail=ERR_BAD_RANGE)
+    if end - start > settings.UPLOAD_CHUNK_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=ERR_UPLOAD_TOO_LARGE.format(limit=settings.UPLOAD_CHUNK_MAX_BYTES))
+
+    written = await _write_chunk(_part_path(upload_id), start, end - start, request)
+    if written != end - start:
+        # Conexión cortada: lo escrito no se registra y el cliente reenvía el trozo
+        raise HTTPException(status_code=400, detail=ERR_CHUNK_MISMATCH)
+
+    try:
+        up = await _get_upload_or_404(db, upload_id, user, lock=True)
+        up.received = _merge_range(up.received, start, end)
+        await db_commit(db)
+        await db_refresh(db, up)
+    except SQLAlchemyError:
+        await db_rollback(db)
+        raise HTTPException(status_code=500, detail=ERR_DB_CREATE)
+    out = _session_out(up)
+    response.headers["Upload-Offset"] = str(out.offset)
+    return out
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=MediaFileOut, status_code=status.HTTP_201_CREATED)
+async def complete_upload(
+    upload_id: str,
+    db: AnySession = Depends(get_async_db),
+    user=Depends(require_roles("admin", "therapist", "assistant")),
+):
+    up = await _get_upload_or_404(db, upload_id, user)
+    complete, seen_at = _contiguous_offset(up.received) == up.size, up.updated_at
+    # El hash de un archivo grande tarda: se calcula sin lock ni transacción abiertos
+    await db_rollback(db)
+    if not complete:
+        raise HTTPException(status_code=409, detail=ERR_UPLOAD_INCOMPLETE)
+
+    part = _part_path(upload_id)
+    try:
+        sha256, size = await run_in_threadpool(hash_file, part)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=ERR_UPLOAD_EXPIRED)
+
+    # Lock solo para cerrar la sesión. Si otro complete ganó, no existe (404);
+    # si entró un PUT durante el hash, el contenido pudo cambiar: reintentar
+    up = await _get_upload_or_404(db, upload_id, user, lock=True)
+    if up.updated_at != seen_at:
+        await db_rollback(db)
+        raise HTTPException(status_code=409, detail=ERR_UPLOAD_CHANGED)
+    # La sesión se borra en la misma transacción que el alta del MediaFile;
+    # si algo falla, el .part vuelve a su sitio y el cliente puede reintentar
+    await db_delete(db, up)
+    return await _create_media_record(
+        db, part, sha256, size, up.ext, up.patient_id, up.filename, keep_src_on_error=True,
+    )
+
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    upload_id: str,
+    db: AnySession = Depends(get_async_db),
+    user=Depends(require_roles("admin", "therapist", "assistant")),
+):
+    up = await _get_upload_or_404(db, upload_id, user, lock=True)
+    await db_delete(db, up)
+    await db_commit(db)
+    _part_path(upload_id).unlink(missing_ok=True)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# ---------- Limpieza de sesiones abandonadas ----------
+def purge_expired_uploads() -> int:
+    """Borra sesiones sin actividad en UPLOAD_SESSION_TTL_HOURS y sus archivos parciales."""
+    ttl = timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    with SessionLocal() as db:
+        stale = db.execute(
+            delete(UploadSession)
+            .where(UploadSession.updated_at < func.now() - ttl)
+            .returning(UploadSession.id)
+        ).scalars().all()
+        db.commit()
+        alive = set(db.execute(select(UploadSession.id)).scalars())
+    for sid in stale:
+        _part_path(sid).unlink(missing_ok=True)
+    # Huérfanos: .part sin sesión (caída entre preasignar y el commit) y
+    # temporales de /files/upload que quedaron a medias
+    cutoff = time.time() - ttl.total_seconds()
+    for leftover in UPLOADS_DIR.iterdir():
+        if leftover.suffix == ".part" and leftover.stem in alive:
+            continue
+        try:
+            if leftover.stat().st_mtime < cutoff:
+                leftover.unlink()
+        except FileNotFoundError:
+            pass
+    return len(stale)
+
+
+async def _upload_gc_loop() -> None:
+    while True:
+        try:
+            purged = await run_in_threadpool(purge_expired_uploads)
+            if purged:
+                logger.info("Purged %d abandoned upload sessions", purged)
+        except Exception:  # BD caída, etc.: se reintenta en la próxima vuelta
+            logger.exception("Upload session cleanup failed")
+        await asyncio.sleep(settings.UPLOAD_GC_INTERVAL_SECONDS)
+
+
+_gc_task: Optional[asyncio.Task] = None
+
+
+def start_upload_gc() -> None:
+    global _gc_task
+    if _gc_task is None:
+        _gc_task = asyncio.create_task(_upload_gc_loop())
+
+
+def stop_upload_gc() -> None:
+    if _gc_task is not None:
+        _gc_task.cancel()
@@ -1,39 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from dataclasses import asdict
+import io
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, func, case, literal, select
 from ..core.deps import get_current_user, require_roles
-from ..core.database import get_db
-from ..schemas.patient import PatientCreate, PatientUpdate, PatientOut
-from ..models.patient import Patient
-import re
+from ..core.database import SessionLocal, get_db, get_async_db, db_execute, db_get, AnySession
+from ..core.export import begin_snapshot, coalesce, media_entries, ndjson_lines, patient_records, zip_stream
+from ..core.patient_import import guess_format, import_patients
+from ..core.replica import get_read_db
+from ..core.pagination import PageParams, apply_keyset, finish_page
+from ..schemas.patient import PatientCreate, PatientUpdate, PatientOut, PatientImportReport
+from ..models.patient import Patient, norm_cedula, search_name_expr
+import unicodedata
 
 router = APIRouter(prefix="/patients", tags=["patients"])
 
-def norm_cedula(v: str | None) -> str | None:
-    if not v:
-        return None
-    # Deja solo dígitos y letras (sin tildes, sin guiones/espacios)
-    v = re.sub(r"[^0-9A-Za-z]", "", v).upper()
-    return v or None
+def fold_text(v: str) -> str:
+    """Minúsculas y sin tildes ("Muñoz" -> "munoz"), igual que f_unaccent(lower(...))."""
+    decomposed = unicodedata.normalize("NFKD", v.strip().lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+def _search_patients(query, q: str):
+    """
+    Búsqueda indexada (pg_trgm + unaccent) por nombre completo y prefijo de cédula.
+    Devuelve (query filtrada, expresión de ranking).
+    """
+    term = fold_text(q)
+    name = search_name_expr(Patient.first_name, Patient.last_name)
+    ors = [
+        name.contains(term, autoescape=True),   # subcadena, usa el índice GIN trigram
+        literal(term).op("<%")(name),           # similitud por palabra (errores de tipeo)
+    ]
+    rank = func.word_similarity(term, name) + case((name.startswith(term, autoescape=True), 1.0), else_=0.0)
+
+    nq = norm_cedula(q)
+    if nq and any(ch.isdigit() for ch in nq):
+        ors.append(Patient.cedula_norm.startswith(nq, autoescape=True))
+        rank = rank + case((Patient.cedula_norm == nq, 2.0), else_=0.0)
+    return query.filter(or_(*ors)), rank
 
 @router.get("/", response_model=list[PatientOut])
-def list_patients(
-    db: Session = Depends(get_db),
+async def list_patients(
+    response: Response,
+    db: AnySession = Depends(get_read_db),
     q: str | None = Query(None, description="Búsqueda por nombre o cédula"),
+    page: PageParams = Depends(),
     user = Depends(get_current_user),
 ):
-    query = db.query(Patient)
-    if q:
-        nq = norm_cedula(q)
-        q_like = f"%{q.strip()}%"
-        ors = [
-            Patient.first_name.ilike(q_like),
-            Patient.last_name.ilike(q_like),
-        ]
-        if nq:
-            ors.append(Patient.cedula_norm == nq)
-        query = query.filter(or_(*ors))
-    return query.order_by(Patient.id.desc()).all()
+    stmt = select(Patient)
+    if q and q.strip():
+        # Type-ahead: los `limit` mejores por relevancia, sin cursor
+        stmt, rank = _search_patients(stmt, q)
+        stmt = stmt.order_by(rank.desc(), Patient.id.desc()).limit(page.limit)
+        return (await db_execute(db, stmt)).scalars().all()
+    # Keyset sobre id (desc): páginas profundas sin OFFSET
+    keys = (Patient.id,)
+    stmt = apply_keyset(stmt, keys, page, descending=True)
+    rows = (await db_execute(db, stmt)).scalars().all()
+    return finish_page(rows, keys, page, response)
 
 @router.post("/", response_model=PatientOut, status_code=status.HTTP_201_CREATED)
 def create_patient(
@@ -63,17 +89,75 @@ def create_patient(
     db.refresh(obj)
     return obj
 
+@router.post("/import", response_model=PatientImportReport)
+def import_patients_file(
+    f: UploadFile = File(..., description="CSV con encabezados o NDJSON (un paciente por línea)"),
+    format: str | None = Query(None, regex="^(csv|ndjson)$", description="por defecto, según la extensión"),
+    on_duplicate: str = Query("skip", regex="^(skip|update)$"),
+    dry_run: bool = Query(False, description="solo valida y cuenta, no escribe"),
+    db: Session = Depends(get_db),
+    user = Depends(require_roles("admin", "therapist")),
+):
+    """
+    Alta masiva por lotes (INSERT multi-fila con ON CONFLICT sobre la cédula
+    normalizada). Devuelve conteos y las líneas con error u omitidas.
+    Ver core/patient_import.py.
+    """
+    fmt = format or guess_format(f.filename)
+    if fmt is None:
+        raise HTTPException(400, "Formato no reconocido: use .csv, .ndjson o el parámetro format")
+    # utf-8-sig: Excel guarda los CSV con BOM
+    text_stream = io.TextIOWrapper(f.file, encoding="utf-8-sig", newline="")
+    try:
+        report = import_patients(db, text_stream, fmt, on_duplicate=on_duplicate, dry_run=dry_run)
+    except UnicodeDecodeError:
+        raise HTTPException(400, "El archivo debe estar en UTF-8 (los lotes anteriores ya se guardaron)")
+    finally:
+        text_stream.detach()
+    return PatientImportReport(**asdict(report))
+
 @router.get("/{patient_id}", response_model=PatientOut)
-def get_patient(
+async def get_patient(
     patient_id: int,
-    db: Session = Depends(get_db),
+    db: AnySession = Depends(get_async_db),
     user = Depends(get_current_user),
 ):
-    obj = db.query(Patient).get(patient_id)
+    obj = await db_get(db, Patient, patient_id)
     if not obj:
         raise HTTPException(404, "Paciente no encontrado")
     return obj
 
+def _export_stream(patient_id: int, fmt: str):
+    # Sesión propia: vive lo que dure la descarga, no lo que dura el handler
+    with SessionLocal() as db:
+        begin_snapshot(db)
+        lines = ndjson_lines(patient_id, patient_records(db, patient_id))
+        if fmt == "zip":
+            yield from zip_stream(lines, media_entries(db, patient_id))
+        else:
+            yield from coalesce(lines)
+
+@router.get("/{patient_id}/export")
+async def export_patient(
+    patient_id: int,
+    format: str = Query("ndjson", regex="^(ndjson|zip)$", description="zip incluye los archivos en media/"),
+    db: AnySession = Depends(get_async_db),
+    user = Depends(require_roles("admin", "therapist")),
+):
+    """
+    Historia clínica completa en streaming (NDJSON o ZIP): paciente, planes,
+    sesiones, evaluaciones, tareas, citas, archivos y análisis acústicos.
+    Ver core/export.py para el formato.
+    """
+    if not await db_get(db, Patient, patient_id):
+        raise HTTPException(404, "Paciente no encontrado")
+    media_type = "application/zip" if format == "zip" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_stream(patient_id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="paciente-{patient_id}.{format}"'},
+    )
+
 @router.put("/{patient_id}", response_model=PatientOut)
 def update_patient(
     patient_id: int,
@@ -1,12 +1,19 @@
 # backend/routers/plans.py
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
-from ..core.database import get_db
+from ..core.database import get_db, get_async_db, db_execute, db_get, AnySession
 from ..core.deps import require_roles, get_current_user
-from ..models.plan import TreatmentPlan, SessionLog
+from ..core.replica import get_read_db
+from ..core.pagination import PageParams, apply_keyset, finish_page
+from ..core.config import settings
+from ..core.progress import build_matrix, compute_progress, progress_cache
+from ..core.plan_rollups import apply_log, summarize
+from ..models.plan import TreatmentPlan, SessionLog, PlanGoalRollup
 from ..schemas.plan import (
     TreatmentPlanCreate,
     TreatmentPlanUpdate,
@@ -14,6 +21,8 @@ from ..schemas.plan import (
     SessionLogCreate,
     SessionLogUpdate,   # por si luego agregas update de logs
     SessionLogOut,
+    PlanProgressOut,
+    PlanSummaryOut,
 )
 
 router = APIRouter(prefix="/plans", tags=["plans"])
@@ -26,6 +35,12 @@ def _get_plan_or_404(db: Session, plan_id: int) -> TreatmentPlan:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan not found")
     return plan
 
+async def _aget_plan_or_404(db: AnySession, plan_id: int) -> TreatmentPlan:
+    plan = await db_get(db, TreatmentPlan, plan_id)
+    if not plan:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan not found")
+    return plan
+
 # ----------------- Treatment Plans -----------------
 
 @router.post("/", response_model=TreatmentPlanOut, status_code=status.HTTP_201_CREATED)
@@ -46,26 +61,31 @@ def create_plan(
 
 
 @router.get("/patient/{patient_id}", response_model=List[TreatmentPlanOut])
-def list_plans(
+async def list_plans(
     patient_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AnySession = Depends(get_read_db),
     user=Depends(get_current_user),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=500),
+    page: PageParams = Depends(),
+    skip: int = Query(0, ge=0, deprecated=True),
     order: str = Query("asc", pattern="^(asc|desc)$"),
 ):
-    q = db.query(TreatmentPlan).filter(TreatmentPlan.patient_id == patient_id)
-    q = q.order_by(TreatmentPlan.id.asc() if order == "asc" else TreatmentPlan.id.desc())
-    return q.offset(skip).limit(limit).all()
+    q = select(TreatmentPlan).where(TreatmentPlan.patient_id == patient_id)
+    keys = (TreatmentPlan.id,)
+    q = apply_keyset(q, keys, page, descending=(order == "desc"))
+    if skip and not page.cursor:
+        q = q.offset(skip)
+    rows = (await db_execute(db, q)).scalars().all()
+    return finish_page(rows, keys, page, response)
 
 
 @router.get("/{id}", response_model=TreatmentPlanOut)
-def get_plan(
+async def get_plan(
     id: int,
-    db: Session = Depends(get_db),
+    db: AnySession = Depends(get_async_db),
     user=Depends(get_current_user),
 ):
-    return _get_plan_or_404(db, id)
+    return await _aget_plan_or_404(db, id)
 
 
 @router.put("/{id}", response_model=TreatmentPlanOut)
@@ -112,8 +132,11 @@ def create_log(
 ):
     _ = _get_plan_or_404(db, plan_id)  # asegura 404 si no existe
     try:
-        log = SessionLog(plan_id=plan_id, **data.dict())
+        # plan_id viene de la ruta; el del cuerpo se ignora
+        log = SessionLog(plan_id=plan_id, **data.dict(exclude={"plan_id"}))
         db.add(log)
+        db.flush()
+        apply_log(db, plan_id, log.progress, log.date)  # misma transacción que el log
         db.commit()
         db.refresh(log)
         return log
@@ -123,15 +146,66 @@ def create_log(
 
 
 @router.get("/{plan_id}/logs", response_model=List[SessionLogOut])
-def list_logs(
+async def list_logs(
     plan_id: int,
-    db: Session = Depends(get_db),
+    db: AnySession = Depends(get_read_db),
     user=Depends(get_current_user),
     skip: int = Query(0, ge=0),
     limit: int = Query(200, ge=1, le=1000),
     order: str = Query("asc", pattern="^(asc|desc)$"),
 ):
-    _ = _get_plan_or_404(db, plan_id)
-    q = db.query(SessionLog).filter(SessionLog.plan_id == plan_id)
+    _ = await _aget_plan_or_404(db, plan_id)
+    q = select(SessionLog).where(SessionLog.plan_id == plan_id)
     q = q.order_by(SessionLog.id.asc() if order == "asc" else SessionLog.id.desc())
-    return q.offset(skip).limit(limit).all()
+    return (await db_execute(db, q.offset(skip).limit(limit))).scalars().all()
+
+
+@router.get("/{plan_id}/progress", response_model=PlanProgressOut)
+async def plan_progress(
+    plan_id: int,
+    db: AnySession = Depends(get_read_db),
+    user=Depends(get_current_user),
+    window: int = Query(settings.PROGRESS_ROLLING_WINDOW, ge=1, le=52),
+):
+    """Series por meta, media móvil, tendencia, % hacia la meta y fecha proyectada (core/progress.py)."""
+    plan = await _aget_plan_or_404(db, plan_id)
+    # Huella barata (index-only sobre ix_session_logs_plan): detecta logs nuevos de otros workers
+    count, last_id = (await db_execute(
+        db, select(func.count(), func.max(SessionLog.id)).where(SessionLog.plan_id == plan_id)
+    )).one()
+    fingerprint = (count, last_id, repr(plan.goals))
+    cached = progress_cache.get(plan_id, window, fingerprint)
+    if cached is not None:
+        return cached
+
+    rows = (await db_execute(
+        db,
+        select(SessionLog.date, SessionLog.progress)
+        .where(SessionLog.plan_id == plan_id, SessionLog.date.is_not(None))
+        .order_by(SessionLog.date, SessionLog.id),
+    )).all()
+    goals = plan.goals or []
+    dates, values = build_matrix([(r.date, r.progress) for r in rows], len(goals))
+    result = PlanProgressOut(plan_id=plan_id, **await run_in_threadpool(compute_progress, goals, dates, values, window))
+    progress_cache.put(plan_id, window, fingerprint, result)
+    return result
+
+
+@router.get("/{plan_id}/summary", response_model=PlanSummaryOut)
+async def plan_summary(
+    plan_id: int,
+    db: AnySession = Depends(get_read_db),
+    user=Depends(get_current_user),
+):
+    """Estadísticas por meta desde plan_goal_rollups: O(metas) filas, sin recorrer los logs."""
+    plan = await _aget_plan_or_404(db, plan_id)
+    rollups = (await db_execute(
+        db, select(PlanGoalRollup).where(PlanGoalRollup.plan_id == plan_id).order_by(PlanGoalRollup.goal_index)
+    )).scalars().all()
+    goals = plan.goals or []
+    out = []
+    for r in rollups:
+        goal = goals[r.goal_index] if r.goal_index < len(goals) and isinstance(goals[r.goal_index], dict) else {}
+        out.append({"index": r.goal_index, "title": goal.get("title"), "metric": goal.get("metric"),
+                    "target": goal.get("target"), **summarize(r)})
+    return {"plan_id": plan_id, "goals": out}
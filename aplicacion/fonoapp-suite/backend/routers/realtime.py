@@ -1,53 +1,205 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import asyncio
+import json
+import logging
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
 from typing import Dict, List
 
+from ..core.config import settings
+from ..core.deps import require_roles
+from ..core.pubsub import Broker, InProcessBroker, RedisBroker
+from ..core.realtime import (
+    CodecError, Peer, RoomRegistry, WS_UNSUPPORTED_DATA, negotiate_codec,
+)
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
-# In-memory rooms for demo; for production use Redis/pubsub
+def _make_broker() -> Broker:
+    if settings.REALTIME_BROKER_URL:
+        return RedisBroker.from_url(settings.REALTIME_BROKER_URL)
+    return InProcessBroker()
+
+# Salas conocidas por este proceso; el broker reparte mensajes y presencia entre procesos.
+# Una sala sin peers locales conserva historial y suscripción hasta que se evicta por inactiva.
 class ConnectionManager:
-    def __init__(self):
-        self.rooms: Dict[str, List[WebSocket]] = {}
-
-    async def connect(self, room: str, ws: WebSocket):
-        await ws.accept()
-        self.rooms.setdefault(room, []).append(ws)
-
-    def disconnect(self, room: str, ws: WebSocket):
-        if room in self.rooms and ws in self.rooms[room]:
-            self.rooms[room].remove(ws)
-            if not self.rooms[room]:
-                self.rooms.pop(room, None)
-
-    async def broadcast(self, room: str, message: str, sender: WebSocket | None = None):
-        # Snapshot para evitar "list changed size during iteration" si alguien se desconecta
-        for conn in self.rooms.get(room, [])[:]:
-            if conn is sender:
+    def __init__(self, broker: Broker):
+        self.registry = RoomRegistry(
+            history_messages=settings.REALTIME_HISTORY_MESSAGES,
+            room_bytes=settings.REALTIME_HISTORY_ROOM_BYTES,
+            total_bytes=settings.REALTIME_HISTORY_TOTAL_BYTES,
+        )
+        self.broker = broker
+        self.instance_id = uuid4().hex  # identifica este proceso en los sobres
+        self._sweeper: asyncio.Task | None = None
+        broker.bind(self._deliver)
+
+    async def connect(self, room: str, ws: WebSocket, parse_json: bool = False,
+                      keep_history: bool = False, name: str | None = None) -> Peer:
+        codec = negotiate_codec(ws.scope.get("subprotocols") or [], parse_json=parse_json)
+        await ws.accept(subprotocol=codec.subprotocol)
+        state = self.registry.get(room)
+        if state is None:
+            state = self.registry.create(room, keep_history)
+            await self.broker.subscribe(room)
+            # Los demás workers responden con sus miembros para armar la presencia
+            await self._control(room, "hello")
+        member = {"id": uuid4().hex[:12], "name": (name or "")[:64] or None}
+        peer = Peer(
+            ws, room, state.metrics,
+            queue_size=settings.REALTIME_SEND_QUEUE_SIZE,
+            policy=settings.REALTIME_SLOW_CONSUMER_POLICY,
+            send_timeout=settings.REALTIME_SEND_TIMEOUT_SECONDS,
+            codec=codec,
+            batch_window=settings.REALTIME_BATCH_WINDOW_MS / 1000,
+            max_batch=settings.REALTIME_BATCH_MAX_MESSAGES,
+            member=member,
+            on_close=self._forget,
+        )
+        state.peers.add(peer)
+        self.registry.touch(room)
+        # Estado de la sala antes que cualquier mensaje nuevo. Los clientes de texto
+        # plano (chat actual) no entienden el snapshot: reciben el historial tal cual.
+        if codec.batching:
+            snapshot = state.snapshot()
+            snapshot["presence"].append(member)  # su propio "join" llega después por el broker
+            peer.send(snapshot)
+        else:
+            for message, _ in state.history:
+                peer.send(message)
+        await self._control(room, "join", member)
+        return peer
+
+    def disconnect(self, peer: Peer):
+        peer.close()  # -> _forget
+
+    def _forget(self, peer: Peer):
+        state = self.registry.get(peer.room)
+        if state is None:
+            return
+        state.peers.discard(peer)
+        asyncio.create_task(self._control(peer.room, "leave", peer.member))
+
+    async def _control(self, room: str, kind: str, member: dict | None = None):
+        envelope = json.dumps({"o": self.instance_id, "c": kind, "m": member})
+        await self.broker.publish(room, envelope)
+
+    async def broadcast(self, room: str, messages: List, sender: Peer | None = None):
+        # Sobre con origen: el emisor no recibe su propio mensaje, esté donde esté.
+        # Un frame con varios mensajes se publica una sola vez en el broker.
+        envelope = json.dumps({
+            "o": self.instance_id,
+            "s": id(sender) if sender is not None else None,
+            "d": messages,
+        })
+        await self.broker.publish(room, envelope)
+
+    async def _deliver(self, room: str, payload: str):
+        state = self.registry.get(room)
+        if state is None:
+            return
+        envelope = json.loads(payload)
+        if "c" in envelope:
+            await self._on_control(room, state, envelope)
+            return
+        self.registry.touch(room)
+        for message in envelope["d"]:
+            self.registry.record(room, message)
+        skip = envelope["s"] if envelope["o"] == self.instance_id else None
+        # Solo encola: cada peer tiene su escritor, un cliente lento no frena a los demás.
+        # Snapshot porque `send` puede desconectar (política "disconnect")
+        for peer in list(state.peers):
+            if id(peer) == skip:
                 continue
+            for message in envelope["d"]:
+                peer.send(message)
+
+    async def _on_control(self, room: str, state, envelope: dict):
+        kind, member = envelope["c"], envelope["m"]
+        if kind == "hello":
+            if envelope["o"] != self.instance_id:
+                for peer in list(state.peers):
+                    await self._control(room, "join", peer.member)
+            return
+        if kind == "join":
+            changed = state.members.get(member["id"]) != member
+            state.members[member["id"]] = member
+        else:
+            changed = state.members.pop(member["id"], None) is not None
+        self.registry.touch(room)
+        if not changed:
+            return
+        event = {"type": "presence", "event": kind, "member": member}
+        for peer in list(state.peers):
+            if peer.codec.batching and peer.member.get("id") != member["id"]:
+                peer.send(event)
+
+    async def _evict_idle(self):
+        for room in self.registry.idle_rooms(settings.REALTIME_ROOM_IDLE_SECONDS):
+            self.registry.drop(room)
+            await self.broker.unsubscribe(room)
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(settings.REALTIME_ROOM_SWEEP_SECONDS)
             try:
-                await conn.send_text(message)
-            except Exception:
-                # limpia conexiones caídas
-                self.disconnect(room, conn)
+                await self._evict_idle()
+            except Exception:  # el barrido no debe morir por un fallo del broker
+                logger.exception("Realtime idle room sweep failed")
 
-manager = ConnectionManager()
+    def start(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
 
-@router.websocket("/ws/chat/{room}")
-async def ws_chat(ws: WebSocket, room: str):
-    await manager.connect(room, ws)
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        await self.broker.close()
+
+    def stats(self) -> Dict[str, dict]:
+        return self.registry.stats()
+
+manager = ConnectionManager(_make_broker())
+
+async def _receive_frame(ws: WebSocket):
+    message = await ws.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    return message["text"] if message.get("text") is not None else message.get("bytes")
+
+async def _serve(ws: WebSocket, room: str, parse_json: bool, keep_history: bool):
+    name = ws.query_params.get("name")
+    peer = await manager.connect(room, ws, parse_json=parse_json, keep_history=keep_history, name=name)
     try:
         while True:
-            data = await ws.receive_text()
-            await manager.broadcast(room, data, sender=ws)
+            frame = await _receive_frame(ws)
+            try:
+                messages = peer.codec.decode(frame)
+                if messages:
+                    await manager.broadcast(room, messages, sender=peer)
+            except (CodecError, TypeError, ValueError):
+                # frame mal formado o no serializable (p. ej. binarios dentro de msgpack)
+                await ws.close(code=WS_UNSUPPORTED_DATA)
+                break
     except WebSocketDisconnect:
-        manager.disconnect(room, ws)
+        pass
+    finally:
+        manager.disconnect(peer)  # idempotente (el peer pudo cerrarse por lento)
+
+@router.websocket("/ws/chat/{room}")
+async def ws_chat(ws: WebSocket, room: str):
+    await _serve(ws, f"chat:{room}", parse_json=False, keep_history=True)
 
 @router.websocket("/ws/signal/{room}")
 async def ws_signal(ws: WebSocket, room: str):
-    # Simple signaling for WebRTC (offer/answer/candidates as text JSON)
-    await manager.connect(room, ws)
-    try:
-        while True:
-            msg = await ws.receive_text()
-            await manager.broadcast(room, msg, sender=ws)
-    except WebSocketDisconnect:
-        manager.disconnect(room, ws)
+    # Señalización WebRTC (offer/answer/candidates); el texto sin subprotocolo es JSON.
+    # Sin historial: reenviar ofertas/candidatos viejos rompería la negociación
+    await _serve(ws, f"signal:{room}", parse_json=True, keep_history=False)
+
+@router.get("/realtime/metrics")
+async def realtime_metrics(user=Depends(require_roles("admin"))):
+    """Por sala (en este worker): peers, colas, descartes, latencia de envío, presencia e historial."""
+    # async: la foto se toma en el event loop dueño de las salas, no en el threadpool
+    return manager.stats()
@@ -1,16 +1,94 @@
-from pydantic import BaseModel
+from typing import List, Literal
+from pydantic import BaseModel, Field, root_validator, validator
 from datetime import datetime
 
 class AppointmentBase(BaseModel):
     patient_id: int
+    therapist_id: int | None = None
     starts_at: datetime
     ends_at: datetime
     status: str = "scheduled"
     notes: str | None = None
 
-class AppointmentCreate(AppointmentBase): pass
-class AppointmentUpdate(AppointmentBase): pass
+class _AppointmentInput(AppointmentBase):
+    # Solo en la entrada: filas heredadas con ends_at <= starts_at deben poder leerse/exportarse
+    @validator("ends_at")
+    def _ends_after_start(cls, v, values):
+        starts = values.get("starts_at")
+        if starts is not None and v <= starts:
+            raise ValueError("ends_at must be after starts_at")
+        return v
+
+class AppointmentCreate(_AppointmentInput): pass
+class AppointmentUpdate(_AppointmentInput): pass
 
 class AppointmentOut(AppointmentBase):
     id: int
+    series_id: int | None = None
+    original_starts_at: datetime | None = None
+    class Config: orm_mode = True
+
+class AppointmentOccurrenceOut(AppointmentBase):
+    # id es null en ocurrencias virtuales de una serie (aún no materializadas)
+    id: int | None = None
+    series_id: int | None = None
+    original_starts_at: datetime | None = None
     class Config: orm_mode = True
+
+# ---------- Lotes (series semanales, reprogramaciones masivas) ----------
+
+class AppointmentBulkCreate(BaseModel):
+    items: List[AppointmentCreate] = Field(..., min_items=1, max_items=1000)
+
+class SlotConflict(BaseModel):
+    index: int                                          # posición en `items`
+    conflicts_with: List[int] = Field(default_factory=list)   # ids de citas existentes
+    conflicts_with_series: List[int] = Field(default_factory=list)  # ids de series (ocurrencias virtuales)
+    overlaps_batch: List[int] = Field(default_factory=list)   # otros índices del mismo lote
+
+class AppointmentBulkResult(BaseModel):
+    created: List[AppointmentOut] = Field(default_factory=list)
+    conflicts: List[SlotConflict] = Field(default_factory=list)
+
+# ---------- Disponibilidad ----------
+
+class FreeSlot(BaseModel):
+    starts_at: datetime
+    ends_at: datetime
+
+class TherapistAvailability(BaseModel):
+    therapist_id: int
+    slots: List[FreeSlot] = Field(default_factory=list)
+
+# ---------- Series recurrentes ----------
+
+class AppointmentSeriesBase(BaseModel):
+    patient_id: int
+    therapist_id: int | None = None
+    starts_at: datetime                     # primera ocurrencia
+    duration_minutes: int = Field(..., ge=5, le=480)
+    freq: Literal["daily", "weekly"] = "weekly"
+    interval: int = Field(1, ge=1, le=52)
+    until: datetime | None = None
+    notes: str | None = None
+
+class AppointmentSeriesCreate(AppointmentSeriesBase):
+    count: int | None = Field(None, ge=1, le=520, description="Alternativa a `until`")
+
+    @root_validator(skip_on_failure=True)
+    def _count_or_until(cls, values):
+        if values.get("count") and values.get("until"):
+            raise ValueError("Use either count or until, not both")
+        return values
+
+class AppointmentSeriesOut(AppointmentSeriesBase):
+    id: int
+    status: str
+    class Config: orm_mode = True
+
+class SeriesExceptionCreate(BaseModel):
+    original_starts_at: datetime            # ocurrencia que se reemplaza
+    starts_at: datetime | None = None       # nueva hora (reprogramación)
+    ends_at: datetime | None = None
+    status: str | None = None               # "canceled" para cancelar solo esa ocurrencia
+    notes: str | None = None
@@ -1,5 +1,6 @@
 # backend/schemas/assessment.py
-from typing import Any, Dict, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
 # ---------- Templates ----------
@@ -63,6 +64,31 @@ class AssessmentResultUpdate(BaseModel):
 
 class AssessmentResultOut(AssessmentResultBase):
     id: int
+    subscores: Optional[Dict[str, Any]] = None   # {"total": float, "subscales": {...}} si la plantilla puntúa
 
     class Config:
         orm_mode = True
+
+
+# ---------- Búsqueda ----------
+
+class AssessmentResultMatchOut(BaseModel):
+    """Fila de /results/search; responses/subscores solo con include_responses=true."""
+    id: int
+    template_id: int
+    patient_id: int
+    score: Optional[int] = None
+    responses: Optional[Dict[str, Any]] = None
+    subscores: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
+class SearchPlanOut(BaseModel):
+    node_types: List[str]
+    indexes: List[str]
+    seq_scan: bool
+    index_only: bool
+    plan: List[Dict[str, Any]]   # EXPLAIN (FORMAT JSON) completo
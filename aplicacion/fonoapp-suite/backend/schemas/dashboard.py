@@ -0,0 +1,62 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+class AppointmentRatesOut(BaseModel):
+    appointments: int                     # citas ya pasadas de la ventana
+    completed: int
+    canceled: int
+    no_show: int
+    unresolved: int                       # siguen "scheduled" después de su hora
+    completion_rate: Optional[float] = None
+    cancel_rate: Optional[float] = None
+    no_show_rate: Optional[float] = None
+    unresolved_rate: Optional[float] = None
+
+class ClinicTotalsOut(AppointmentRatesOut):
+    patients: int
+    active_plans: int
+    assignments_due: int                  # vencidas dentro de la ventana
+    assignments_done: int
+    assignments_overdue: int              # vencidas sin completar (todas)
+    assignment_completion_rate: Optional[float] = None
+
+class TherapistLoadOut(AppointmentRatesOut):
+    therapist_id: int
+    full_name: Optional[str] = None
+    caseload: int                         # pacientes con citas en la ventana o serie activa
+    active_plans: int
+
+class WeekActivityOut(BaseModel):
+    week: datetime                        # lunes 00:00
+    sessions: int
+    patients: int
+    appointments: int
+    completed: int
+    canceled: int
+    no_show: int
+    assignments_due: int
+    assignments_done: int
+
+class ScoreDistributionOut(BaseModel):
+    template_id: int
+    name: str
+    n: int
+    mean: Optional[float] = None
+    sd: Optional[float] = None
+    min: Optional[int] = None
+    p25: Optional[float] = None
+    median: Optional[float] = None
+    p75: Optional[float] = None
+    max: Optional[int] = None
+    histogram: List[int] = []
+    bucket_edges: List[float] = []        # len(histogram) + 1
+
+class DashboardOut(BaseModel):
+    refreshed_at: Optional[datetime] = None   # None: las vistas aún no se han refrescado
+    stale_seconds: Optional[float] = None
+    window_days: int
+    totals: Optional[ClinicTotalsOut] = None
+    therapists: List[TherapistLoadOut] = []
+    weeks: List[WeekActivityOut] = []
+    scores: List[ScoreDistributionOut] = []
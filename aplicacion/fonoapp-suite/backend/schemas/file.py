@@ -1,7 +1,76 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field, validator
+
+class MediaDerivativeOut(BaseModel):
+    kind: str                             # thumbnail|peaks|audio
+    content_type: str
+    size_bytes: int
+    meta: Optional[dict] = None
+    content_url: Optional[str] = None     # lo rellena MediaFileOut
+
+    class Config: orm_mode = True
 
 class MediaFileOut(BaseModel):
     id: int
     path: str
     kind: str
+    sha256: Optional[str] = None
+    size_bytes: Optional[int] = None
+    original_name: Optional[str] = None
+    content_url: Optional[str] = None     # endpoint autenticado (Range/ETag)
+    derivatives: List[MediaDerivativeOut] = []  # se generan en segundo plano tras la subida
+
+    @validator("content_url", always=True)
+    def _content_url(cls, v, values):
+        return v or (f"/files/{values['id']}/content" if "id" in values else None)
+
+    @validator("derivatives", each_item=True)
+    def _derivative_url(cls, v, values):
+        if "id" in values and v.content_url is None:
+            v.content_url = f"/files/{values['id']}/content?variant={v.kind}"
+        return v
+
+    class Config: orm_mode = True
+
+class MediaUrlOut(BaseModel):
+    url: str                              # firmada: usable en <audio>/<video> sin Authorization
+    expires_at: datetime
+
+# ---------- Subidas reanudables ----------
+
+class UploadSessionCreate(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., gt=0)
+    patient_id: Optional[int] = None
+
+class UploadSessionOut(BaseModel):
+    id: str
+    filename: str
+    size: int
+    offset: int                   # bytes contiguos recibidos desde el inicio
+    received: List[List[int]]     # rangos [inicio, fin) ya persistidos
+    expires_at: datetime
+
+# ---------- Análisis acústico ----------
+
+class AcousticAnalysisSummaryOut(BaseModel):
+    id: int
+    media_file_id: int
+    patient_id: Optional[int] = None
+    analyzer_version: int
+    duration_seconds: float
+    voiced_fraction: Optional[float] = None
+    f0_mean_hz: Optional[float] = None
+    f0_sd_semitones: Optional[float] = None
+    intensity_mean_db: Optional[float] = None    # dBFS, sin calibrar
+    jitter_local: Optional[float] = None
+    shimmer_local: Optional[float] = None
+    speaking_rate: Optional[float] = None        # sílabas/s
+    features: dict
+    updated_at: Optional[datetime] = None
+
     class Config: orm_mode = True
+
+class AcousticAnalysisOut(AcousticAnalysisSummaryOut):
+    contour: Optional[dict] = None               # series cada `hop` s (None = sordo)
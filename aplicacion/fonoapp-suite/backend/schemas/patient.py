@@ -1,5 +1,5 @@
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, constr, validator
 
 
@@ -39,3 +39,22 @@ class PatientOut(PatientBase):
 
     class Config:
         orm_mode = True
+
+
+# ---------- Importación masiva ----------
+
+class PatientImportIssue(BaseModel):
+    line: int                 # línea del archivo (CSV: la del final del registro)
+    status: str               # error|skipped
+    detail: str
+
+
+class PatientImportReport(BaseModel):
+    rows: int
+    created: int
+    updated: int
+    skipped: int
+    failed: int
+    dry_run: bool = False
+    issues: List[PatientImportIssue] = []
+    issues_truncated: bool = False
@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from datetime import datetime
 from typing import Any, List, Dict
 
 class TreatmentPlanBase(BaseModel):
@@ -24,3 +25,51 @@ class SessionLogUpdate(SessionLogBase): pass
 class SessionLogOut(SessionLogBase):
     id: int
     class Config: orm_mode = True
+
+class GoalPointOut(BaseModel):
+    date: datetime
+    value: float
+    rolling: float | None = None  # media móvil de la ventana pedida
+
+class GoalProgressOut(BaseModel):
+    index: int
+    title: str | None = None
+    metric: str | None = None
+    target: float | None = None
+    points: int
+    baseline: float | None = None
+    latest: float | None = None
+    rolling_latest: float | None = None
+    slope_per_week: float | None = None
+    trend: str | None = None              # up | down | flat
+    on_track: bool | None = None          # la tendencia va hacia la meta
+    percent_to_target: float | None = None
+    achieved_at: datetime | None = None
+    projected_date: datetime | None = None
+    series: List[GoalPointOut] = []
+
+class PlanProgressOut(BaseModel):
+    plan_id: int
+    sessions: int
+    first_date: datetime | None = None
+    last_date: datetime | None = None
+    window: int
+    goals: List[GoalProgressOut] = []
+
+class GoalSummaryOut(BaseModel):
+    index: int
+    title: str | None = None
+    metric: str | None = None
+    target: Any = None
+    count: int
+    mean: float
+    sd: float | None = None
+    min: float
+    max: float
+    last: float
+    first_date: datetime
+    last_date: datetime
+
+class PlanSummaryOut(BaseModel):
+    plan_id: int
+    goals: List[GoalSummaryOut] = []
@@ -0,0 +1,44 @@
+import wave
+
+import numpy as np
+
+from backend.core import acoustics
+
+
+def _write_wav(path, x, rate, channels=1):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.repeat((x * 32767).astype("<i2"), channels).tobytes())
+
+
+def test_pitch_and_syllable_rate(tmp_path, monkeypatch):
+    monkeypatch.setattr(acoustics, "BLOCK_SECONDS", 1.0)  # varios bloques de memmap
+    rate = 16000
+    t = np.arange(rate * 6) / rate
+    phase = 2 * np.pi * 220 * t
+    voice = 0.3 * sum(np.sin(k * phase) / k for k in range(1, 8))
+    x = voice * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)) ** 2   # 4 sílabas/s
+    x[:rate] = 0                                               # 1 s de silencio
+    src = tmp_path / "rec.wav"
+    _write_wav(src, x, rate, channels=2)
+
+    result = acoustics.analyze_wav(src)
+    f = result["features"]
+
+    assert f["duration"] == 6.0 and f["sample_rate"] == rate
+    assert abs(f["f0_median"] - 220) < 1
+    assert f["jitter_local"] < 0.005
+    assert 0.5 < f["voiced_fraction"] < 0.85
+    assert f["syllables"] == 20 and f["articulation_rate"] > f["speaking_rate"]
+    assert result["contour"]["f0"][0] is None and abs(result["contour"]["f0"][-1] - 220) < 1
+
+
+def test_silence_has_no_voice(tmp_path):
+    src = tmp_path / "silence.wav"
+    _write_wav(src, np.zeros(8000), 8000)
+
+    f = acoustics.analyze_wav(src)["features"]
+
+    assert f["voiced_fraction"] == 0.0 and f["f0_mean"] is None and f["syllables"] == 0
@@ -0,0 +1,115 @@
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+
+from backend.models.appointment import AppointmentSeries
+from backend.routers import appointments
+
+
+def _at(h, m=0):
+    return datetime(2026, 3, 2, h, m)
+
+
+def _conflicts(monkeypatch, slots, existing=(), virtual=()):
+    # Sin BD: la consulta contra citas existentes devuelve `existing` (idx, id)
+    monkeypatch.setattr(appointments, "_virtual_occurrences", lambda *a, **k: list(virtual))
+    db = SimpleNamespace(execute=lambda stmt: list(existing))
+    found = appointments._find_conflicts(db, slots)
+    return {i: c.dict() for i, c in found.items()}
+
+
+def test_find_conflicts_sweep_detects_in_batch_overlaps(monkeypatch):
+    found = _conflicts(monkeypatch, [
+        (1, _at(9), _at(10), "scheduled"),
+        (1, _at(9, 30), _at(11), "scheduled"),
+        (1, _at(10, 30), _at(10, 45), "scheduled"),
+        (2, _at(9), _at(10), "scheduled"),        # otro terapeuta
+        (1, _at(9), _at(12), "canceled"),         # canceladas no ocupan
+        (None, _at(9), _at(12), "scheduled"),     # sin terapeuta: no se valida
+    ])
+
+    assert set(found) == {0, 1, 2}
+    assert found[0]["overlaps_batch"] == [1]
+    assert found[1]["overlaps_batch"] == [0, 2]
+    assert found[2]["overlaps_batch"] == [1]
+
+
+def test_find_conflicts_touching_edges_do_not_overlap(monkeypatch):
+    # Rangos [inicio, fin): una cita que empieza cuando termina otra es válida
+    series = SimpleNamespace(id=7, therapist_id=1, duration=_at(11) - _at(10))
+    found = _conflicts(
+        monkeypatch,
+        [(1, _at(9), _at(10), "scheduled"), (1, _at(11), _at(12), "scheduled")],
+        virtual=[(series, _at(10))],
+    )
+    assert found == {}
+
+
+def test_find_conflicts_reports_existing_and_series(monkeypatch):
+    series = SimpleNamespace(id=7, therapist_id=1, duration=_at(10) - _at(9))
+    found = _conflicts(
+        monkeypatch,
+        [(1, _at(9, 30), _at(10, 30), "scheduled"), (1, _at(12), _at(13), "scheduled")],
+        existing=[(1, 42)],
+        virtual=[(series, _at(9)), (series, _at(10))],
+    )
+
+    assert found[0]["conflicts_with_series"] == [7]
+    assert found[0]["conflicts_with"] == []
+    assert found[1]["conflicts_with"] == [42]
+    assert found[1]["conflicts_with_series"] == []
+
+
+def test_free_slots_partial_overlaps_and_day_edges():
+    d1, d2 = date(2026, 3, 2), date(2026, 3, 3)
+    busy = [
+        (datetime(2026, 3, 2, 8), datetime(2026, 3, 2, 9, 10)),      # cruza el inicio de jornada
+        (datetime(2026, 3, 2, 9, 50), datetime(2026, 3, 2, 10, 40)),
+        (datetime(2026, 3, 2, 10, 20), datetime(2026, 3, 2, 10, 30)),  # contenida en la anterior
+        (datetime(2026, 3, 2, 11, 30), datetime(2026, 3, 2, 13)),     # cruza el fin de jornada
+        (datetime(2026, 3, 2, 18), datetime(2026, 3, 2, 19)),         # fuera del horario
+        (datetime(2026, 3, 3, 9), datetime(2026, 3, 3, 9, 30)),       # toca el inicio exacto
+    ]
+    half = timedelta(minutes=30)
+    free = appointments._free_slots(busy, [d1, d2], time(9), time(12), half, half)
+
+    # 9:10-9:50 no alcanza una franja alineada; 10:40-11:30 deja solo 11:00
+    day1 = [(s.time(), e.time()) for s, e in free if s.date() == d1]
+    assert day1 == [(time(11), time(11, 30))]
+    day2 = [s.time() for s, e in free if s.date() == d2]
+    assert day2 == [time(9, 30), time(10), time(10, 30), time(11), time(11, 30)]
+    assert all(e - s == half for s, e in free)
+
+
+def _mar(d, h=10, m=0):
+    return datetime(2026, 3, d, h, m)
+
+
+def _weekly(**kw):
+    return AppointmentSeries(
+        id=3, therapist_id=1, patient_id=1, starts_at=datetime(2026, 3, 2, 10),
+        duration_minutes=45, freq="weekly", interval=1, **kw,
+    )
+
+
+def test_series_occurrences_window_and_until_boundary():
+    s = _weekly(until=datetime(2026, 3, 23, 10))
+
+    # La del 9 sigue en curso a las 10:30; `until` es inclusivo
+    assert list(s.occurrences(_mar(9, 10, 30), _mar(30, 23))) == [_mar(9), _mar(16), _mar(23)]
+    # Rangos [inicio, fin): la que termina justo al abrir la ventana no cuenta
+    assert list(s.occurrences(_mar(9, 10, 45), _mar(16, 10))) == []
+    assert list(s.occurrences(datetime(2026, 2, 1), _mar(3))) == [_mar(2)]
+
+    assert s.is_occurrence(_mar(23))
+    assert not s.is_occurrence(_mar(30))            # pasada la última
+    assert not s.is_occurrence(datetime(2026, 2, 23, 10))  # antes de la primera
+    assert not s.is_occurrence(_mar(9, 10, 1))      # fuera de la grilla
+
+
+def test_series_expansion_skips_exceptions():
+    s = _weekly()
+    window = (datetime(2026, 3, 1), datetime(2026, 3, 24))
+    exceptions = [(3, datetime(2026, 3, 16, 10)), (99, datetime(2026, 3, 9, 10))]
+
+    starts = [start for _, start in appointments._expand([s], exceptions, *window)]
+    assert starts == [datetime(2026, 3, 2, 10), datetime(2026, 3, 9, 10), datetime(2026, 3, 23, 10)]
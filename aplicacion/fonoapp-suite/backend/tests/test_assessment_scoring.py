@@ -0,0 +1,63 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from backend.core.assessment_scoring import (
+    CompiledTemplate, ResponseError, TemplateCache, TemplateError, compile_schema,
+)
+
+SCHEMA = {
+    "items": [
+        {"id": "q1", "type": "scale", "min": 0, "max": 4, "subscale": "fluidez"},
+        {"id": "q2", "type": "scale", "min": 0, "max": 4, "reverse": True, "weight": 2, "subscale": "fluidez"},
+        {"id": "q3", "type": "choice", "options": [{"value": "nunca", "score": 0}, {"value": "siempre", "score": 3}]},
+        {"id": "q4", "type": "boolean", "subscale": "habla"},
+        {"id": "q5", "type": "scale", "min": 1, "max": 5, "required": False, "subscale": "habla"},
+        {"id": "obs", "type": "text", "required": False},
+    ],
+    "subscales": {"habla": {"method": "mean"}},
+}
+
+
+def test_weighted_reverse_and_subscale_scores():
+    t = compile_schema(SCHEMA)
+    score, sub = t.score({"q1": 3, "q2": 1, "q3": "siempre", "q4": True, "obs": "cansado"})
+    # q1=3 + q2 invertido (4-1)*2=6 + q3=3 + q4=1 (q5 sin responder)
+    assert score == 13 and sub["total"] == 13
+    assert sub["subscales"] == {"fluidez": 9, "habla": 1}  # habla: media de lo respondido
+
+    score, sub = t.score({"q1": 0, "q2": 4, "q3": "nunca", "q4": False, "q5": 4})
+    assert score == 4 and sub["subscales"]["habla"] == 2
+
+
+def test_responses_are_validated():
+    t = compile_schema(SCHEMA)
+    with pytest.raises(ResponseError) as exc:
+        t.score({"q1": 9, "q2": "dos", "q3": "a veces", "q4": 1, "extra": 1})
+    assert {e["item"]: e["msg"] for e in exc.value.errors} == {
+        "extra": "unknown item", "q1": "must be between 0 and 4", "q2": "must be a number",
+        "q3": "not one of the options", "q4": "must be true or false",
+    }
+    for bad in (["siempre"], {"value": "siempre"}):  # no hashables: 422, no TypeError
+        with pytest.raises(ResponseError) as exc:
+            t.score({"q1": 1, "q2": 1, "q3": bad, "q4": True})
+        assert exc.value.errors == [{"item": "q3", "msg": "not one of the options"}]
+
+
+def test_invalid_templates_and_legacy_schemas():
+    assert compile_schema({"preguntas": ["libre"]}).scorable is False
+    with pytest.raises(TemplateError):
+        compile_schema({"items": [{"id": "q1", "reverse": True}]})
+    with pytest.raises(TemplateError):
+        compile_schema({"items": [{"id": "q1"}, {"id": "q1"}]})
+
+
+def test_cache_recompiles_when_template_changes():
+    cache = TemplateCache(max_entries=4)
+    template = SimpleNamespace(id=1, schema_updated_at=datetime(2026, 1, 1), schema_=SCHEMA)
+    first = cache.get(template)
+    assert cache.get(template) is first
+    template.schema_updated_at = datetime(2026, 1, 2)
+    assert cache.get(template) is not first
+    assert isinstance(first, CompiledTemplate)
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from backend.core.assessment_scoring import compile_schema
+from backend.core.assessment_search import (
+    Explain, ItemFilter, item_condition, item_domain, parse_filter, summarize_plan,
+)
+from backend.models.assessment import AssessmentResult
+
+T = compile_schema({"items": [
+    {"id": "q7", "type": "scale", "min": 0, "max": 4, "step": 1},
+    {"id": "q8", "type": "scale", "min": 0, "max": 100},
+    {"id": "q9", "type": "choice", "options": ["nunca", "a veces", "siempre"]},
+]})
+
+
+def _sql(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect()))
+
+
+def _params(clause) -> list:
+    return list(clause.compile(dialect=postgresql.dialect()).params.values())
+
+
+def test_parse_filter():
+    assert parse_filter("q7:gte:3") == ItemFilter("q7", "gte", 3)
+    assert parse_filter("q9:eq:a veces") == ItemFilter("q9", "eq", "a veces")
+    assert parse_filter("q4:eq:true") == ItemFilter("q4", "eq", True)
+    assert parse_filter("q7:exists") == ItemFilter("q7", "exists")
+    for bad in ("q7", "q7:like:3", "q7:gte:", "q9:lt:siempre"):
+        with pytest.raises(ValueError):
+            parse_filter(bad)
+
+
+def test_range_on_known_domain_becomes_containments():
+    assert item_domain(T.by_id["q7"]) == [0, 1, 2, 3, 4]
+    cond = item_condition(parse_filter("q7:gte:3"), T.by_id["q7"])
+    assert _sql(cond).count("@>") == 2 and _params(cond) == [{"q7": 3}, {"q7": 4}]
+    assert _sql(item_condition(parse_filter("q7:gt:4"), T.by_id["q7"])) == "false"
+
+    # Sin step no hay dominio enumerable: comparación numérica sobre el valor
+    sql = _sql(item_condition(parse_filter("q8:lt:50"), T.by_id["q8"]))
+    assert "@>" not in sql and "jsonb_typeof" in sql
+
+
+def test_explain_and_plan_summary():
+    stmt = select(AssessmentResult.id).where(AssessmentResult.template_id == 1)
+    assert _sql(Explain(stmt)).startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert _sql(Explain(stmt, analyze=True)).startswith("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)")
+
+    index_only = [{"Plan": {"Node Type": "Limit", "Plans": [{
+        "Node Type": "Index Only Scan", "Relation Name": "assessment_results",
+        "Index Name": "ix_assessment_results_template_cover"}]}}]
+    out = summarize_plan(index_only)
+    assert out["index_only"] and not out["seq_scan"]
+    assert out["indexes"] == ["ix_assessment_results_template_cover"]
+
+    bitmap = '[{"Plan": {"Node Type": "Bitmap Heap Scan", "Relation Name": "assessment_results", "Plans": [' \
+             '{"Node Type": "Bitmap Index Scan", "Index Name": "ix_assessment_results_responses"}]}}]'
+    out = summarize_plan(bitmap)
+    assert out["node_types"] == ["Bitmap Heap Scan", "Bitmap Index Scan"]
+    assert not out["index_only"] and not out["seq_scan"]
@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from backend.core import dashboard
+
+
+def test_every_view_has_a_unique_index_for_concurrent_refresh():
+    stmts = dashboard.create_view_statements()
+    for name in dashboard.VIEWS:
+        assert f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{name} ON {name}" in "\n".join(stmts)
+
+
+def test_rates_and_histogram_edges():
+    row = SimpleNamespace(appointments=50, completed=40, canceled=5, no_show=3, unresolved=2)
+    assert dashboard.appointment_rates(row) == {
+        "completion_rate": 0.8, "cancel_rate": 0.1, "no_show_rate": 0.06, "unresolved_rate": 0.04,
+    }
+    assert dashboard.rate(0, 0) is None
+    edges = dashboard.score_edges(0, 99)
+    assert len(edges) == dashboard.SCORE_BUCKETS + 1 and edges[0] == 0 and edges[-1] == 100
+
+
+def test_staleness_and_refresh_outside_postgres():
+    refreshed = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+    assert dashboard.staleness(refreshed, datetime(2026, 3, 1, 12, 5, tzinfo=timezone.utc)) == 300
+    assert dashboard.staleness(None, refreshed) is None
+    with Session(create_engine("sqlite://")) as db:
+        assert dashboard.refresh_views(db) is False
@@ -0,0 +1,39 @@
+import struct
+import wave
+
+from PIL import Image
+
+from backend.core import derivatives
+
+
+def test_wav_peaks_without_ffmpeg(tmp_path):
+    src = tmp_path / "abc.wav"
+    rate = 8000
+    with wave.open(str(src), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        # 2 s: primer segundo en silencio, segundo con amplitud máxima alternada
+        wav.writeframes(b"\0\0" * rate + struct.pack("<hh", 32767, -32767) * (rate // 2))
+
+    made = derivatives.build_derivatives(str(src), "abc", ".wav", points_per_second=10,
+                                         ffmpeg_bin="no-such-ffmpeg")
+
+    assert [m["kind"] for m in made] == ["peaks"]
+    payload = (tmp_path / "abc.peaks").read_bytes()
+    magic, version, bits, _, sr, spp, n = derivatives.PEAKS_HEADER.unpack_from(payload)
+    assert (magic, version, bits, sr, spp, n) == (b"PEAK", 1, 8, rate, 800, 20)
+    pairs = payload[derivatives.PEAKS_HEADER.size:]
+    assert pairs[:2] == b"\0\0" and struct.unpack("<bb", pairs[-2:]) == (-127, 127)
+    assert made[0]["meta"]["duration"] == 2.0
+
+
+def test_image_thumbnail(tmp_path):
+    src = tmp_path / "def.png"
+    Image.new("RGB", (1280, 640), "red").save(src)
+
+    made = derivatives.build_derivatives(str(src), "def", ".png", thumb_size=320)
+
+    assert made[0]["kind"] == "thumbnail" and made[0]["meta"] == {"width": 320, "height": 160}
+    with Image.open(tmp_path / "def.thumb.webp") as thumb:
+        assert thumb.size == (320, 160)
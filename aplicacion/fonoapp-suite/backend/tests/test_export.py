@@ -0,0 +1,27 @@
+import io
+import json
+import zipfile
+from types import SimpleNamespace
+
+from backend.core import export
+
+
+def test_zip_stream_contains_record_and_media(tmp_path):
+    audio = tmp_path / "sesion.wav"
+    audio.write_bytes(b"RIFF" + bytes(range(256)) * 5000)
+    records = [
+        ("assignment", SimpleNamespace(id=i, patient_id=3, title=f"Tarea {i}", description=None,
+                                       due_at=None, status="pending", completed_at=None))
+        for i in range(1, 4)
+    ]
+
+    chunks = list(export.zip_stream(export.ndjson_lines(3, records), [("media/1_sesion.wav", audio)]))
+
+    assert len(chunks) > 1  # se emite mientras se genera
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.testzip() is None
+        lines = [json.loads(line) for line in zf.read("record.ndjson").splitlines()]
+        assert zf.read("media/1_sesion.wav") == audio.read_bytes()
+    assert [line["type"] for line in lines] == ["export", "assignment", "assignment", "assignment", "end"]
+    assert lines[1]["data"]["title"] == "Tarea 1"
+    assert lines[-1]["data"]["counts"] == {"assignment": 3}
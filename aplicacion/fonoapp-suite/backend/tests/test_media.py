@@ -0,0 +1,23 @@
+import pytest
+
+from backend.core.media import _etag_matches, make_etag, parse_range
+
+
+def test_parse_range_forms():
+    assert parse_range("bytes=0-99", 1000) == (0, 100)
+    assert parse_range("bytes=900-", 1000) == (900, 1000)
+    assert parse_range("bytes=-100", 1000) == (900, 1000)
+    assert parse_range("bytes=990-5000", 1000) == (990, 1000)
+    assert parse_range("bytes=0-1,5-9", 1000) is None  # varios rangos: completo
+    assert parse_range(None, 1000) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=1000-", 1000)
+
+
+def test_etags():
+    strong = make_etag("ab" * 32, 10, 0)
+    assert _etag_matches(f'"x", {strong}', strong, weak=False)
+    weak = make_etag(None, 10, 1700000000)
+    assert weak.startswith('W/"')
+    assert _etag_matches(weak, weak, weak=True)
+    assert not _etag_matches(weak, weak, weak=False)  # If-Range exige ETag fuerte
@@ -0,0 +1,50 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Response
+
+from backend.core.pagination import (
+    NEXT_CURSOR_HEADER, PageParams, decode_cursor, encode_cursor, finish_page,
+)
+from backend.models.appointment import Appointment
+
+KEYS = [Appointment.starts_at, Appointment.id]
+
+
+def test_cursor_round_trip_restores_column_types():
+    values = [datetime(2026, 3, 2, 9, 30), 42]
+    cursor = encode_cursor(values)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, KEYS) == values
+
+
+@pytest.mark.parametrize("cursor", [
+    "no-es-base64!",
+    encode_cursor([1]),                    # faltan claves
+    encode_cursor(["ayer", 1]),            # fecha inválida
+    encode_cursor([None, "x"]),            # id no numérico
+    "eyJhIjoxfQ",                          # {"a":1}: no es lista
+])
+def test_malformed_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, KEYS)
+    assert exc.value.status_code == 400
+
+
+def _rows(n):
+    return [SimpleNamespace(starts_at=datetime(2026, 3, 2, 9 + i), id=i + 1) for i in range(n)]
+
+
+def test_finish_page_sets_next_cursor_only_when_more_rows():
+    page = PageParams(cursor=None, limit=2)
+
+    response = Response()
+    assert [r.id for r in finish_page(_rows(3), KEYS, page, response)] == [1, 2]
+    assert decode_cursor(response.headers[NEXT_CURSOR_HEADER], KEYS) == [datetime(2026, 3, 2, 10), 2]
+
+    for n in (2, 1, 0):
+        response = Response()
+        assert len(finish_page(_rows(n), KEYS, page, response)) == n
+        assert NEXT_CURSOR_HEADER not in response.headers
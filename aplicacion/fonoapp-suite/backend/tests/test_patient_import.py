@@ -0,0 +1,42 @@
+import io
+
+from backend.core import patient_import
+
+CSV = """Nombre,Apellidos,Cédula,Fecha_Nacimiento,Diagnóstico
+Ana,Muñoz,1.020.304,2018-05-01,TEL
+Luis,Pérez,,2017-02-03,
+Eva,Gómez,1020304,2019-01-01,Dislalia
+,Sin Nombre,999,,
+Raúl,Díaz,555-1,no sabe,
+Inés,Núñez,5551,2016-07-07,
+"""
+
+
+def test_csv_rows_are_validated_deduped_and_batched(monkeypatch):
+    batches = []
+
+    def fake_flush(db, batch, on_duplicate, dry_run, report):
+        batches.append([(line, row["cedula_norm"]) for line, row in batch])
+        report.created += len(batch)
+
+    monkeypatch.setattr(patient_import, "_flush", fake_flush)
+
+    report = patient_import.import_patients(None, io.StringIO(CSV), "csv", batch_size=2)
+
+    # Dos lotes: la consulta de duplicados y el INSERT son por lote, no por fila
+    assert batches == [[(2, "1020304"), (3, None)], [(7, "5551")]]
+    assert (report.rows, report.created, report.skipped, report.failed) == (6, 3, 1, 2)
+    issues = {i["line"]: i for i in report.issues}
+    assert issues[4]["status"] == "skipped" and "línea 2" in issues[4]["detail"]
+    assert issues[5]["detail"].startswith("first_name")
+    assert issues[6]["detail"].startswith("birth_date")
+
+
+def test_ndjson_reports_bad_lines(monkeypatch):
+    monkeypatch.setattr(patient_import, "_flush", lambda db, batch, *a: None)
+    data = '{"first_name": "Ana", "last_name": "Muñoz"}\n\n{"first_name": \n[1, 2]\n'
+
+    report = patient_import.import_patients(None, io.StringIO(data), "ndjson")
+
+    assert report.rows == 3 and report.failed == 2
+    assert [i["line"] for i in report.issues] == [3, 4]
@@ -0,0 +1,31 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from backend.models.patient import Patient
+from backend.routers.patients import _search_patients, fold_text
+
+
+def _sql(q: str):
+    stmt, rank = _search_patients(select(Patient.id), q)
+    compiled = stmt.compile(dialect=postgresql.dialect())
+    return str(compiled), compiled.params
+
+
+def test_fold_text_strips_accents_and_case():
+    assert fold_text("  Muñoz ÁLVAREZ ") == "munoz alvarez"
+    assert fold_text("José Ñúñez") == "jose nunez"
+    assert fold_text("plain") == "plain"
+
+
+def test_name_only_query_skips_cedula_branch():
+    sql, params = _sql("Muñoz")
+
+    assert "cedula_norm" not in sql
+    assert "munoz" in params.values()
+
+
+def test_query_with_digits_adds_cedula_prefix():
+    sql, params = _sql("1-7234 ")
+
+    assert "patients.cedula_norm LIKE" in sql
+    assert "17234" in params.values()  # normalizada: sin guiones ni espacios
@@ -0,0 +1,43 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from backend.core import plan_rollups
+from backend.core.progress import build_matrix
+
+ROWS = [
+    (datetime(2026, 1, 5), {"0": 40, "1": 10}),
+    (datetime(2026, 1, 12), {"0": 50}),
+    (datetime(2026, 1, 19), {"0": 45, "1": 7, "nota": 3}),
+]
+
+
+def test_rollup_rows_match_full_aggregation():
+    dates, values = build_matrix(ROWS, 0)
+    rows = {r["goal_index"]: r for r in plan_rollups.rollup_rows(7, dates, values)}
+
+    assert set(rows) == {0, 1}
+    r = rows[0]
+    assert (r["n"], r["total"], r["total_sq"]) == (3, 135, 40 ** 2 + 50 ** 2 + 45 ** 2)
+    assert (r["min_value"], r["max_value"], r["last_value"]) == (40, 50, 45)
+    assert (r["first_date"], r["last_date"]) == (datetime(2026, 1, 5), datetime(2026, 1, 19))
+    assert rows[1]["n"] == 2 and rows[1]["first_date"] == datetime(2026, 1, 5)
+
+    s = plan_rollups.summarize(SimpleNamespace(**{k: r[k] for k in r if k not in ("plan_id", "goal_index")}))
+    assert s["mean"] == 45 and s["sd"] == pytest.approx(5.0)
+
+
+def test_apply_log_is_one_upsert_per_log():
+    captured = []
+    db = SimpleNamespace(execute=captured.append)
+
+    plan_rollups.apply_log(db, 7, {"1": 7, "0": 45, "nota": "x"}, datetime(2026, 1, 19))
+    plan_rollups.apply_log(db, 7, {"nota": "x"})  # nada que agregar: sin consulta
+
+    assert len(captured) == 1
+    sql = str(captured[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (plan_id, goal_index) DO UPDATE" in sql
+    assert "plan_goal_rollups.n + excluded.n" in sql
+    assert "greatest(plan_goal_rollups.max_value, excluded.max_value)" in sql
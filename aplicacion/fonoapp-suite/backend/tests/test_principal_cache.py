@@ -0,0 +1,96 @@
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+
+from backend.core import principal_cache as pc
+from backend.core.database import Base
+from backend.models.user import User
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _user(email):
+    return User(full_name=email, email=email, role="therapist", hashed_password="x")
+
+
+def test_entries_expire_after_ttl_or_token_exp(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(pc.time, "monotonic", clock)
+    cache = pc.PrincipalCache(ttl_seconds=30, max_entries=10)
+    u = _user("a@x")
+
+    cache.put("t1", {"sub": "a@x"}, u)
+    cache.put("t2", {"sub": "a@x", "exp": pc.time.time() + 5}, u)  # exp antes que el TTL
+    cache.put("t3", {"sub": "a@x", "exp": pc.time.time() - 1}, u)  # ya vencido: no se guarda
+    assert cache.get("t1") is u and cache.get("t2") is u and cache.get("t3") is None
+
+    clock.now += 6
+    assert cache.get("t1") is u and cache.get("t2") is None
+    clock.now += 25
+    assert cache.get("t1") is None
+
+
+def test_lru_evicts_least_recently_used():
+    cache = pc.PrincipalCache(ttl_seconds=30, max_entries=2)
+    cache.put("t1", {"sub": "a@x"}, _user("a@x"))
+    cache.put("t2", {"sub": "b@x"}, _user("b@x"))
+    assert cache.get("t1") is not None  # t1 pasa a ser el más reciente
+
+    cache.put("t3", {"sub": "c@x"}, _user("c@x"))
+    assert cache.get("t2") is None
+    assert cache.get("t1") is not None and cache.get("t3") is not None
+
+    cache.invalidate_subject("a@x")
+    assert cache.get("t1") is None and cache.get("t3") is not None
+
+
+@pytest.fixture
+def db_session(monkeypatch):
+    monkeypatch.setattr(pc, "principal_cache", pc.PrincipalCache(ttl_seconds=30, max_entries=10))
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__])
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all([_user("a@x"), _user("b@x")])
+        db.commit()
+    yield Session
+    engine.dispose()
+
+
+def _cache_both(Session):
+    with Session() as db:
+        for u in db.execute(select(User)).scalars():
+            db.expunge(u)
+            pc.principal_cache.put(u.email, {"sub": u.email}, u)
+
+
+def test_committed_user_update_invalidates_that_subject(db_session):
+    _cache_both(db_session)
+    with db_session() as db:
+        db.execute(select(User).where(User.email == "a@x")).scalar_one().role = "admin"
+        db.flush()
+        assert pc.principal_cache.get("a@x") is not None  # aún sin commit
+        db.commit()
+
+    assert pc.principal_cache.get("a@x") is None
+    assert pc.principal_cache.get("b@x") is not None
+
+
+def test_bulk_update_clears_cache_only_on_commit(db_session):
+    _cache_both(db_session)
+    with db_session() as db:
+        db.execute(update(User).where(User.email == "a@x").values(role="admin"))
+        db.rollback()
+    assert pc.principal_cache.get("a@x") is not None
+
+    with db_session() as db:
+        db.execute(update(User).where(User.email == "a@x").values(role="admin"))
+        db.commit()
+    assert pc.principal_cache.get("a@x") is None
+    assert pc.principal_cache.get("b@x") is None  # update(User): se vacía todo
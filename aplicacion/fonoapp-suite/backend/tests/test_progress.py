@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+from backend.core.progress import ProgressCache, build_matrix, compute_progress
+
+GOALS = [
+    {"title": "Fonema /r/", "metric": "% aciertos", "target": 80},
+    {"title": "Disfluencias", "metric": "por minuto", "target": 2},
+]
+
+
+def _rows():
+    start = datetime(2026, 1, 5)
+    rows = []
+    for week in range(6):
+        # meta 0 sube 5 puntos por semana desde 40; meta 1 baja 1 por semana, medida en semanas pares
+        progress = {"0": 40 + 5 * week}
+        if week % 2 == 0:
+            progress["1"] = 10 - week
+        rows.append((start + timedelta(weeks=week), progress))
+    rows.append((start + timedelta(weeks=6), {"3": 1.5}))  # índice fuera de `goals`
+    return rows
+
+
+def test_progress_is_computed_per_goal():
+    dates, values = build_matrix(_rows(), len(GOALS))
+    assert values.shape == (7, 4)
+
+    out = compute_progress(GOALS, dates, values, window=2)
+    r, disf, empty, extra = out["goals"]
+    assert out["sessions"] == 7
+
+    assert r["points"] == 6 and r["baseline"] == 40 and r["latest"] == 65
+    assert r["slope_per_week"] == 5 and r["trend"] == "up" and r["on_track"] is True
+    assert r["rolling_latest"] == 62.5
+    assert r["percent_to_target"] == 56.2  # (62.5 - 40) / (80 - 40)
+    assert r["achieved_at"] is None
+    assert r["projected_date"] == datetime(2026, 1, 5) + timedelta(weeks=8)  # 40 + 5 * 8 = 80
+
+    # Meta descendente: la mejora es que el valor baje
+    assert disf["series"][-1]["value"] == 6 and disf["trend"] == "down" and disf["on_track"] is True
+    assert disf["series"][1]["rolling"] == 9  # la ventana cuenta mediciones, no sesiones
+
+    assert empty["points"] == 0 and empty["trend"] is None and empty["projected_date"] is None
+    assert extra["title"] is None and extra["points"] == 1
+
+
+def test_achieved_goal_has_no_projection():
+    dates, values = build_matrix([(datetime(2026, 1, 1), {"0": 70}), (datetime(2026, 1, 8), {"0": 85})], 1)
+    goal = compute_progress(GOALS[:1], dates, values, window=4)["goals"][0]
+    assert goal["achieved_at"] == datetime(2026, 1, 8) and goal["projected_date"] is None
+
+
+def test_near_flat_trend_has_no_projection():
+    for step in (1e-7, 1e-12, 0.4):  # 0.4/semana no es "flat", pero el cruce queda a ~3.4 años
+        rows = [(datetime(2026, 1, 1) + timedelta(weeks=w), {"0": 10 + step * w}) for w in range(3)]
+        dates, values = build_matrix(rows, 1)
+        goal = compute_progress(GOALS[:1], dates, values, window=4)["goals"][0]
+        assert goal["on_track"] is True and goal["projected_date"] is None
+
+
+def test_cache_checks_fingerprint_and_invalidates_by_plan():
+    cache = ProgressCache(max_entries=2)
+    cache.put(1, 4, (3, 10), "a")
+    assert cache.get(1, 4, (3, 10)) == "a"
+    assert cache.get(1, 4, (4, 11)) is None  # llegó un log nuevo
+    cache.put(1, 2, (3, 10), "b")
+    cache.invalidate(1)
+    assert cache.get(1, 2, (3, 10)) is None
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from backend.core.pubsub import InProcessBroker, RedisBroker
+
+
+async def _roundtrip(broker):
+    received = []
+    done = asyncio.Event()
+
+    async def handler(room, payload):
+        received.append((room, payload))
+        done.set()
+
+    broker.bind(handler)
+    await broker.subscribe("sala-1")
+    await broker.publish("otra-sala", "ignorado")
+    await broker.publish("sala-1", "hola")
+    await asyncio.wait_for(done.wait(), timeout=5)
+    await broker.unsubscribe("sala-1")
+    await broker.close()
+    return received
+
+
+def test_in_process_broker_delivers_only_subscribed_rooms():
+    assert asyncio.run(_roundtrip(InProcessBroker())) == [("sala-1", "hola")]
+
+
+def test_redis_broker_with_fakeredis():
+    fakeredis = pytest.importorskip("fakeredis")
+    broker = RedisBroker(fakeredis.aioredis.FakeRedis(decode_responses=True))
+    assert asyncio.run(_roundtrip(broker)) == [("sala-1", "hola")]
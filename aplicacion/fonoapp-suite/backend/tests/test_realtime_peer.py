@@ -0,0 +1,69 @@
+import asyncio
+
+from backend.core.realtime import JsonBatchCodec, Peer, RoomMetrics, negotiate_codec
+
+
+class StuckSocket:
+    """WebSocket cuyo send no termina hasta que se libera `gate`."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.sent = []
+        self.closed_with = None
+
+    async def send_text(self, message):
+        await self.gate.wait()
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+async def _flood(policy):
+    ws, metrics, closed = StuckSocket(), RoomMetrics(), []
+    peer = Peer(ws, "sala", metrics, queue_size=2, policy=policy, send_timeout=5, on_close=closed.append)
+    await asyncio.sleep(0)
+    for i in range(5):
+        peer.send(str(i))
+        await asyncio.sleep(0)
+    ws.gate.set()
+    await asyncio.sleep(0.01)
+    peer.close()
+    return ws, metrics, closed
+
+
+def test_drop_oldest_keeps_latest_messages():
+    ws, metrics, _ = asyncio.run(_flood("drop_oldest"))
+    # "0" ya estaba en vuelo; de los encolados sobreviven los dos más recientes
+    assert ws.sent == ["0", "3", "4"]
+    assert metrics.dropped == 2
+
+
+def test_disconnect_policy_closes_slow_peer():
+    ws, metrics, closed = asyncio.run(_flood("disconnect"))
+    assert metrics.slow_disconnects == 1
+    assert ws.closed_with == 1013
+    assert len(closed) == 1
+
+
+async def _burst():
+    ws, metrics = StuckSocket(), RoomMetrics()
+    ws.gate.set()
+    peer = Peer(ws, "sala", metrics, queue_size=16, policy="drop_oldest", send_timeout=5,
+                codec=JsonBatchCodec(), batch_window=0.02)
+    for i in range(3):
+        peer.send({"type": "candidate", "n": i})
+    await asyncio.sleep(0.05)
+    peer.close()
+    return ws, metrics
+
+
+def test_batch_codec_coalesces_burst_into_one_frame():
+    ws, metrics = asyncio.run(_burst())
+    assert ws.sent == ['[{"type":"candidate","n":0},{"type":"candidate","n":1},{"type":"candidate","n":2}]']
+    assert (metrics.sent, metrics.frames) == (3, 1)
+
+
+def test_negotiation_falls_back_to_text():
+    assert negotiate_codec(["otro", "fonoapp.json"]).subprotocol == "fonoapp.json"
+    assert negotiate_codec([]).subprotocol is None
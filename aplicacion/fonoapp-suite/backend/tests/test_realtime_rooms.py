@@ -0,0 +1,41 @@
+import time
+
+from backend.core.realtime import RoomRegistry
+
+
+def _registry(**kw):
+    opts = dict(history_messages=3, room_bytes=100, total_bytes=1000)
+    opts.update(kw)
+    return RoomRegistry(**opts)
+
+
+def test_history_is_a_ring_buffer():
+    reg = _registry()
+    reg.create("chat:a", keep_history=True)
+    for i in range(5):
+        reg.record("chat:a", f"m{i}")
+    assert [m for m, _ in reg.get("chat:a").history] == ["m2", "m3", "m4"]
+    assert reg.used_bytes == 6
+
+
+def test_global_budget_evicts_least_active_room_first():
+    reg = _registry(history_messages=10, total_bytes=15)
+    reg.create("chat:vieja", keep_history=True)
+    reg.create("chat:nueva", keep_history=True)
+    reg.record("chat:vieja", "x" * 10)
+    reg.touch("chat:nueva")
+    reg.record("chat:nueva", "y" * 10)
+    assert not reg.get("chat:vieja").history
+    assert len(reg.get("chat:nueva").history) == 1
+    assert reg.used_bytes == 10
+
+
+def test_idle_rooms_without_peers():
+    reg = _registry()
+    reg.create("chat:a", keep_history=True)
+    reg.create("signal:b", keep_history=False)
+    reg.get("signal:b").peers.add(object())
+    reg.get("chat:a").last_active = reg.get("signal:b").last_active = time.monotonic() - 120
+    assert reg.idle_rooms(60) == ["chat:a"]
+    reg.drop("chat:a")
+    assert reg.get("chat:a") is None
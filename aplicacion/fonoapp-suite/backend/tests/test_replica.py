@@ -0,0 +1,34 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.core import replica
+from backend.core.database import db_execute
+
+# Réplica que no conecta (directorio inexistente) y primario en memoria
+_broken = sessionmaker(bind=create_engine("sqlite:////nonexistent-dir/replica.db"))
+_primary = sessionmaker(bind=create_engine("sqlite://", connect_args={"check_same_thread": False}))
+
+
+def test_first_failed_replica_query_is_retried_on_primary(monkeypatch):
+    monkeypatch.setattr(replica, "ReplicaSessionLocal", _broken)
+    monkeypatch.setattr(replica, "AsyncReplicaSessionLocal", None)
+    monkeypatch.setattr(replica, "SessionLocal", _primary)
+    monkeypatch.setattr(replica, "AsyncSessionLocal", None)
+    health = replica.ReplicaHealth()
+    health.healthy, health._checked_at = True, time.monotonic()  # chequeo reciente: "sana"
+    monkeypatch.setattr(replica, "replica_health", health)
+
+    async def run():
+        gen = replica.get_read_db(SimpleNamespace(cookies={}))
+        db = await gen.__anext__()
+        first = (await db_execute(db, text("SELECT 1"))).scalar()
+        second = (await db_execute(db, text("SELECT 2"))).scalar()
+        await gen.aclose()
+        return first, second
+
+    assert asyncio.run(run()) == (1, 2)
+    assert health.healthy is False
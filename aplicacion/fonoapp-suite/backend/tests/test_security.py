@@ -0,0 +1,38 @@
+import asyncio
+import threading
+
+from backend.core import security
+
+
+def test_password_wrappers_round_trip():
+    async def run():
+        hashed = await security.hash_password_async("secret12")
+        return hashed, await asyncio.gather(
+            security.verify_password_async("secret12", hashed),
+            security.verify_password_async("otra", hashed),
+        )
+
+    hashed, (ok, bad) = asyncio.run(run())
+    assert hashed != "secret12" and security.verify_password("secret12", hashed)
+    assert ok is True and bad is False
+
+
+def test_password_wrappers_run_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def fake(*args):
+        threads.append(threading.current_thread().name)
+        return True
+
+    monkeypatch.setattr(security, "hash_password", fake)
+    monkeypatch.setattr(security, "verify_password", fake)
+
+    async def run():
+        loop_thread = threading.current_thread().name
+        await security.hash_password_async("x")
+        await security.verify_password_async("x", "y")
+        return loop_thread
+
+    loop_thread = asyncio.run(run())
+    assert len(threads) == 2
+    assert all(t.startswith("pwd-hash") and t != loop_thread for t in threads)
@@ -0,0 +1,31 @@
+import hashlib
+
+from backend.core import storage
+
+
+def test_duplicate_content_is_stored_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "STORAGE_DIR", tmp_path)
+    data = b"%PDF-1.4 ficha de articulacion"
+    sha = hashlib.sha256(data).hexdigest()
+    first, second = tmp_path / "a.tmp", tmp_path / "b.tmp"
+    first.write_bytes(data)
+    second.write_bytes(data)
+
+    assert storage.hash_file(first) == (sha, len(data))
+    assert storage.place_blob(first, sha, ".pdf") is True
+    assert storage.place_blob(second, sha, ".pdf") is False  # el llamador descarta `second`
+    assert storage.blob_path(sha, ".pdf").read_bytes() == data
+    assert storage.media_url(sha, ".pdf") == f"/media/blobs/{sha[:2]}/{sha[2:4]}/{sha}.pdf"
+
+
+def test_purge_removes_blob_and_derivatives(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "STORAGE_DIR", tmp_path)
+    sha = hashlib.sha256(b"audio").hexdigest()
+    blob = storage.blob_path(sha, ".wav")
+    blob.parent.mkdir(parents=True)
+    other = blob.parent / ("f" * 64 + ".wav")
+    for p in (blob, blob.parent / f"{sha}.thumb.webp", blob.parent / f"{sha}.peaks", other):
+        p.write_bytes(b"x")
+
+    storage._unlink_all([blob])
+    assert sorted(p.name for p in blob.parent.iterdir()) == [other.name]
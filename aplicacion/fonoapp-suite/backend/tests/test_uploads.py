@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.core.database import Base
+from backend.models.file import UploadSession
+from backend.models.user import User
+from backend.routers import files
+from backend.routers.files import _contiguous_offset, _merge_range, _parse_content_range, _write_chunk
+
+
+def test_content_range_is_half_open():
+    assert _parse_content_range("bytes 0-1048575/5000000") == (0, 1048576, 5000000)
+    with pytest.raises(HTTPException):
+        _parse_content_range("bytes 10-5/100")
+
+
+def test_out_of_order_chunks_merge_into_offset():
+    ranges = _merge_range([], 200, 300)
+    assert _contiguous_offset(ranges) == 0
+    ranges = _merge_range(ranges, 0, 100)
+    ranges = _merge_range(ranges, 100, 200)
+    assert ranges == [[0, 300]]
+    assert _contiguous_offset(ranges) == 300
+
+
+def test_chunk_for_collected_upload_is_gone(tmp_path):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(_write_chunk(tmp_path / "vencida.part", 0, 10, request=None))
+    assert exc.value.status_code == 410
+
+
+def test_complete_hashes_without_holding_the_session_lock(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[User.__table__, UploadSession.__table__])
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(UploadSession(id="u1", created_by=1, filename="a.wav", ext=".wav", size=10, received=[[0, 10]]))
+        db.commit()
+
+    def hash_file(path):
+        # Sin transacción abierta mientras se hashea; un PUT concurrente entra
+        assert not db.in_transaction()
+        with Session() as other:
+            other.execute(update(UploadSession).values(updated_at=datetime(2030, 1, 1)))
+            other.commit()
+        return "0" * 64, 10
+
+    monkeypatch.setattr(files, "hash_file", hash_file)
+    user = SimpleNamespace(id=1, role="therapist")
+    with Session() as db:
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(files.complete_upload("u1", db=db, user=user))
+    assert exc.value.status_code == 409 and exc.value.detail == files.ERR_UPLOAD_CHANGED
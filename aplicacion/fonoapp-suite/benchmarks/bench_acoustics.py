@@ -0,0 +1,94 @@
+"""
+Benchmark del análisis acústico (backend/core/acoustics.py).
+
+Sintetiza una grabación de `--minutes` minutos parecida a habla (tren de
+pulsos con jitter, ~4 sílabas/s y pausas) escribiéndola por bloques, o usa
+`--file` con una grabación real, y mide:
+
+- throughput: segundos de audio analizados por segundo de CPU
+  (time.process_time del proceso, igual que en un worker del pool);
+- RSS máximo: con memmap debe crecer con las series por trama
+  (~100 tramas/s), no con el tamaño del WAV.
+
+Uso:
+    python -m benchmarks.bench_acoustics --minutes 60 --rate 44100
+    python -m benchmarks.bench_acoustics --file sesion.wav --repeat 3
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from backend.core.acoustics import analyze_wav
+
+CHUNK_SECONDS = 10
+
+
+def _speech_like(rate: int, seconds: int, rng: np.random.Generator, t0: float) -> np.ndarray:
+    t = t0 + np.arange(rate * seconds) / rate
+    f0 = 180 + 30 * np.sin(2 * np.pi * 0.3 * t) + rng.normal(0, 1.5, len(t)).cumsum() / rate
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 10))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 2
+    pauses = (np.sin(2 * np.pi * t / 7) > -0.6).astype(float)   # ~1/4 del tiempo en pausa
+    noise = rng.normal(0, 0.002, len(t))
+    return 0.3 * voice * syllables * pauses + noise
+
+
+def synthesize(path: str, minutes: float, rate: int, seed: int = 7) -> None:
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        for start in range(0, total, CHUNK_SECONDS):
+            x = _speech_like(rate, min(CHUNK_SECONDS, total - start), rng, start)
+            wav.writeframes((np.clip(x, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+def _max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KiB
+
+
+def main(args) -> None:
+    path, tmp = args.file, None
+    if path is None:
+        fd, tmp = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        path = tmp
+        t = time.perf_counter()
+        synthesize(path, args.minutes, args.rate)
+        print(f"synthesized {args.minutes} min @ {args.rate} Hz in {time.perf_counter() - t:.1f}s")
+    try:
+        size_mb = os.path.getsize(path) / 2 ** 20
+        rss_before = _max_rss_mb()
+        runs = []
+        for _ in range(args.repeat):
+            cpu, wall = time.process_time(), time.perf_counter()
+            result = analyze_wav(path)
+            runs.append((time.process_time() - cpu, time.perf_counter() - wall))
+        f = result["features"]
+        best_cpu, best_wall = min(r[0] for r in runs), min(r[1] for r in runs)
+        print(f"file={size_mb:.0f} MiB duration={f['duration']:.0f}s frames={f['frames']}")
+        print(f"cpu={best_cpu:.2f}s wall={best_wall:.2f}s "
+              f"throughput={f['duration'] / best_cpu:.0f} audio-s/cpu-s ({f['duration'] / best_wall:.0f}x realtime wall)")
+        print(f"max_rss={_max_rss_mb():.0f} MiB (before analysis {rss_before:.0f} MiB)")
+        print(f"f0_median={f['f0_median']} voiced={f['voiced_fraction']} jitter={f['jitter_local']} "
+              f"shimmer={f['shimmer_local']} rate={f['speaking_rate']} syl/s")
+    finally:
+        if tmp:
+            os.unlink(tmp)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--file", help="WAV a analizar; sin él se sintetiza uno")
+    ap.add_argument("--minutes", type=float, default=10)
+    ap.add_argument("--rate", type=int, default=16000)
+    ap.add_argument("--repeat", type=int, default=1)
+    main(ap.parse_args())
@@ -0,0 +1,74 @@
+"""
+Benchmark de throughput de /auth/login contra una API en ejecución.
+
+Lanza N logins concurrentes y, en paralelo, sondea /health cada 10 ms para
+medir cuánto se detiene el event loop. Con bcrypt dentro del loop los logins
+se serializan (tiempo total ~ N * costo_bcrypt) y /health sufre pausas de
+cientos de ms; con el pool de hashing el total escala con los workers y
+/health se mantiene en pocos ms.
+
+Uso (requiere `pip install -r requirements-dev.txt` y un usuario existente):
+    python -m benchmarks.bench_login --base-url http://localhost:8000 \\
+        --email demo1@demo.com --password secret12 --concurrency 32
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def _login(client: httpx.AsyncClient, email: str, password: str) -> float:
+    t0 = time.perf_counter()
+    r = await client.post("/auth/login", json={"email": email, "password": password})
+    r.raise_for_status()
+    return time.perf_counter() - t0
+
+
+async def _probe_health(client: httpx.AsyncClient, stop: asyncio.Event, out: list) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await client.get("/health")
+        out.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(0.01)
+
+
+def _p95(values: list) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * 0.95) - 1)]
+
+
+async def main(args) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency + 2)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        # Calentamiento (conexiones + primer hash)
+        await _login(client, args.email, args.password)
+
+        stop = asyncio.Event()
+        health: list = []
+        probe = asyncio.create_task(_probe_health(client, stop, health))
+
+        t0 = time.perf_counter()
+        latencies = await asyncio.gather(
+            *(_login(client, args.email, args.password) for _ in range(args.concurrency * args.rounds))
+        )
+        wall = time.perf_counter() - t0
+        stop.set()
+        await probe
+
+    n = len(latencies)
+    print(f"logins={n} wall={wall:.2f}s throughput={n / wall:.1f}/s")
+    print(f"login  p50={statistics.median(latencies) * 1000:.0f}ms p95={_p95(latencies) * 1000:.0f}ms")
+    if health:
+        print(f"health p50={statistics.median(health):.1f}ms p95={_p95(health):.1f}ms max={max(health):.1f}ms")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base-url", default="http://localhost:8000")
+    ap.add_argument("--email", required=True)
+    ap.add_argument("--password", required=True)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--rounds", type=int, default=4)
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,105 @@
+"""
+Benchmark de latencia de fan-out de /ws/chat entre workers.
+
+Abre `--rooms` salas con `--peers` sockets cada una. Los peers de una sala se
+reparten en round-robin entre las URLs dadas, así que con una URL por worker
+(o un uvicorn --workers 4 detrás del mismo puerto) cada mensaje tiene que
+cruzar el broker para llegar a los demás. Cada sala emite `--messages`
+mensajes con la marca de tiempo de envío y se mide el tiempo hasta que llega
+a cada receptor.
+
+Sin REALTIME_BROKER_URL los peers en otro proceso no reciben nada (se
+reporta como `lost`); con Redis deben llegar todos.
+
+Uso (requiere `pip install websockets` y la API con el broker configurado):
+    REALTIME_BROKER_URL=redis://localhost:6379/0 \\
+        uvicorn backend.main:app --port 8000 --workers 4
+    python -m benchmarks.bench_realtime_fanout --url ws://localhost:8000 \\
+        --rooms 1000 --peers 2 --messages 10
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+import websockets
+
+
+def _p(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * q) - 1)]
+
+
+async def _receive(ws, expected: int, out: list) -> int:
+    got = 0
+    try:
+        while got < expected:
+            raw = await ws.recv()
+            sent = json.loads(raw)["t"]
+            out.append((time.perf_counter() - sent) * 1000)
+            got += 1
+    except (asyncio.CancelledError, websockets.ConnectionClosed):
+        pass
+    return got
+
+
+async def _room(urls: list, index: int, args, latencies: list, ready: asyncio.Barrier) -> tuple:
+    room = f"bench-{args.run_id}-{index}"
+    socks = [
+        await websockets.connect(f"{urls[(index + p) % len(urls)]}/ws/chat/{room}")
+        for p in range(args.peers)
+    ]
+    try:
+        # Todas las salas conectadas antes de empezar (la suscripción al broker es asíncrona)
+        await ready.wait()
+        await asyncio.sleep(args.settle)
+        receivers = [
+            asyncio.create_task(_receive(ws, args.messages, latencies)) for ws in socks[1:]
+        ]
+        for _ in range(args.messages):
+            await socks[0].send(json.dumps({"t": time.perf_counter()}))
+            await asyncio.sleep(args.interval)
+        done, pending = await asyncio.wait(receivers, timeout=args.timeout)
+        for task in pending:
+            task.cancel()
+        got = sum(t.result() for t in done) + sum([await t for t in pending])
+        return got, args.messages * (args.peers - 1)
+    finally:
+        for ws in socks:
+            await ws.close()
+
+
+async def main(args) -> None:
+    urls = [u.rstrip("/") for u in args.url]
+    latencies: list = []
+    ready = asyncio.Barrier(args.rooms)
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(_room(urls, i, args, latencies, ready) for i in range(args.rooms)))
+    wall = time.perf_counter() - t0
+
+    got = sum(r[0] for r in results)
+    expected = sum(r[1] for r in results)
+    print(f"rooms={args.rooms} peers={args.peers} urls={len(urls)} wall={wall:.2f}s")
+    print(f"delivered={got}/{expected} lost={expected - got}")
+    if latencies:
+        print(
+            f"fan-out p50={statistics.median(latencies):.1f}ms p95={_p(latencies, 0.95):.1f}ms "
+            f"p99={_p(latencies, 0.99):.1f}ms max={max(latencies):.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", action="append", help="ws://host:port; repetir una vez por worker")
+    ap.add_argument("--rooms", type=int, default=1000)
+    ap.add_argument("--peers", type=int, default=2)
+    ap.add_argument("--messages", type=int, default=10)
+    ap.add_argument("--interval", type=float, default=0.05)
+    ap.add_argument("--settle", type=float, default=1.0)
+    ap.add_argument("--timeout", type=float, default=10.0)
+    args = ap.parse_args()
+    args.url = args.url or ["ws://localhost:8000"]
+    args.run_id = uuid.uuid4().hex[:8]
+    asyncio.run(main(args))